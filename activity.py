@@ -0,0 +1,169 @@
+"""Active/idle tracking from cheap hook counters or the OS idle-time API."""
+import ctypes
+import ctypes.util
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+def _windows_idle_source():
+    from ctypes import wintypes
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    user32 = ctypes.windll.user32
+    kernel32 = ctypes.windll.kernel32
+    info = LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(LASTINPUTINFO)
+
+    def idle_seconds():
+        if not user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        return ((kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+    return idle_seconds
+
+
+def _x11_idle_source():
+    class XScreenSaverInfo(ctypes.Structure):
+        _fields_ = [("window", ctypes.c_ulong), ("state", ctypes.c_int), ("kind", ctypes.c_int),
+                    ("til_or_since", ctypes.c_ulong), ("idle", ctypes.c_ulong),
+                    ("eventMask", ctypes.c_ulong)]
+
+    xlib_path = ctypes.util.find_library("X11")
+    xss_path = ctypes.util.find_library("Xss")
+    if not xlib_path or not xss_path:
+        return None
+    xlib = ctypes.cdll.LoadLibrary(xlib_path)
+    xss = ctypes.cdll.LoadLibrary(xss_path)
+
+    xlib.XOpenDisplay.restype = ctypes.c_void_p
+    xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+    xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+    xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(XScreenSaverInfo)
+    xss.XScreenSaverQueryInfo.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XScreenSaverInfo)]
+
+    display = xlib.XOpenDisplay(None)
+    if not display:
+        return None
+    root = xlib.XDefaultRootWindow(display)
+    info = xss.XScreenSaverAllocInfo()
+
+    def idle_seconds():
+        if not xss.XScreenSaverQueryInfo(display, root, info):
+            return None
+        return info.contents.idle / 1000.0
+
+    return idle_seconds
+
+
+def create_idle_source():
+    """A callable returning seconds since the last user input system-wide, or None."""
+    try:
+        if sys.platform.startswith("win"):
+            return _windows_idle_source()
+        if sys.platform.startswith("linux"):
+            return _x11_idle_source()
+    except Exception as e:
+        print(f"OS idle time unavailable: {e}")
+    return None
+
+
+class ActivityMonitor:
+    """Turns input activity into active/idle intervals.
+
+    Input hooks only call :meth:`mark_input`, which bumps a counter.  A sampler
+    thread compares the counter (or asks the OS idle-time API when available)
+    once per ``sample_interval`` and reports transitions through
+    ``on_idle_start(idle_since)`` and ``on_idle_end(idle_since, idle_ended)``.
+    """
+
+    def __init__(self, idle_threshold=60, sample_interval=1.0, idle_source=None,
+                 on_idle_start=None, on_idle_end=None):
+        self.idle_threshold = idle_threshold
+        self.sample_interval = sample_interval
+        self.idle_source = idle_source
+        self.on_idle_start = on_idle_start
+        self.on_idle_end = on_idle_end
+
+        self.input_events = 0
+        self._seen_events = 0
+        self._last_input = time.monotonic()
+
+        self.idle_since = None
+        self.idle_periods = 0
+        self.idle_seconds_total = 0.0
+        self.running = False
+
+    def mark_input(self):
+        self.input_events += 1
+
+    def idle_seconds(self):
+        """Seconds since the last input, as of the latest sample."""
+        return max(0.0, time.monotonic() - self._last_input)
+
+    @property
+    def is_idle(self):
+        return self.idle_since is not None
+
+    def sample(self):
+        now = time.monotonic()
+        os_idle = None
+        if self.idle_source is not None:
+            try:
+                os_idle = self.idle_source()
+            except Exception:
+                os_idle = None
+
+        if os_idle is not None:
+            self._last_input = now - os_idle
+        elif self.input_events != self._seen_events:
+            self._seen_events = self.input_events
+            self._last_input = now
+
+        idle = now - self._last_input
+        wall_now = datetime.now()
+        if self.idle_since is None and idle >= self.idle_threshold:
+            self.idle_since = wall_now - timedelta(seconds=idle)
+            self.idle_periods += 1
+            if self.on_idle_start:
+                self.on_idle_start(self.idle_since)
+        elif self.idle_since is not None and idle < self.idle_threshold:
+            idle_since, self.idle_since = self.idle_since, None
+            ended = wall_now - timedelta(seconds=idle)
+            self.idle_seconds_total += (ended - idle_since).total_seconds()
+            if self.on_idle_end:
+                self.on_idle_end(idle_since, ended)
+
+    def run(self):
+        self.running = True
+        while self.running:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Activity sampling error: {e}")
+            time.sleep(self.sample_interval)
+
+    def start(self, scheduler=None):
+        if scheduler is None:
+            threading.Thread(target=self.run, daemon=True).start()
+            return
+        self.running = True
+        scheduler.every("activity_sample", self.sample_interval, self.sample)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        idle_total = self.idle_seconds_total
+        if self.idle_since is not None:
+            idle_total += (datetime.now() - self.idle_since).total_seconds()
+        return {
+            "idle_threshold_seconds": self.idle_threshold,
+            "idle_periods": self.idle_periods,
+            "idle_seconds_total": round(idle_total, 2),
+            "os_idle_time": self.idle_source is not None,
+        }
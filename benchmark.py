@@ -0,0 +1,373 @@
+"""Headless synthetic-load benchmark for ActivityTracker.
+
+Drives a real ActivityTracker with stubbed pynput, PIL.ImageGrab and
+pyperclip, so it runs without a desktop, display server or input devices:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --replay /path/to/logs/2024-05-06 --output replay.json
+
+Each scenario reports throughput and latencies; the whole run is written as
+one JSON document so results can be compared between versions.
+"""
+import argparse
+import enum
+import json
+import os
+import platform
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+
+
+def install_stubs(frame_sizes):
+    """Register fake pynput, pyperclip and PIL.ImageGrab modules before recorder is imported."""
+    from PIL import Image, ImageDraw
+
+    class Key(enum.Enum):
+        alt = "alt"
+        backspace = "backspace"
+        ctrl_l = "ctrl_l"
+        ctrl_r = "ctrl_r"
+        delete = "delete"
+        enter = "enter"
+        esc = "esc"
+        shift = "shift"
+        space = "space"
+        tab = "tab"
+
+    class KeyCode:
+        def __init__(self, char=None):
+            self.char = char
+
+        def __hash__(self):
+            return hash(self.char)
+
+        def __eq__(self, other):
+            return isinstance(other, KeyCode) and other.char == self.char
+
+    class Listener:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def join(self):
+            pass
+
+    pynput = types.ModuleType("pynput")
+    pynput.keyboard = types.SimpleNamespace(Key=Key, KeyCode=KeyCode, Listener=Listener)
+    pynput.mouse = types.SimpleNamespace(Listener=Listener)
+    sys.modules["pynput"] = pynput
+    sys.modules["pynput.keyboard"] = pynput.keyboard
+    sys.modules["pynput.mouse"] = pynput.mouse
+
+    clipboard = {"text": ""}
+    sys.modules["pyperclip"] = types.SimpleNamespace(paste=lambda: clipboard["text"],
+                                                     copy=lambda text: clipboard.update(text=text))
+
+    frames = {"count": 0}
+
+    def grab(bbox=None, all_screens=False, **kwargs):
+        size = frame_sizes[-1] if all_screens else frame_sizes[0]
+        frames["count"] += 1
+        image = Image.new("RGB", size, (245, 245, 245))
+        draw = ImageDraw.Draw(image)
+        # A mostly static desktop with one pane that changes every third frame.
+        draw.rectangle((40, 40, size[0] // 3, size[1] - 40), fill=(30, 30, 60))
+        if frames["count"] % 3 == 0:
+            draw.rectangle((size[0] // 2, 100, size[0] // 2 + 400, 500),
+                           fill=tuple(random.randrange(256) for _ in range(3)))
+        draw.text((size[0] - 120, 10), f"{frames['count']:06d}", fill=(0, 0, 0))
+        return image
+
+    image_grab = types.ModuleType("PIL.ImageGrab")
+    image_grab.grab = grab
+    sys.modules["PIL.ImageGrab"] = image_grab
+    import PIL
+
+    PIL.ImageGrab = image_grab
+    return pynput.keyboard, frames
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize_ms(values):
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.5) * 1000, 4) if values else None,
+        "p99_ms": round(percentile(values, 0.99) * 1000, 4) if values else None,
+        "max_ms": round(max(values) * 1000, 4) if values else None,
+    }
+
+
+def folder_bytes(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+
+
+def random_text(rng, length):
+    return "".join(rng.choice(string.ascii_letters + "     \n") for _ in range(length))
+
+
+def wait_for_writer(tracker, timeout=120):
+    deadline = time.monotonic() + timeout
+    while tracker.writer.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+class Benchmark:
+    def __init__(self, tracker, keyboard, frames, seed=1):
+        self.tracker = tracker
+        self.keyboard = keyboard
+        self.frames = frames
+        self.rng = random.Random(seed)
+        self.results = {}
+
+    def _timed(self, name, events, fn):
+        start = time.perf_counter()
+        extra = fn() or {}
+        wait_for_writer(self.tracker)
+        elapsed = time.perf_counter() - start
+        result = {"events": events, "seconds": round(elapsed, 4),
+                  "events_per_sec": round(events / elapsed, 1) if elapsed else None}
+        result.update(extra)
+        self.results[name] = result
+        print(f"{name:<22} {events:>8} events  {result['events_per_sec']:>12} ev/s")
+
+    def log_event_growth(self, total, segments=10):
+        """log_event latency per segment as the day's journal grows."""
+        from journal import day_journal_files
+
+        latencies = []
+        per_segment = max(1, total // segments)
+
+        def run():
+            growth = []
+            for segment in range(segments):
+                batch = []
+                for i in range(per_segment):
+                    start = time.perf_counter()
+                    self.tracker.log_event("benchmark", "synthetic", {"segment": segment, "i": i,
+                                                                      "payload": "x" * 64})
+                    batch.append(time.perf_counter() - start)
+                latencies.extend(batch)
+                wait_for_writer(self.tracker)
+                growth.append(dict(summarize_ms(batch), segment=segment,
+                                   journal_bytes=sum(os.path.getsize(path) for path in
+                                                     day_journal_files(self.tracker.today_folder))))
+            return {"latency": summarize_ms(latencies), "growth": growth}
+
+        self._timed("log_event_growth", per_segment * segments, run)
+
+    def keystroke_bursts(self, bursts, burst_size):
+        hook_latencies = []
+        specials = [self.keyboard.Key.space, self.keyboard.Key.enter, self.keyboard.Key.backspace]
+
+        def run():
+            for _ in range(bursts):
+                for _ in range(burst_size):
+                    key = (self.rng.choice(specials) if self.rng.random() < 0.15
+                           else self.keyboard.KeyCode(self.rng.choice(string.ascii_lowercase)))
+                    start = time.perf_counter()
+                    self.tracker.on_press(key)
+                    hook_latencies.append(time.perf_counter() - start)
+                self.tracker.flush_keystrokes()
+            return {"hook_latency": summarize_ms(hook_latencies)}
+
+        self._timed("keystroke_bursts", bursts * burst_size, run)
+
+    def clipboard_churn(self, changes, repeat_ratio=0.3):
+        history = []
+
+        def run():
+            for _ in range(changes):
+                if history and self.rng.random() < repeat_ratio:
+                    text = self.rng.choice(history)
+                else:
+                    text = random_text(self.rng, self.rng.randint(20, 4000))
+                    history.append(text)
+                self.tracker.on_clipboard_change(text, datetime.now())
+            return {"distinct": len(history)}
+
+        self._timed("clipboard_churn", changes, run)
+
+    def window_switching(self, switches):
+        apps = [("chrome.exe", "Inbox - Gmail"), ("code.exe", "recorder.py - Visual Studio Code"),
+                ("slack.exe", "general | Slack"), ("excel.exe", "Budget.xlsx - Excel"),
+                ("zoom.exe", "Zoom Meeting")]
+
+        def run():
+            for i in range(switches):
+                app, title = apps[i % len(apps)]
+                self.tracker.on_window_change(app, f"{title} ({i})", datetime.now())
+            return {}
+
+        self._timed("window_switching", switches, run)
+
+    def screenshots(self, count):
+        submit = []
+
+        def run():
+            for _ in range(count):
+                start = time.perf_counter()
+                self.tracker.capture_screenshot()
+                submit.append(time.perf_counter() - start)
+            # Wait for in-flight encodes by cycling the pool.
+            self.tracker.encoder.close()
+            return {"capture_call": summarize_ms(submit),
+                    "saved": self.tracker.screenshot_count,
+                    "dedupe": self.tracker.change_detector.stats() if self.tracker.change_detector else None}
+
+        self._timed("screenshots", count, run)
+
+    def replay(self, day_folder, limit=None):
+        from journal import iter_day_events
+
+        counts = {"events": 0}
+
+        def run():
+            for event in iter_day_events(day_folder):
+                data = event.get("data") or {}
+                event_type, name = event.get("event_type"), event.get("event_name")
+                when = datetime.now()
+                if event_type == "window" and name == "changed":
+                    self.tracker.on_window_change(data.get("app", "Unknown"), data.get("window_title", ""), when)
+                elif event_type == "clipboard" and name == "changed":
+                    text = data.get("content") or data.get("preview") or ""
+                    self.tracker.on_clipboard_change(text, when)
+                elif event_type == "input" and name == "keystrokes":
+                    for char in data.get("text", ""):
+                        self.tracker.on_press(self.keyboard.KeyCode(char))
+                    self.tracker.flush_keystrokes()
+                else:
+                    self.tracker.log_event(event_type or "replay", name or "event", data)
+                counts["events"] += 1
+                if limit and counts["events"] >= limit:
+                    break
+            return {"source": day_folder}
+
+        self._timed("replay", 0, run)
+        self.results["replay"]["events"] = counts["events"]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless synthetic-load benchmark for ActivityTracker")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--config", help="tracker_config.json whose capture options should be benchmarked")
+    parser.add_argument("--events", type=int, default=20000, help="log_event calls in the growth scenario")
+    parser.add_argument("--keystrokes", type=int, default=200, help="Keystroke bursts (500 keys each)")
+    parser.add_argument("--clipboard", type=int, default=500, help="Clipboard changes")
+    parser.add_argument("--windows", type=int, default=5000, help="Window switches")
+    parser.add_argument("--screenshots", type=int, default=20, help="Screenshot captures")
+    parser.add_argument("--monitors", type=int, default=2, help="Monitors in the synthetic all-screens frame")
+    parser.add_argument("--replay", help="Day folder whose events are replayed instead of synthetic load")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary log folder")
+    args = parser.parse_args(argv)
+
+    keyboard, frames = install_stubs([(1920, 1080), (1920 * max(1, args.monitors), 1080)])
+    import recorder
+
+    config = {}
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    if config.get('process_isolation'):
+        # Spawned workers import the real PIL.ImageGrab and report stats only through
+        # their result queues, so the stubs and queue-depth waits above cannot reach them.
+        parser.error("process_isolation is not supported by the benchmark; "
+                     "set it to false in the --config file")
+    log_folder = tempfile.mkdtemp(prefix="tracker-bench-")
+    config.update({"log_folder": log_folder, "idle_source": "hooks", "window_source": "poll",
+                   "clipboard_source": "poll", "headless": True})
+
+    tracker = recorder.ActivityTracker(log_folder, config.get('keystroke_interval', 15), config)
+    if tracker.window_source is None:
+        # Window changes are injected directly; the source is only named in events.
+        from window_sources import PollingWindowSource
+
+        tracker.window_source = PollingWindowSource(lambda: ("benchmark", "benchmark"), 1, tracker.process_names)
+    bench = Benchmark(tracker, keyboard, frames)
+    started = time.perf_counter()
+    if args.replay:
+        bench.replay(args.replay)
+    else:
+        bench.log_event_growth(args.events)
+        bench.keystroke_bursts(args.keystrokes, 500)
+        bench.clipboard_churn(args.clipboard)
+        bench.window_switching(args.windows)
+        bench.screenshots(args.screenshots)
+
+    tracker.running = False
+    tracker.save_session_summary()
+    tracker.writer.close()
+    tracker.rollups.checkpoint()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in config.items() if k != "log_folder"},
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "bytes_written": folder_bytes(log_folder),
+        "writer": tracker.writer.stats(),
+        "metrics": tracker.metrics.snapshot(),
+        "scenarios": bench.results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Peak RSS {results['peak_rss_bytes'] // (1024 * 1024)} MB, "
+          f"{results['bytes_written'] // 1024} KB written. Results: {args.output}")
+
+    if args.keep:
+        print(f"Logs kept in {log_folder}")
+    else:
+        shutil.rmtree(log_folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
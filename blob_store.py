@@ -0,0 +1,93 @@
+"""Content-addressed, deduplicated storage for clipboard payloads."""
+import os
+
+from clipboard_sources import content_digest
+
+
+def utf8_prefix(data, max_bytes):
+    """The longest prefix of UTF-8 ``data`` within ``max_bytes`` that does not split a character."""
+    if len(data) <= max_bytes:
+        return data
+    end = max_bytes
+    while end > 0 and data[end] & 0xC0 == 0x80:
+        end -= 1
+    return data[:end]
+
+
+def text_prefix(text, max_bytes):
+    """``text`` cut to at most ``max_bytes`` of UTF-8, on a character boundary."""
+    data = text.encode('utf-8', errors='surrogatepass')
+    return utf8_prefix(data, max_bytes).decode('utf-8', errors='surrogatepass')
+
+
+def write_blob(path, data):
+    """Atomically write ``data`` to ``path`` unless it already exists."""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class BlobStore:
+    """Stores each distinct payload once under its SHA-256 digest.
+
+    Payloads larger than ``max_bytes`` (UTF-8) are not stored in full: the blob
+    holds the longest whole-character prefix within ``max_bytes`` and the
+    result is flagged ``truncated``, while the digest still identifies the
+    complete content.  ``write(path, data)`` stores a new blob; the tracker
+    passes one that hands it to the writer stage instead of writing inline.
+    """
+
+    def __init__(self, folder, max_bytes=1_000_000, preview_chars=200, write=write_blob):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.preview_chars = preview_chars
+        self.write = write
+        self._known = set()
+
+        self.blobs_written = 0
+        self.duplicates = 0
+        self.bytes_written = 0
+
+    def path_for(self, digest):
+        return os.path.join(self.folder, digest[:2], digest + ".txt")
+
+    def put(self, text, digest=None):
+        digest = digest or content_digest(text)
+        data = text.encode('utf-8', errors='surrogatepass')
+        truncated = len(data) > self.max_bytes
+        path = self.path_for(digest)
+
+        duplicate = digest in self._known or os.path.exists(path)
+        if duplicate:
+            self.duplicates += 1
+        else:
+            stored = utf8_prefix(data, self.max_bytes)
+            self.write(path, stored)
+            self.blobs_written += 1
+            self.bytes_written += len(stored)
+        self._known.add(digest)
+
+        return {
+            "digest": digest,
+            "length": len(text),
+            "size_bytes": len(data),
+            "preview": text[:self.preview_chars],
+            "truncated": truncated,
+            "duplicate": duplicate,
+            "blob": os.path.relpath(path, os.path.dirname(self.folder)),
+        }
+
+    def get(self, digest):
+        with open(self.path_for(digest), 'rb') as f:
+            return f.read().decode('utf-8', errors='replace')
+
+    def stats(self):
+        return {
+            "blobs_written": self.blobs_written,
+            "duplicates": self.duplicates,
+            "bytes_written": self.bytes_written,
+        }
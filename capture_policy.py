@@ -0,0 +1,160 @@
+"""Decides what region a screenshot covers, when window switches trigger one, and idle backoff."""
+import sys
+import threading
+import time
+
+REGIONS = ("all", "monitor", "window")
+
+
+def _windows_bounds_reader():
+    import ctypes
+    from ctypes import wintypes
+
+    class MONITORINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.DWORD), ("rcMonitor", wintypes.RECT),
+                    ("rcWork", wintypes.RECT), ("dwFlags", wintypes.DWORD)]
+
+    user32 = ctypes.windll.user32
+    user32.GetForegroundWindow.restype = wintypes.HWND
+    user32.MonitorFromWindow.restype = wintypes.HMONITOR
+    user32.MonitorFromWindow.argtypes = [wintypes.HWND, wintypes.DWORD]
+    MONITOR_DEFAULTTONEAREST = 2
+
+    def bounds():
+        hwnd = user32.GetForegroundWindow()
+        if not hwnd:
+            return None
+        rect = wintypes.RECT()
+        if not user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+            return None
+        info = MONITORINFO()
+        info.cbSize = ctypes.sizeof(MONITORINFO)
+        monitor = user32.MonitorFromWindow(hwnd, MONITOR_DEFAULTTONEAREST)
+        if not monitor or not user32.GetMonitorInfoW(monitor, ctypes.byref(info)):
+            return None
+        m = info.rcMonitor
+        return (rect.left, rect.top, rect.right, rect.bottom), (m.left, m.top, m.right, m.bottom)
+
+    return bounds
+
+
+def _x11_bounds_reader():
+    from Xlib import X, display
+
+    lock = threading.Lock()
+    xdisplay = display.Display()
+    root = xdisplay.screen().root
+    net_active_window = xdisplay.intern_atom('_NET_ACTIVE_WINDOW')
+
+    def monitors():
+        try:
+            return [(m.x, m.y, m.x + m.width_in_pixels, m.y + m.height_in_pixels)
+                    for m in xdisplay.xrandr_get_monitors(root).monitors]
+        except Exception:
+            geometry = root.get_geometry()
+            return [(0, 0, geometry.width, geometry.height)]
+
+    def bounds():
+        with lock:
+            prop = root.get_full_property(net_active_window, X.AnyPropertyType)
+            if not prop or not prop.value or not prop.value[0]:
+                return None
+            window = xdisplay.create_resource_object('window', prop.value[0])
+            geometry = window.get_geometry()
+            origin = window.translate_coords(root, 0, 0)
+            left, top = -origin.x, -origin.y
+            rect = (left, top, left + geometry.width, top + geometry.height)
+            screens = monitors()
+        center_x, center_y = (rect[0] + rect[2]) // 2, (rect[1] + rect[3]) // 2
+        for screen in screens:
+            if screen[0] <= center_x < screen[2] and screen[1] <= center_y < screen[3]:
+                return rect, screen
+        return rect, screens[0]
+
+    return bounds
+
+
+def create_bounds_reader():
+    """A callable returning (window_rect, monitor_rect) of the foreground window, or None."""
+    try:
+        if sys.platform.startswith("win"):
+            return _windows_bounds_reader()
+        if sys.platform.startswith("linux"):
+            return _x11_bounds_reader()
+    except Exception as e:
+        print(f"Foreground window bounds unavailable: {e}")
+    return None
+
+
+class CapturePolicy:
+    """Screenshot capture rules.
+
+    * ``region`` - ``all`` grabs every monitor, ``monitor`` only the monitor
+      holding the foreground window, ``window`` only the window's bounds.
+      Falls back to all monitors when the bounds cannot be read.
+    * ``on_window_change`` - request an extra capture after a window switch,
+      at most one per ``min_gap`` seconds since the previous capture.
+    * ``idle_backoff`` - while idle, each timer capture multiplies the capture
+      interval by this factor, up to ``max_idle_interval`` seconds.
+    """
+
+    def __init__(self, region="all", on_window_change=False, min_gap=15, idle_backoff=2.0,
+                 max_idle_interval=1800, bounds_reader=None):
+        if region not in REGIONS:
+            print(f"Unknown screenshot region '{region}', capturing all monitors")
+            region = "all"
+        self.region = region
+        self.on_window_change = on_window_change
+        self.min_gap = min_gap
+        self.idle_backoff = idle_backoff
+        self.max_idle_interval = max_idle_interval
+        self.bounds_reader = bounds_reader
+        if region != "all" and bounds_reader is None:
+            self.bounds_reader = create_bounds_reader()
+
+        self.last_capture = None
+        self.triggers = {}
+        self.rate_limited = 0
+
+    def region_for_capture(self):
+        """Return ``{"mode": ..., "bbox": [l, t, r, b] or None}`` for the next grab."""
+        if self.region == "all" or self.bounds_reader is None:
+            return {"mode": "all", "bbox": None}
+        try:
+            bounds = self.bounds_reader()
+        except Exception:
+            bounds = None
+        if not bounds:
+            return {"mode": "all", "bbox": None}
+        window, monitor = bounds
+        if self.region == "window":
+            # Clip to the monitor so maximized windows' negative borders are not grabbed.
+            bbox = (max(window[0], monitor[0]), max(window[1], monitor[1]),
+                    min(window[2], monitor[2]), min(window[3], monitor[3]))
+            if bbox[2] > bbox[0] and bbox[3] > bbox[1]:
+                return {"mode": "window", "bbox": list(bbox)}
+        return {"mode": "monitor", "bbox": list(monitor)}
+
+    def allow_window_change(self, now=None):
+        now = time.monotonic() if now is None else now
+        if not self.on_window_change:
+            return False
+        if self.last_capture is not None and now - self.last_capture < self.min_gap:
+            self.rate_limited += 1
+            return False
+        return True
+
+    def record_capture(self, trigger, now=None):
+        self.last_capture = time.monotonic() if now is None else now
+        self.triggers[trigger] = self.triggers.get(trigger, 0) + 1
+
+    def idle_interval(self, base_interval, current_interval):
+        return min(max(base_interval, current_interval * self.idle_backoff), self.max_idle_interval)
+
+    def stats(self):
+        return {
+            "region": self.region,
+            "bounds_available": self.bounds_reader is not None,
+            "captures_by_trigger": dict(self.triggers),
+            "window_change_rate_limited": self.rate_limited,
+        }
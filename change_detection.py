@@ -0,0 +1,61 @@
+"""Cheap fingerprint comparison used to skip screenshots of an unchanged screen."""
+import time
+
+from PIL import Image
+
+
+class ChangeDetector:
+    """Compares each frame to the last kept one on a downscaled grayscale grid.
+
+    Every grid cell is the mean brightness of one screen tile.  A cell counts as
+    changed when it moved by more than ``tile_tolerance`` levels; the frame is
+    a duplicate when the fraction of changed cells is at or below ``threshold``.
+    """
+
+    def __init__(self, threshold=0.005, grid=(64, 36), tile_tolerance=6):
+        self.threshold = threshold
+        self.grid = tuple(grid)
+        self.tile_tolerance = tile_tolerance
+
+        self.last_fingerprint = None
+        self.last_size = None
+
+        self.frames = 0
+        self.skipped = 0
+        self.compare_seconds = 0.0
+
+    def fingerprint(self, image):
+        return image.resize(self.grid, Image.BOX).convert('L').tobytes()
+
+    def difference(self, fingerprint):
+        tol = self.tile_tolerance
+        changed = sum(1 for a, b in zip(fingerprint, self.last_fingerprint) if abs(a - b) > tol)
+        return changed / len(fingerprint)
+
+    def check(self, image):
+        """Return (changed, difference) and remember the frame if it changed."""
+        start = time.perf_counter()
+        fingerprint = self.fingerprint(image)
+
+        if self.last_fingerprint is None or image.size != self.last_size:
+            changed, difference = True, 1.0
+        else:
+            difference = self.difference(fingerprint)
+            changed = difference > self.threshold
+
+        if changed:
+            self.last_fingerprint = fingerprint
+            self.last_size = image.size
+        else:
+            self.skipped += 1
+        self.frames += 1
+        self.compare_seconds += time.perf_counter() - start
+        return changed, round(difference, 4)
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            "avg_compare_ms": round(self.compare_seconds * 1000 / self.frames, 2) if self.frames else 0.0,
+        }
@@ -0,0 +1,268 @@
+"""Clipboard change sources: OS change notifications with a cheap polling fallback.
+
+Every source calls ``on_change(text, when)`` once per clipboard change.  The
+content itself is only fetched (``pyperclip.paste()``) after the OS reports a
+change, so an idle clipboard costs no subprocesses or string compares.
+"""
+import abc
+import hashlib
+import select
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+def content_digest(text):
+    return hashlib.sha256(text.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+class ClipboardSource(abc.ABC):
+    name = "base"
+
+    def __init__(self, paste=None):
+        if paste is None:
+            import pyperclip
+
+            paste = pyperclip.paste
+        self.paste = paste
+        self.on_change = None
+        self.running = False
+        self.last_digest = None
+        self.changes = 0
+        self._thread = None
+
+    def start(self, on_change, scheduler=None):
+        self.on_change = on_change
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _fetch(self):
+        try:
+            text = self.paste()
+        except Exception as e:
+            print(f"Clipboard error: {e}")
+            return
+        if not isinstance(text, str):
+            return
+        digest = content_digest(text)
+        if digest == self.last_digest:
+            return
+        self.last_digest = digest
+        self.changes += 1
+        try:
+            self.on_change(text, datetime.now())
+        except Exception as e:
+            print(f"Clipboard error: {e}")
+
+    @abc.abstractmethod
+    def _run(self):
+        """Call ``_fetch`` after each clipboard change until ``running`` is cleared."""
+
+
+def _sequence_number_reader():
+    """A cheap clipboard change counter for this platform, or None."""
+    if sys.platform.startswith("win"):
+        try:
+            import ctypes
+
+            return ctypes.windll.user32.GetClipboardSequenceNumber
+        except Exception:
+            return None
+    if sys.platform == "darwin":
+        try:
+            from AppKit import NSPasteboard  # type: ignore
+
+            pasteboard = NSPasteboard.generalPasteboard()
+            return pasteboard.changeCount
+        except Exception:
+            return None
+    return None
+
+
+class PollingClipboardSource(ClipboardSource):
+    """Polls a clipboard sequence number and only fetches content when it moves.
+
+    Without a sequence number (e.g. X11 without XFixes) the content is fetched
+    every interval and compared by digest.
+    """
+
+    name = "poll"
+
+    def __init__(self, interval=1, paste=None, sequence_number=None):
+        super().__init__(paste)
+        self.interval = interval
+        self.sequence_number = sequence_number if sequence_number is not None else _sequence_number_reader()
+        self.last_sequence = None
+
+    def start(self, on_change, scheduler=None):
+        """Poll from ``scheduler`` when one is given instead of a dedicated thread."""
+        if scheduler is None:
+            return super().start(on_change)
+        self.on_change = on_change
+        self.running = True
+        scheduler.every("clipboard_poll", self.interval, self.poll)
+
+    def poll(self):
+        if not self.running:
+            return
+        if self.sequence_number is None:
+            self._fetch()
+            return
+        try:
+            sequence = self.sequence_number()
+        except Exception:
+            sequence = None
+        if sequence is None or sequence != self.last_sequence:
+            self.last_sequence = sequence
+            self._fetch()
+
+    def _run(self):
+        while self.running:
+            self.poll()
+            time.sleep(self.interval)
+
+
+class XFixesClipboardSource(ClipboardSource):
+    """X11 CLIPBOARD ownership changes via XFixesSelectSelectionInput."""
+
+    name = "xfixes"
+
+    def __init__(self, paste=None, display_name=None):
+        super().__init__(paste)
+        from Xlib import display
+        from Xlib.ext import xfixes
+
+        self.xfixes = xfixes
+        self.display = display.Display(display_name)
+        if not self.display.has_extension('XFIXES'):
+            raise RuntimeError("XFIXES extension not available")
+        self.display.xfixes_query_version()
+        self.root = self.display.screen().root
+        self.CLIPBOARD = self.display.intern_atom('CLIPBOARD')
+
+    def _run(self):
+        self.root.xfixes_select_selection_input(
+            self.CLIPBOARD, self.xfixes.XFixesSetSelectionOwnerNotifyMask)
+        self.display.flush()
+        notify_type = self.display.extension_event.SetSelectionOwnerNotify
+        self._fetch()
+
+        while self.running:
+            try:
+                readable, _, _ = select.select([self.display.fileno()], [], [], 0.5)
+                if not readable and not self.display.pending_events():
+                    continue
+                changed = False
+                while self.display.pending_events():
+                    event = self.display.next_event()
+                    if (event.type, getattr(event, 'sub_code', 0)) == notify_type:
+                        changed = True
+                if changed:
+                    self._fetch()
+            except Exception as e:
+                print(f"Clipboard error: {e}")
+                time.sleep(1)
+        self.display.close()
+
+
+class WindowsClipboardListener(ClipboardSource):
+    """WM_CLIPBOARDUPDATE on a message-only window (AddClipboardFormatListener)."""
+
+    name = "listener"
+
+    WM_CLIPBOARDUPDATE = 0x031D
+    WM_QUIT = 0x0012
+    HWND_MESSAGE = -3
+
+    def __init__(self, paste=None):
+        super().__init__(paste)
+        import ctypes
+        from ctypes import wintypes
+
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        if not hasattr(self.user32, "AddClipboardFormatListener"):
+            raise RuntimeError("AddClipboardFormatListener not available")
+        self._thread_id = None
+
+    def _run(self):
+        ctypes, wintypes = self.ctypes, self.wintypes
+        user32 = self.user32
+        self._thread_id = self.kernel32.GetCurrentThreadId()
+
+        lresult = ctypes.c_ssize_t
+        wndproc_type = ctypes.WINFUNCTYPE(lresult, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+        user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+        user32.DefWindowProcW.restype = lresult
+
+        def wndproc(hwnd, msg, wparam, lparam):
+            if msg == self.WM_CLIPBOARDUPDATE:
+                self._fetch()
+                return 0
+            return user32.DefWindowProcW(hwnd, msg, wparam, lparam)
+
+        self._wndproc = wndproc_type(wndproc)
+
+        class WNDCLASSW(ctypes.Structure):
+            _fields_ = [("style", wintypes.UINT), ("lpfnWndProc", wndproc_type),
+                        ("cbClsExtra", ctypes.c_int), ("cbWndExtra", ctypes.c_int),
+                        ("hInstance", wintypes.HINSTANCE), ("hIcon", wintypes.HICON),
+                        ("hCursor", wintypes.HANDLE), ("hbrBackground", wintypes.HBRUSH),
+                        ("lpszMenuName", wintypes.LPCWSTR), ("lpszClassName", wintypes.LPCWSTR)]
+
+        wndclass = WNDCLASSW()
+        wndclass.lpfnWndProc = self._wndproc
+        wndclass.hInstance = self.kernel32.GetModuleHandleW(None)
+        wndclass.lpszClassName = "ActivityTrackerClipboardListener"
+        user32.RegisterClassW(ctypes.byref(wndclass))
+
+        user32.CreateWindowExW.restype = wintypes.HWND
+        hwnd = user32.CreateWindowExW(0, wndclass.lpszClassName, "", 0, 0, 0, 0, 0,
+                                      wintypes.HWND(self.HWND_MESSAGE), None, wndclass.hInstance, None)
+        user32.AddClipboardFormatListener(hwnd)
+        self._fetch()
+
+        msg = wintypes.MSG()
+        while self.running and user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+        user32.RemoveClipboardFormatListener(hwnd)
+        user32.DestroyWindow(hwnd)
+
+    def stop(self):
+        super().stop()
+        if self._thread_id:
+            self.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+
+def create_clipboard_source(kind="auto", interval=1):
+    """Pick a clipboard source: ``auto``, ``listener`` (Windows), ``xfixes`` (X11) or ``poll``."""
+    if kind == "auto":
+        if sys.platform.startswith("win"):
+            candidates = ["listener", "poll"]
+        elif sys.platform == "darwin":
+            candidates = ["poll"]
+        else:
+            candidates = ["xfixes", "poll"]
+    else:
+        candidates = [kind, "poll"]
+
+    for candidate in candidates:
+        try:
+            if candidate == "listener" and sys.platform.startswith("win"):
+                return WindowsClipboardListener()
+            if candidate == "xfixes":
+                return XFixesClipboardSource()
+            if candidate == "poll":
+                return PollingClipboardSource(interval)
+        except Exception as e:
+            print(f"Clipboard source '{candidate}' unavailable: {e}")
+    return None
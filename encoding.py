@@ -0,0 +1,132 @@
+"""Screenshot encoding off the capture thread, in a pool of worker processes."""
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image
+
+import tile_store
+
+EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
+
+
+def encoding_options(config):
+    fmt = str(config.get('screenshot_format', 'png')).lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in EXTENSIONS:
+        fmt = 'png'
+    storage = str(config.get('screenshot_storage', 'files')).lower()
+    return {
+        "format": fmt,
+        "storage": storage if storage in ("files", "tiles", "archive") else "files",
+        "tile_size": int(config.get('screenshot_tile_size', 128)),
+        "png_compress_level": int(config.get('png_compress_level', 6)),
+        "quality": int(config.get('screenshot_quality', 80)),
+        "downscale": float(config.get('screenshot_downscale', 1.0)),
+    }
+
+
+def output_format(options):
+    """(format recorded in events, file extension) for the configured storage."""
+    if options.get("storage") == "tiles":
+        return "tiles", tile_store.MANIFEST_SUFFIX.lstrip(".")
+    return options["format"], EXTENSIONS[options["format"]]
+
+
+def encode_frame(mode, size, raw, path, options):
+    """Encode a raw frame to ``path``; runs inside a worker process."""
+    start = time.perf_counter()
+    return encode_image(Image.frombytes(mode, size, raw), path, options, start)
+
+
+def encode_image(image, path, options, start=None):
+    """Encode ``image`` to ``path`` with the configured storage.
+
+    For archive storage nothing is written; the encoded bytes are returned in
+    ``data`` for the capturing process to append to the day's archive.
+    """
+    start = time.perf_counter() if start is None else start
+    downscale = options.get("downscale", 1.0)
+    if 0 < downscale < 1:
+        image = image.resize((max(1, int(image.width * downscale)), max(1, int(image.height * downscale))),
+                             Image.BILINEAR)
+
+    if options.get("storage") == "tiles":
+        stats = tile_store.store_frame(image, path, os.path.join(os.path.dirname(path), "tiles"),
+                                       tile_size=options["tile_size"],
+                                       compress_level=options["png_compress_level"])
+        stats.update({
+            "encode_ms": round((time.perf_counter() - start) * 1000, 1),
+            "width": image.width,
+            "height": image.height,
+        })
+        return stats
+
+    target = io.BytesIO() if options.get("storage") == "archive" else path
+    fmt = options["format"]
+    if fmt == "png":
+        image.save(target, "PNG", compress_level=options["png_compress_level"])
+    else:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(target, fmt.upper(), quality=options["quality"])
+
+    result = {
+        "encode_ms": round((time.perf_counter() - start) * 1000, 1),
+        "width": image.width,
+        "height": image.height,
+    }
+    if target is path:
+        result["size_bytes"] = os.path.getsize(path)
+    else:
+        result["data"] = target.getvalue()
+        result["size_bytes"] = len(result["data"])
+    return result
+
+
+class ScreenshotEncoder:
+    """Hands grabbed frames to worker processes and reports each result.
+
+    At most ``max_pending`` frames are in flight; further submits block the
+    capture thread instead of queueing unbounded raw bitmaps in memory.
+    """
+
+    def __init__(self, options, workers=1, max_pending=2):
+        self.options = options
+        self.output_format, self.extension = output_format(options)
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        try:
+            # Spawn, never fork: the capturing process runs input hook, Tk and writer threads
+            self._pool = ProcessPoolExecutor(max_workers=max(1, workers),
+                                             mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, NotImplementedError) as e:
+            print(f"Encoder process pool unavailable ({e}), encoding in a thread")
+            self._pool = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, image, path, on_done):
+        """Encode ``image`` to ``path`` and call ``on_done(path, result, error)``."""
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(encode_frame, image.mode, image.size, image.tobytes(),
+                                       path, self.options)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def finished(f):
+            self._slots.release()
+            try:
+                result = f.result()
+            except Exception as e:
+                on_done(path, None, e)
+                return
+            on_done(path, result, None)
+
+        future.add_done_callback(finished)
+
+    def close(self, wait=True):
+        self._pool.shutdown(wait=wait)
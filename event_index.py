@@ -0,0 +1,115 @@
+"""SQLite index over every day's events for fast time-range and per-app lookups."""
+import json
+import os
+import re
+import sqlite3
+
+from journal import iter_day_events
+
+INDEX_NAME = "event_index.sqlite"
+DAY_FOLDER = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    event_name TEXT NOT NULL,
+    app TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events (event_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_name ON events (event_name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_app ON events (app COLLATE NOCASE, timestamp);
+"""
+
+
+def day_folders(log_folder):
+    """Day folders under ``log_folder`` in date order."""
+    if not os.path.isdir(log_folder):
+        return []
+    return [os.path.join(log_folder, name) for name in sorted(os.listdir(log_folder))
+            if DAY_FOLDER.match(name) and os.path.isdir(os.path.join(log_folder, name))]
+
+
+def event_app(event):
+    data = event.get("data") or {}
+    if not isinstance(data, dict):
+        return None
+    return data.get("app") or data.get("current_app") or None
+
+
+class EventIndex:
+    """One connection per owning thread; the tracker's writer thread is the only writer."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def add_events(self, events):
+        rows = [(e.get("timestamp"), e.get("event_type"), e.get("event_name"), event_app(e),
+                 json.dumps(e.get("data"), ensure_ascii=False))
+                for e in events]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO events (timestamp, event_type, event_name, app, data) VALUES (?, ?, ?, ?, ?)",
+                rows)
+
+    def query(self, since=None, until=None, event_type=None, event_name=None, app=None, limit=None):
+        clauses, params = [], []
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if event_type:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if event_name:
+            clauses.append("event_name = ?")
+            params.append(event_name)
+        if app:
+            clauses.append("app = ? COLLATE NOCASE")
+            params.append(app)
+
+        sql = "SELECT timestamp, event_type, event_name, data FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        for timestamp, event_type, event_name, data in self.conn.execute(sql, params):
+            yield {
+                "timestamp": timestamp,
+                "event_type": event_type,
+                "event_name": event_name,
+                "data": json.loads(data) if data else None,
+            }
+
+    def rebuild(self, log_folder, batch_size=5000):
+        """Replace the index contents with the events of every day folder; returns the count."""
+        with self.conn:
+            self.conn.execute("DELETE FROM events")
+        total = 0
+        for folder in day_folders(log_folder):
+            batch = []
+            for event in iter_day_events(folder):
+                batch.append(event)
+                if len(batch) >= batch_size:
+                    self.add_events(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                self.add_events(batch)
+                total += len(batch)
+        return total
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,216 @@
+"""Packed per-day screenshot archive with a fixed-size offset index.
+
+``frames.pack`` holds the encoded images back to back.  ``frames.idx`` holds
+one fixed-size record per frame (timestamp, offset, length, width, height,
+format), so frame ``i`` is found by a single seek and frames are located by
+time with a binary search over the memory-mapped index.
+"""
+import io
+import mmap
+import os
+import re
+import struct
+import threading
+from datetime import datetime
+
+PACK_NAME = "frames.pack"
+INDEX_NAME = "frames.idx"
+PACK_MAGIC = b"CALFPAK1"
+INDEX_MAGIC = b"CALFIDX1"
+
+# timestamp (epoch seconds), offset, length, width, height, format
+RECORD = struct.Struct("<dQIII4s")
+
+FORMATS = {"png": b"png ", "webp": b"webp", "jpeg": b"jpeg"}
+EXTENSIONS = {b"png ": "png", b"webp": "webp", b"jpeg": "jpg"}
+
+# Milliseconds were added so captures in the same second get their own file;
+# names from before that have none.
+LOOSE_FILE = re.compile(r"^screenshot_(\d{8}_\d{6})(?:_(\d{3}))?\.(png|webp|jpg)$")
+
+
+def screenshot_name(when, extension):
+    """Loose file name of a frame captured at ``when`` (a datetime)."""
+    return f"screenshot_{when.strftime('%Y%m%d_%H%M%S')}_{when.microsecond // 1000:03d}.{extension}"
+
+
+def loose_time(match):
+    """Capture time of a ``LOOSE_FILE`` match."""
+    taken = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+    return taken.replace(microsecond=int(match.group(2)) * 1000) if match.group(2) else taken
+
+
+def _millis(timestamp):
+    # Same rounding as datetime.fromtimestamp, so a frame and its exported name agree
+    return round(timestamp * 1_000_000) // 1000
+
+
+class FrameArchive:
+    """Append-only writer for a day's frame archive."""
+
+    def __init__(self, folder):
+        self.pack_path = os.path.join(folder, PACK_NAME)
+        self.index_path = os.path.join(folder, INDEX_NAME)
+        self._lock = threading.Lock()
+
+        self._index = open(self.index_path, 'a+b')
+        self._pack = open(self.pack_path, 'a+b')
+        self._recover()
+
+    def _recover(self):
+        """Drop a torn index record and any pack bytes not covered by the index."""
+        self._index.seek(0, os.SEEK_END)
+        index_size = self._index.tell()
+        if index_size == 0:
+            self._index.write(INDEX_MAGIC)
+            index_size = len(INDEX_MAGIC)
+        count = (index_size - len(INDEX_MAGIC)) // RECORD.size
+        self._index.truncate(len(INDEX_MAGIC) + count * RECORD.size)
+
+        pack_end = len(PACK_MAGIC)
+        if count:
+            self._index.seek(len(INDEX_MAGIC) + (count - 1) * RECORD.size)
+            _, offset, length, _, _, _ = RECORD.unpack(self._index.read(RECORD.size))
+            pack_end = offset + length
+        self._pack.seek(0, os.SEEK_END)
+        if self._pack.tell() == 0:
+            self._pack.write(PACK_MAGIC)
+        self._pack.truncate(pack_end)
+        self._pack.flush()
+        self._index.flush()
+        self.count = count
+
+    def append(self, timestamp, data, width, height, fmt):
+        """Append one encoded frame and return its index."""
+        with self._lock:
+            self._pack.seek(0, os.SEEK_END)
+            offset = self._pack.tell()
+            self._pack.write(data)
+            self._pack.flush()
+
+            self._index.write(RECORD.pack(timestamp, offset, len(data), width, height, FORMATS[fmt]))
+            self._index.flush()
+            self.count += 1
+            return self.count - 1
+
+    def close(self):
+        with self._lock:
+            self._pack.close()
+            self._index.close()
+
+
+class ArchiveReader:
+    """Memory-mapped, random-access reader for a day's frame archive."""
+
+    def __init__(self, folder):
+        with open(os.path.join(folder, INDEX_NAME), 'rb') as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(os.path.join(folder, PACK_NAME), 'rb') as f:
+            self._pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._index[:len(INDEX_MAGIC)] != INDEX_MAGIC or self._pack[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"Not a frame archive: {folder}")
+        self.count = (len(self._index) - len(INDEX_MAGIC)) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, i):
+        """Return (timestamp, offset, length, width, height, extension) of frame ``i``."""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        ts, offset, length, width, height, fmt = RECORD.unpack_from(
+            self._index, len(INDEX_MAGIC) + i * RECORD.size)
+        return ts, offset, length, width, height, EXTENSIONS.get(fmt, "bin")
+
+    def frame_bytes(self, i):
+        _, offset, length, _, _, _ = self.entry(i)
+        return self._pack[offset:offset + length]
+
+    def image(self, i):
+        from PIL import Image
+
+        return Image.open(io.BytesIO(self.frame_bytes(i)))
+
+    def find(self, timestamp):
+        """Index of the last frame captured at or before ``timestamp`` (epoch seconds)."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entry(mid)[0] <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def name(self, i):
+        ts, _, _, _, _, ext = self.entry(i)
+        return screenshot_name(datetime.fromtimestamp(ts), ext)
+
+    def close(self):
+        self._index.close()
+        self._pack.close()
+
+
+def export_archive(folder, output_folder):
+    """Write every archived frame back out as a loose file; returns the count."""
+    os.makedirs(output_folder, exist_ok=True)
+    reader = ArchiveReader(folder)
+    try:
+        for i in range(len(reader)):
+            with open(os.path.join(output_folder, reader.name(i)), 'wb') as f:
+                f.write(reader.frame_bytes(i))
+        return len(reader)
+    finally:
+        reader.close()
+
+
+def pack_folder(folder, remove=False):
+    """Append the loose screenshot files of ``folder`` to its archive; returns the count appended.
+
+    Files whose millisecond is already archived are skipped (and removed with
+    ``remove``), so packing again is harmless.  Files older than the newest
+    archived frame are left in place: appending them would break the time
+    order that :meth:`ArchiveReader.find` relies on.
+    """
+    from PIL import Image
+
+    loose = sorted(name for name in os.listdir(folder) if LOOSE_FILE.match(name))
+    archive = FrameArchive(folder)
+    archived, newest = set(), None
+    packed, out_of_order = 0, 0
+    try:
+        if archive.count:
+            reader = ArchiveReader(folder)
+            try:
+                for i in range(len(reader)):
+                    ts = reader.entry(i)[0]
+                    archived.add(_millis(ts))
+                    newest = ts if newest is None else max(newest, ts)
+            finally:
+                reader.close()
+
+        for name in loose:
+            path = os.path.join(folder, name)
+            match = LOOSE_FILE.match(name)
+            ext = match.group(3)
+            timestamp = loose_time(match).timestamp()
+            if _millis(timestamp) in archived:
+                if remove:
+                    os.remove(path)
+                continue
+            if newest is not None and timestamp < newest:
+                out_of_order += 1
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            with Image.open(io.BytesIO(data)) as image:
+                width, height = image.size
+            archive.append(timestamp, data, width, height, "jpeg" if ext == "jpg" else ext)
+            packed += 1
+            if remove:
+                os.remove(path)
+    finally:
+        archive.close()
+    if out_of_order:
+        print(f"Left {out_of_order} screenshots older than the archive's newest frame in {folder}")
+    return packed
@@ -0,0 +1,132 @@
+"""Append-only JSONL event journal used by ActivityTracker.log_event."""
+import gzip
+import json
+import os
+import threading
+
+from segments import SEGMENT_DIR, SegmentReader, iter_json_array, segment_paths
+
+
+class EventJournal:
+    """One JSON object per line, with concurrent writers batched into a single write.
+
+    Events are serialized by the calling thread and queued.  The writer that
+    pushes the queue to ``flush_every`` events commits the whole batch (its own
+    events plus any queued by other threads) in one write/flush; a background
+    thread commits whatever is left every ``flush_interval_ms``.
+    """
+
+    def __init__(self, path, flush_every=20, flush_interval_ms=1000, fsync=False):
+        self.path = path
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = max(0.01, flush_interval_ms / 1000.0)
+        self.fsync = fsync
+
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._file = open(path, 'a', encoding='utf-8')
+
+        self.events_written = 0
+        self.commits = 0
+
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def append(self, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._pending_lock:
+            self._pending.append(line)
+            should_commit = len(self._pending) >= self.flush_every
+        if should_commit:
+            self.flush()
+
+    def flush(self):
+        with self._commit_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch or self._file.closed:
+                return
+            self._file.write(''.join(batch))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.events_written += len(batch)
+            self.commits += 1
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Journal flush error: {e}")
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+        with self._commit_lock:
+            self._file.close()
+
+
+def open_log(path, mode='r'):
+    """Open ``path``, or its ``path.gz`` copy once retention has compressed it."""
+    binary = 'b' in mode
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        if binary:
+            return gzip.open(path + ".gz", mode)
+        return gzip.open(path + ".gz", mode + 't', encoding='utf-8')
+    if binary:
+        return open(path, mode)
+    return open(path, mode, encoding='utf-8')
+
+
+def log_exists(path):
+    return os.path.exists(path) or os.path.exists(path + ".gz")
+
+
+def read_events(path):
+    """Yield events from a JSONL journal (plain or gzip) in write order.
+
+    A torn final line (crash mid-write) is skipped rather than raised.
+    """
+    with open_log(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def day_journal_files(day_folder):
+    """Event files of a day folder that exist, in read order."""
+    names = ("activity_log.json", "activity_log.json.gz", "activity_log.jsonl", "activity_log.jsonl.gz")
+    paths = [os.path.join(day_folder, name) for name in names if os.path.exists(os.path.join(day_folder, name))]
+    return paths + segment_paths(os.path.join(day_folder, SEGMENT_DIR))
+
+
+def iter_day_events(day_folder, since=None, until=None):
+    """Yield all events of a day folder: legacy JSON array, JSONL journal, then binary segments.
+
+    ``since``/``until`` only narrow the binary segments, which can seek by
+    timestamp; events from the text formats are all returned.
+    """
+    legacy = os.path.join(day_folder, "activity_log.json")
+    if log_exists(legacy):
+        try:
+            with open_log(legacy) as f:
+                yield from iter_json_array(f)
+        except (OSError, ValueError) as e:
+            print(f"Legacy log read error ({legacy}): {e}")
+
+    journal = os.path.join(day_folder, "activity_log.jsonl")
+    if log_exists(journal):
+        yield from read_events(journal)
+
+    segments = os.path.join(day_folder, SEGMENT_DIR)
+    if os.path.isdir(segments):
+        yield from SegmentReader(segments).iter_events(since, until)
+
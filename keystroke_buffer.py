@@ -0,0 +1,60 @@
+"""Keystroke capture buffer and hook latency sampling for the input hook thread."""
+import threading
+from array import array
+
+
+class KeystrokeBuffer:
+    """Double buffer: the hook appends to the active list, the flusher swaps it out.
+
+    Both sides hold the lock only for a list append or a reference swap, so no
+    keystroke can land between a flusher's read and its reset.
+    """
+
+    def __init__(self):
+        self._active = []
+        self._lock = threading.Lock()
+
+    def append(self, text):
+        with self._lock:
+            self._active.append(text)
+
+    def backspace(self):
+        with self._lock:
+            if self._active:
+                self._active.pop()
+
+    def swap(self):
+        """Return everything captured since the last swap and start a fresh buffer."""
+        with self._lock:
+            captured, self._active = self._active, []
+        return captured
+
+    def __len__(self):
+        return len(self._active)
+
+
+class LatencySampler:
+    """Fixed-size ring of hook durations in microseconds; no allocation per sample."""
+
+    def __init__(self, size=4096):
+        self._samples = array('d', bytes(8 * size))
+        self._size = size
+        self._next = 0
+        self.count = 0
+
+    def record(self, micros):
+        self._samples[self._next] = micros
+        self._next = (self._next + 1) % self._size
+        self.count += 1
+
+    def percentiles(self):
+        filled = min(self.count, self._size)
+        if not filled:
+            return {"samples": 0}
+        ordered = sorted(self._samples[:filled])
+        return {
+            "samples": self.count,
+            "p50_us": round(ordered[filled // 2], 1),
+            "p99_us": round(ordered[min(filled - 1, int(filled * 0.99))], 1),
+            "max_us": round(ordered[-1], 1),
+        }
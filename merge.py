@@ -0,0 +1,185 @@
+"""Merge the day folders of several machines into one host-tagged timeline.
+
+Each machine's events are streamed and only locally re-sorted (timestamps
+from different capture threads can be slightly out of order), then combined
+with a k-way heap merge, so memory does not grow with the size of a day.
+"""
+import heapq
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+
+from event_index import day_folders
+from journal import iter_day_events
+from segments import event_timestamp_us
+
+DAY_NAME = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+SUMMARY_NAME = "merge_summary.json"
+
+
+def parse_source(spec):
+    """``host=path`` or a bare path, labelled after its log folder."""
+    host, sep, path = spec.partition("=")
+    if not sep or not host or os.path.exists(spec):
+        host, path = None, spec
+    path = os.path.abspath(path)
+    if host is None:
+        log_folder = os.path.dirname(path) if DAY_NAME.match(os.path.basename(path)) else path
+        host = os.path.basename(log_folder) or "host"
+    return host, path
+
+
+def source_days(path, since=None, until=None):
+    """``{day: day_folder}`` for a day folder or every day of a log folder within [since, until]."""
+    if DAY_NAME.match(os.path.basename(path)):
+        folders = [path]
+    else:
+        folders = day_folders(path)
+    days = {}
+    for folder in folders:
+        day = os.path.basename(folder)
+        if since and day < since.strftime('%Y-%m-%d'):
+            continue
+        if until and day > until.strftime('%Y-%m-%d'):
+            continue
+        days[day] = folder
+    return days
+
+
+def iter_sorted(events, window=1000):
+    """Yield ``(timestamp_us, event)`` in timestamp order, given events at most ``window`` places out of order."""
+    pending = []
+    for seq, event in enumerate(events):
+        heapq.heappush(pending, (event_timestamp_us(event), seq, event))
+        if len(pending) > window:
+            timestamp, _, event = heapq.heappop(pending)
+            yield timestamp, event
+    while pending:
+        timestamp, _, event = heapq.heappop(pending)
+        yield timestamp, event
+
+
+def _host_stream(rank, host, folder, window):
+    # (rank, seq) break timestamp ties so events themselves are never compared
+    for seq, (timestamp, event) in enumerate(iter_sorted(iter_day_events(folder), window)):
+        yield timestamp, rank, seq, host, event
+
+
+def merge_events(sources, window=1000):
+    """k-way merge of ``[(host, day_folder)]``; yields events tagged with ``host``."""
+    streams = [_host_stream(rank, host, folder, window) for rank, (host, folder) in enumerate(sources)]
+    for timestamp, _, _, host, event in heapq.merge(*streams):
+        event["host"] = host
+        yield timestamp, event
+
+
+def billed_span(event, timestamp):
+    """``(end_us, seconds, app)`` of the foreground time an event bills, or None; idle time is never billed."""
+    data = event.get("data") or {}
+    kind = (event.get("event_type"), event.get("event_name"))
+    if kind == ("window", "changed"):
+        app, seconds, end = data.get("previous_app"), data.get("time_on_previous"), timestamp
+    elif kind == ("activity", "idle_started"):
+        # Billed up to the last input, not up to when idle was detected
+        app, seconds = data.get("app"), data.get("billed_seconds")
+        try:
+            end = int(datetime.fromisoformat(data["idle_since"]).timestamp() * 1_000_000)
+        except (KeyError, TypeError, ValueError):
+            end = timestamp
+    elif kind == ("system", "session_ended"):
+        app, seconds, end = data.get("app"), data.get("time_on_current"), timestamp
+    else:
+        return None
+    if not app or not seconds or seconds <= 0:
+        return None
+    return end, seconds, app
+
+
+def reconcile_usage(intervals):
+    """Credit every instant to at most one foreground app across machines.
+
+    ``intervals`` are ``(start_us, end_us, host, app)`` foreground periods.
+    Where machines overlap, the instant goes to the machine the user
+    switched to most recently.  Returns (app seconds, host seconds).
+    """
+    intervals.sort()
+    points = sorted({point for start, end, _, _ in intervals for point in (start, end)})
+    app_seconds = defaultdict(float)
+    host_seconds = defaultdict(float)
+    active = []
+    i = 0
+    for left, right in zip(points, points[1:]):
+        while i < len(intervals) and intervals[i][0] <= left:
+            start, end, host, app = intervals[i]
+            heapq.heappush(active, (-start, end, host, app))
+            i += 1
+        while active and active[0][1] <= left:
+            heapq.heappop(active)
+        if not active:
+            continue
+        _, _, host, app = active[0]
+        app_seconds[app] += (right - left) / 1_000_000
+        host_seconds[host] += (right - left) / 1_000_000
+    return app_seconds, host_seconds
+
+
+def merge_day(day, sources, output_folder, window=1000):
+    """Write ``<output_folder>/<day>/activity_log.jsonl`` and a usage summary; returns the summary."""
+    day_folder = os.path.join(output_folder, day)
+    target = os.path.join(day_folder, "activity_log.jsonl")
+    if os.path.exists(target) and not os.path.exists(os.path.join(day_folder, SUMMARY_NAME)):
+        raise ValueError(f"{day_folder} holds a recorded day, not a merge output")
+    os.makedirs(day_folder, exist_ok=True)
+
+    events_by_host = defaultdict(int)
+    intervals = []
+    raw_seconds = 0.0
+    tmp_path = target + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for timestamp, event in merge_events(sources, window):
+            host = event["host"]
+            events_by_host[host] += 1
+            span = billed_span(event, timestamp)
+            if span:
+                end, seconds, app = span
+                intervals.append((end - int(seconds * 1_000_000), end, host, app))
+                raw_seconds += seconds
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, target)
+
+    app_seconds, host_seconds = reconcile_usage(intervals)
+    summary = {
+        "day": day,
+        "merged_at": datetime.now().isoformat(),
+        "sources": {host: folder for host, folder in sources},
+        "events": dict(events_by_host),
+        "app_usage_minutes": {app: round(seconds / 60, 2) for app, seconds in
+                              sorted(app_seconds.items(), key=lambda x: x[1], reverse=True)},
+        "host_active_minutes": {host: round(seconds / 60, 2) for host, seconds in sorted(host_seconds.items())},
+        "overlap_minutes": round((raw_seconds - sum(app_seconds.values())) / 60, 2),
+    }
+    with open(os.path.join(day_folder, SUMMARY_NAME), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def merge_sources(specs, output_folder, since=None, until=None, window=1000):
+    """Merge every day found in any of ``specs``; yields one summary per day."""
+    hosts = {}
+    for spec in specs:
+        host, path = parse_source(spec)
+        if os.path.abspath(output_folder) == path:
+            raise ValueError(f"Output folder {output_folder} is also a source")
+        label, n = host, 2
+        while label in hosts:
+            label, n = f"{host}#{n}", n + 1
+        hosts[label] = source_days(path, since, until)
+
+    days = defaultdict(list)
+    for host, host_days in hosts.items():
+        for day, folder in host_days.items():
+            days[day].append((host, folder))
+    for day in sorted(days):
+        yield merge_day(day, days[day], output_folder, window)
@@ -0,0 +1,193 @@
+"""Low-overhead runtime metrics: counters, gauges and latency histograms."""
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in milliseconds: 10 us doubling up to ~84 s.
+BUCKET_BOUNDS_MS = [0.01 * 2 ** i for i in range(24)]
+
+
+class Counter:
+    """Monotonic count.  Increments are a plain integer add, cheap enough for hook threads."""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Last set value, or the result of ``fn()`` read when a snapshot is taken."""
+
+    def __init__(self, fn=None):
+        self.fn = fn
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        if self.fn is None:
+            return self.value
+        try:
+            return self.fn()
+        except Exception as e:
+            return f"error: {e}"
+
+
+class Histogram:
+    """Fixed log-scale buckets; percentiles are reported as bucket upper bounds."""
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * (len(BUCKET_BOUNDS_MS) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        slot = bisect_left(BUCKET_BOUNDS_MS, ms)
+        with self._lock:
+            self.counts[slot] += 1
+            self.count += 1
+            self.total += ms
+            if ms > self.max:
+                self.max = ms
+
+    def time(self):
+        return _Timer(self)
+
+    @staticmethod
+    def _percentile(counts, count, peak, fraction):
+        rank = max(1, int(count * fraction + 0.5))
+        seen = 0
+        for slot, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKET_BOUNDS_MS[slot], peak) if slot < len(BUCKET_BOUNDS_MS) else peak
+        return peak
+
+    def snapshot(self):
+        with self._lock:
+            counts, count, total, peak = list(self.counts), self.count, self.total, self.max
+        if not count:
+            return {"count": 0}
+        return {
+            "count": count,
+            "mean_ms": round(total / count, 3),
+            "p50_ms": round(self._percentile(counts, count, peak, 0.5), 3),
+            "p90_ms": round(self._percentile(counts, count, peak, 0.9), 3),
+            "p99_ms": round(self._percentile(counts, count, peak, 0.99), 3),
+            "max_ms": round(peak, 3),
+        }
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class MetricsRegistry:
+    """Named metrics for one tracking session.
+
+    ``counter``, ``gauge`` and ``histogram`` create the metric on first use and
+    return the same object afterwards, so call sites can look them up inline.
+    """
+
+    def __init__(self):
+        self.started = datetime.now()
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = factory()
+        return metric
+
+    def counter(self, name):
+        return self._get(name, Counter)
+
+    def gauge(self, name, fn=None):
+        return self._get(name, lambda: Gauge(fn))
+
+    def histogram(self, name):
+        return self._get(name, Histogram)
+
+    def error(self, where, exc):
+        """Count an error under ``errors.<where>.<ExceptionType>``."""
+        self.counter(f"errors.{where}.{type(exc).__name__}").inc()
+
+    def snapshot(self):
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        snapshot = {"counters": {}, "gauges": {}, "histograms": {}}
+        for name, metric in metrics:
+            if isinstance(metric, Counter):
+                snapshot["counters"][name] = metric.snapshot()
+            elif isinstance(metric, Gauge):
+                snapshot["gauges"][name] = metric.snapshot()
+            else:
+                snapshot["histograms"][name] = metric.snapshot()
+        snapshot["timestamp"] = datetime.now().isoformat()
+        snapshot["uptime_seconds"] = round((datetime.now() - self.started).total_seconds(), 1)
+        return snapshot
+
+    def write(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+
+class MetricsServer:
+    """Serves ``GET /metrics`` as JSON on localhost only."""
+
+    def __init__(self, registry, port):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(registry_ref.snapshot(), default=str).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
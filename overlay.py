@@ -0,0 +1,346 @@
+"""Always-on-top goal overlay (Tk), started only when the overlay component is enabled."""
+import tkinter as tk
+from datetime import datetime, timedelta
+
+
+SPARK_WIDTH = 64
+SPARK_HEIGHT = 20
+
+
+class AppleOverlay:
+    def __init__(self, on_goal_change_callback, timeseries=None, sparkline_minutes=30):
+        self.on_goal_change = on_goal_change_callback
+        self.timeseries = timeseries
+        self.sparkline_minutes = max(2, sparkline_minutes)
+        self.spark_canvas = None
+        self.goal = ""
+        self.timer_end = None
+        self.window = None
+        self.drag_start_x = 0
+        self.drag_start_y = 0
+        
+    def create_window(self):
+        self.window = tk.Tk()
+        self.window.title("Focus")
+    
+        screen_width = self.window.winfo_screenwidth()
+        bar_width = 480
+        bar_height = 42
+        
+        self.window.geometry(f"{bar_width}x{bar_height}+{(screen_width - bar_width) // 2}+10")
+        self.window.overrideredirect(True)
+        self.window.attributes('-topmost', True)
+        self.window.attributes('-alpha', 0.95)
+        
+        # Light frame
+        main_frame = tk.Frame(self.window, bg='#E5E5E5', bd=0)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
+        
+        # White content
+        content = tk.Frame(main_frame, bg='#FFFFFF', bd=0)
+        content.pack(fill=tk.BOTH, expand=True)
+        
+        # Drag handle
+        drag_handle = tk.Label(
+            content,
+            text="⋮⋮",
+            font=('Segoe UI', 10),
+            bg='#FFFFFF',
+            fg='#C7C7CC',
+            cursor='fleur',
+            padx=8
+        )
+        drag_handle.pack(side=tk.LEFT)
+        drag_handle.bind('<Button-1>', self.start_drag)
+        drag_handle.bind('<B1-Motion>', self.do_drag)
+        
+        # Goal label
+        self.goal_label = tk.Label(
+            content,
+            text="No goal",
+            font=('Segoe UI', 10),
+            bg='#FFFFFF',
+            fg='#8E8E93',
+            anchor='w',
+            padx=8
+        )
+        self.goal_label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Keystrokes per minute, read from the in-memory time series
+        if self.timeseries:
+            self.spark_canvas = tk.Canvas(
+                content,
+                width=SPARK_WIDTH,
+                height=SPARK_HEIGHT,
+                bg='#FFFFFF',
+                highlightthickness=0
+            )
+            self.spark_canvas.pack(side=tk.LEFT)
+            self.spark_line = self.spark_canvas.create_line(0, SPARK_HEIGHT - 1, SPARK_WIDTH, SPARK_HEIGHT - 1,
+                                                            fill='#007AFF', width=1.5)
+            self.kpm_label = tk.Label(
+                content,
+                text="",
+                font=('Segoe UI', 9),
+                bg='#FFFFFF',
+                fg='#8E8E93',
+                padx=4
+            )
+            self.kpm_label.pack(side=tk.LEFT)
+        
+        # Timer
+        self.timer_label = tk.Label(
+            content,
+            text="",
+            font=('Segoe UI', 13, 'bold'),
+            bg='#FFFFFF',
+            fg='#34C759',
+            padx=12
+        )
+        self.timer_label.pack(side=tk.LEFT)
+        
+        # Settings button
+        settings_btn = tk.Button(
+            content,
+            text="⚙",
+            font=('Segoe UI', 12),
+            bg='#FFFFFF',
+            fg='#007AFF',
+            activebackground='#F2F2F7',
+            activeforeground='#007AFF',
+            relief=tk.FLAT,
+            bd=0,
+            width=2,
+            cursor='hand2',
+            command=self.show_dialog
+        )
+        settings_btn.pack(side=tk.RIGHT, padx=6, pady=6)
+        
+        # Draggable
+        for widget in [content, main_frame, self.goal_label, self.timer_label]:
+            widget.bind('<Button-1>', self.start_drag)
+            widget.bind('<B1-Motion>', self.do_drag)
+        
+        self.update_display()
+        self.keep_on_top()
+    
+    def keep_on_top(self):
+        """Re-assert topmost every 2 seconds"""
+        if self.window:
+            try:
+                self.window.attributes('-topmost', True)
+                self.window.lift()
+                self.window.after(2000, self.keep_on_top)
+            except:
+                pass
+
+    def start_drag(self, event):
+        self.drag_start_x = event.x_root - self.window.winfo_x()
+        self.drag_start_y = event.y_root - self.window.winfo_y()
+    
+    def do_drag(self, event):
+        x = event.x_root - self.drag_start_x
+        y = event.y_root - self.drag_start_y
+        self.window.geometry(f"+{x}+{y}")
+        
+    def set_goal(self, goal, minutes):
+        self.goal = goal
+        if minutes > 0:
+            self.timer_end = datetime.now() + timedelta(minutes=minutes)
+        else:
+            self.timer_end = None
+        
+        if self.on_goal_change:
+            self.on_goal_change(goal, minutes)
+        
+        self.update_display()
+    
+    def update_display(self):
+        if not self.window:
+            return
+        
+        if self.goal:
+            self.goal_label.config(text=f"🎯 {self.goal}", fg='#000000')
+        else:
+            self.goal_label.config(text="No goal - Press ⚙", fg='#8E8E93')
+        
+        if self.timer_end:
+            remaining = (self.timer_end - datetime.now()).total_seconds()
+            if remaining > 0:
+                mins = int(remaining // 60)
+                secs = int(remaining % 60)
+                
+                if mins >= 10:
+                    color = '#34C759'
+                elif mins >= 5:
+                    color = '#FF9500'
+                else:
+                    color = '#FF3B30'
+                
+                self.timer_label.config(text=f"{mins:02d}:{secs:02d}", fg=color)
+            else:
+                self.timer_label.config(text="Done!", fg='#FF3B30')
+        else:
+            self.timer_label.config(text="")
+        
+        if self.spark_canvas:
+            self.update_sparkline()
+        
+        self.window.after(1000, self.update_display)
+    
+    def update_sparkline(self):
+        values = self.timeseries.recent("keystrokes", self.sparkline_minutes)
+        peak = max(max(values), 1)
+        step = (SPARK_WIDTH - 1) / (len(values) - 1)
+        points = []
+        for i, value in enumerate(values):
+            points.extend((i * step, SPARK_HEIGHT - 2 - value / peak * (SPARK_HEIGHT - 4)))
+        self.spark_canvas.coords(self.spark_line, *points)
+        self.kpm_label.config(text=f"{round(self.timeseries.per_minute('keystrokes'))} kpm")
+    
+    def show_dialog(self):
+        dialog = tk.Toplevel(self.window)
+        dialog.title("Set Focus")
+        dialog.geometry("360x240")
+        dialog.configure(bg='#FFFFFF')
+        dialog.attributes('-topmost', True)
+        
+        # Center
+        dialog.update_idletasks()
+        x = (dialog.winfo_screenwidth() // 2) - 180
+        y = (dialog.winfo_screenheight() // 2) - 120
+        dialog.geometry(f"+{x}+{y}")
+        
+        # Title
+        tk.Label(
+            dialog,
+            text="What's your focus?",
+            font=('Segoe UI', 15),
+            bg='#FFFFFF',
+            fg='#000000'
+        ).pack(pady=(25, 10))
+        
+        # Goal input
+        goal_frame = tk.Frame(dialog, bg='#FFFFFF')
+        goal_frame.pack(padx=30, pady=8, fill=tk.X)
+        
+        goal_entry = tk.Entry(
+            goal_frame,
+            font=('Segoe UI', 12),
+            bg='#F2F2F7',
+            fg='#000000',
+            insertbackground='#007AFF',
+            relief=tk.FLAT,
+            bd=0,
+            highlightthickness=1,
+            highlightcolor='#007AFF',
+            highlightbackground='#D1D1D6'
+        )
+        goal_entry.pack(fill=tk.X, ipady=6, ipadx=8)
+        goal_entry.focus()
+        
+        # Timer label
+        tk.Label(
+            dialog,
+            text="Duration (minutes)",
+            font=('Segoe UI', 10),
+            bg='#FFFFFF',
+            fg='#8E8E93'
+        ).pack(pady=(12, 5))
+        
+        # Timer controls
+        timer_frame = tk.Frame(dialog, bg='#FFFFFF')
+        timer_frame.pack(pady=5)
+        
+        timer_entry = tk.Entry(
+            timer_frame,
+            font=('Segoe UI', 12),
+            bg='#F2F2F7',
+            fg='#000000',
+            insertbackground='#007AFF',
+            relief=tk.FLAT,
+            width=6,
+            bd=0,
+            justify='center',
+            highlightthickness=1,
+            highlightcolor='#007AFF',
+            highlightbackground='#D1D1D6'
+        )
+        timer_entry.insert(0, "25")
+        timer_entry.pack(side=tk.LEFT, padx=5, ipady=4)
+        
+        # Quick buttons
+        for mins in [25, 45, 60]:
+            btn = tk.Button(
+                timer_frame,
+                text=str(mins),
+                font=('Segoe UI', 10),
+                bg='#F2F2F7',
+                fg='#007AFF',
+                activebackground='#E5E5EA',
+                relief=tk.FLAT,
+                bd=0,
+                padx=10,
+                pady=3,
+                cursor='hand2',
+                command=lambda m=mins: (timer_entry.delete(0, tk.END), timer_entry.insert(0, str(m)))
+            )
+            btn.pack(side=tk.LEFT, padx=2)
+        
+        def on_submit():
+            goal = goal_entry.get().strip()
+            try:
+                minutes = int(timer_entry.get())
+            except:
+                minutes = 25
+            
+            if goal:
+                self.set_goal(goal, minutes)
+            dialog.destroy()
+        
+        # Buttons
+        btn_frame = tk.Frame(dialog, bg='#FFFFFF')
+        btn_frame.pack(pady=20)
+        
+        # Start button
+        start_btn = tk.Button(
+            btn_frame,
+            text="Start Focus",
+            font=('Segoe UI', 12),
+            bg='#007AFF',
+            fg='#FFFFFF',
+            activebackground='#0051D5',
+            activeforeground='#FFFFFF',
+            relief=tk.FLAT,
+            bd=0,
+            padx=25,
+            pady=8,
+            cursor='hand2',
+            command=on_submit
+        )
+        start_btn.pack(side=tk.LEFT, padx=4)
+        
+        # Cancel button
+        cancel_btn = tk.Button(
+            btn_frame,
+            text="Cancel",
+            font=('Segoe UI', 12),
+            bg='#F2F2F7',
+            fg='#000000',
+            activebackground='#E5E5EA',
+            relief=tk.FLAT,
+            bd=0,
+            padx=20,
+            pady=8,
+            cursor='hand2',
+            command=dialog.destroy
+        )
+        cancel_btn.pack(side=tk.LEFT, padx=4)
+        
+        goal_entry.bind('<Return>', lambda e: on_submit())
+        timer_entry.bind('<Return>', lambda e: on_submit())
+        dialog.bind('<Escape>', lambda e: dialog.destroy())
+    
+    def run(self):
+        self.create_window()
+        self.window.mainloop()
@@ -1,15 +1,33 @@
+import argparse
+import functools
 import os
 import sys
 import time
 from datetime import datetime, timedelta
-from pynput import keyboard, mouse
-from PIL import ImageGrab
 import threading
 import json
 from collections import defaultdict
-import pyperclip
-import psutil
-import tkinter as tk
+
+from activity import ActivityMonitor, create_idle_source
+from blob_store import BlobStore, text_prefix
+from capture_policy import CapturePolicy
+from clipboard_sources import content_digest, create_clipboard_source
+from event_index import INDEX_NAME, EventIndex, day_folders
+from frame_archive import FrameArchive, screenshot_name
+from reports import build_report, day_app_usage
+from retention import RetentionManager
+from rollups import ROLLUP_NAME, RollupEngine, usage_report
+from text_search import TextIndex
+from window_sources import ProcessNameCache, create_window_source
+from journal import log_exists
+from keystroke_buffer import KeystrokeBuffer, LatencySampler
+from merge import merge_sources
+from metrics import MetricsRegistry, MetricsServer
+from scheduler import Scheduler
+from timeseries import TIMESERIES_NAME, MinuteSeries
+from segments import SEGMENT_DIR, migrate_day
+from workers import ProcessRecordWriter, ProcessScreenshotCapture, create_record_writer
+from writer import Record
 
 WINDOW_TRACKING_AVAILABLE = False
 
@@ -27,595 +45,615 @@ else:
     win32gui = None  # type: ignore
     win32process = None  # type: ignore
 
-class AppleOverlay:
-    def __init__(self, on_goal_change_callback):
-        self.on_goal_change = on_goal_change_callback
-        self.goal = ""
-        self.timer_end = None
-        self.window = None
-        self.drag_start_x = 0
-        self.drag_start_y = 0
-        
-    def create_window(self):
-        self.window = tk.Tk()
-        self.window.title("Focus")
-    
-        screen_width = self.window.winfo_screenwidth()
-        bar_width = 480
-        bar_height = 42
-        
-        self.window.geometry(f"{bar_width}x{bar_height}+{(screen_width - bar_width) // 2}+10")
-        self.window.overrideredirect(True)
-        self.window.attributes('-topmost', True)
-        self.window.attributes('-alpha', 0.95)
-        
-        # Light frame
-        main_frame = tk.Frame(self.window, bg='#E5E5E5', bd=0)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=1, pady=1)
-        
-        # White content
-        content = tk.Frame(main_frame, bg='#FFFFFF', bd=0)
-        content.pack(fill=tk.BOTH, expand=True)
-        
-        # Drag handle
-        drag_handle = tk.Label(
-            content,
-            text="⋮⋮",
-            font=('Segoe UI', 10),
-            bg='#FFFFFF',
-            fg='#C7C7CC',
-            cursor='fleur',
-            padx=8
-        )
-        drag_handle.pack(side=tk.LEFT)
-        drag_handle.bind('<Button-1>', self.start_drag)
-        drag_handle.bind('<B1-Motion>', self.do_drag)
-        
-        # Goal label
-        self.goal_label = tk.Label(
-            content,
-            text="No goal",
-            font=('Segoe UI', 10),
-            bg='#FFFFFF',
-            fg='#8E8E93',
-            anchor='w',
-            padx=8
-        )
-        self.goal_label.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        # Timer
-        self.timer_label = tk.Label(
-            content,
-            text="",
-            font=('Segoe UI', 13, 'bold'),
-            bg='#FFFFFF',
-            fg='#34C759',
-            padx=12
-        )
-        self.timer_label.pack(side=tk.LEFT)
-        
-        # Settings button
-        settings_btn = tk.Button(
-            content,
-            text="⚙",
-            font=('Segoe UI', 12),
-            bg='#FFFFFF',
-            fg='#007AFF',
-            activebackground='#F2F2F7',
-            activeforeground='#007AFF',
-            relief=tk.FLAT,
-            bd=0,
-            width=2,
-            cursor='hand2',
-            command=self.show_dialog
-        )
-        settings_btn.pack(side=tk.RIGHT, padx=6, pady=6)
-        
-        # Draggable
-        for widget in [content, main_frame, self.goal_label, self.timer_label]:
-            widget.bind('<Button-1>', self.start_drag)
-            widget.bind('<B1-Motion>', self.do_drag)
-        
-        self.update_display()
-        self.keep_on_top()
-    
-    def keep_on_top(self):
-        """Re-assert topmost every 2 seconds"""
-        if self.window:
-            try:
-                self.window.attributes('-topmost', True)
-                self.window.lift()
-                self.window.after(2000, self.keep_on_top)
-            except:
-                pass
-
-    def start_drag(self, event):
-        self.drag_start_x = event.x_root - self.window.winfo_x()
-        self.drag_start_y = event.y_root - self.window.winfo_y()
-    
-    def do_drag(self, event):
-        x = event.x_root - self.drag_start_x
-        y = event.y_root - self.drag_start_y
-        self.window.geometry(f"+{x}+{y}")
-        
-    def set_goal(self, goal, minutes):
-        self.goal = goal
-        if minutes > 0:
-            self.timer_end = datetime.now() + timedelta(minutes=minutes)
-        else:
-            self.timer_end = None
-        
-        if self.on_goal_change:
-            self.on_goal_change(goal, minutes)
-        
-        self.update_display()
-    
-    def update_display(self):
-        if not self.window:
-            return
-        
-        if self.goal:
-            self.goal_label.config(text=f"🎯 {self.goal}", fg='#000000')
-        else:
-            self.goal_label.config(text="No goal - Press ⚙", fg='#8E8E93')
-        
-        if self.timer_end:
-            remaining = (self.timer_end - datetime.now()).total_seconds()
-            if remaining > 0:
-                mins = int(remaining // 60)
-                secs = int(remaining % 60)
-                
-                if mins >= 10:
-                    color = '#34C759'
-                elif mins >= 5:
-                    color = '#FF9500'
-                else:
-                    color = '#FF3B30'
-                
-                self.timer_label.config(text=f"{mins:02d}:{secs:02d}", fg=color)
-            else:
-                self.timer_label.config(text="Done!", fg='#FF3B30')
-        else:
-            self.timer_label.config(text="")
-        
-        self.window.after(1000, self.update_display)
-    
-    def show_dialog(self):
-        dialog = tk.Toplevel(self.window)
-        dialog.title("Set Focus")
-        dialog.geometry("360x240")
-        dialog.configure(bg='#FFFFFF')
-        dialog.attributes('-topmost', True)
-        
-        # Center
-        dialog.update_idletasks()
-        x = (dialog.winfo_screenwidth() // 2) - 180
-        y = (dialog.winfo_screenheight() // 2) - 120
-        dialog.geometry(f"+{x}+{y}")
-        
-        # Title
-        tk.Label(
-            dialog,
-            text="What's your focus?",
-            font=('Segoe UI', 15),
-            bg='#FFFFFF',
-            fg='#000000'
-        ).pack(pady=(25, 10))
-        
-        # Goal input
-        goal_frame = tk.Frame(dialog, bg='#FFFFFF')
-        goal_frame.pack(padx=30, pady=8, fill=tk.X)
-        
-        goal_entry = tk.Entry(
-            goal_frame,
-            font=('Segoe UI', 12),
-            bg='#F2F2F7',
-            fg='#000000',
-            insertbackground='#007AFF',
-            relief=tk.FLAT,
-            bd=0,
-            highlightthickness=1,
-            highlightcolor='#007AFF',
-            highlightbackground='#D1D1D6'
-        )
-        goal_entry.pack(fill=tk.X, ipady=6, ipadx=8)
-        goal_entry.focus()
-        
-        # Timer label
-        tk.Label(
-            dialog,
-            text="Duration (minutes)",
-            font=('Segoe UI', 10),
-            bg='#FFFFFF',
-            fg='#8E8E93'
-        ).pack(pady=(12, 5))
-        
-        # Timer controls
-        timer_frame = tk.Frame(dialog, bg='#FFFFFF')
-        timer_frame.pack(pady=5)
-        
-        timer_entry = tk.Entry(
-            timer_frame,
-            font=('Segoe UI', 12),
-            bg='#F2F2F7',
-            fg='#000000',
-            insertbackground='#007AFF',
-            relief=tk.FLAT,
-            width=6,
-            bd=0,
-            justify='center',
-            highlightthickness=1,
-            highlightcolor='#007AFF',
-            highlightbackground='#D1D1D6'
-        )
-        timer_entry.insert(0, "25")
-        timer_entry.pack(side=tk.LEFT, padx=5, ipady=4)
-        
-        # Quick buttons
-        for mins in [25, 45, 60]:
-            btn = tk.Button(
-                timer_frame,
-                text=str(mins),
-                font=('Segoe UI', 10),
-                bg='#F2F2F7',
-                fg='#007AFF',
-                activebackground='#E5E5EA',
-                relief=tk.FLAT,
-                bd=0,
-                padx=10,
-                pady=3,
-                cursor='hand2',
-                command=lambda m=mins: (timer_entry.delete(0, tk.END), timer_entry.insert(0, str(m)))
-            )
-            btn.pack(side=tk.LEFT, padx=2)
-        
-        def on_submit():
-            goal = goal_entry.get().strip()
-            try:
-                minutes = int(timer_entry.get())
-            except:
-                minutes = 25
-            
-            if goal:
-                self.set_goal(goal, minutes)
-            dialog.destroy()
-        
-        # Buttons
-        btn_frame = tk.Frame(dialog, bg='#FFFFFF')
-        btn_frame.pack(pady=20)
-        
-        # Start button
-        start_btn = tk.Button(
-            btn_frame,
-            text="Start Focus",
-            font=('Segoe UI', 12),
-            bg='#007AFF',
-            fg='#FFFFFF',
-            activebackground='#0051D5',
-            activeforeground='#FFFFFF',
-            relief=tk.FLAT,
-            bd=0,
-            padx=25,
-            pady=8,
-            cursor='hand2',
-            command=on_submit
-        )
-        start_btn.pack(side=tk.LEFT, padx=4)
-        
-        # Cancel button
-        cancel_btn = tk.Button(
-            btn_frame,
-            text="Cancel",
-            font=('Segoe UI', 12),
-            bg='#F2F2F7',
-            fg='#000000',
-            activebackground='#E5E5EA',
-            relief=tk.FLAT,
-            bd=0,
-            padx=20,
-            pady=8,
-            cursor='hand2',
-            command=dialog.destroy
-        )
-        cancel_btn.pack(side=tk.LEFT, padx=4)
-        
-        goal_entry.bind('<Return>', lambda e: on_submit())
-        timer_entry.bind('<Return>', lambda e: on_submit())
-        dialog.bind('<Escape>', lambda e: dialog.destroy())
-    
-    def run(self):
-        self.create_window()
-        self.window.mainloop()
+# Capture sources and the overlay; each is imported only when enabled.
+COMPONENTS = ("keyboard", "mouse", "window", "clipboard", "screenshots", "overlay")
+
+
+def enabled_components(config):
+    components = dict.fromkeys(COMPONENTS, True)
+    components.update(config.get('components') or {})
+    if config.get('headless'):
+        components['overlay'] = False
+    return {name for name in COMPONENTS if components.get(name)}
+
 
 class ActivityTracker:
-    def __init__(self, log_folder, keystroke_interval=15):
+    def __init__(self, log_folder, keystroke_interval=15, config=None):
         self.log_folder = log_folder
+        self.config = config or {}
+        self.components = enabled_components(self.config)
         self.today_folder = os.path.join(log_folder, datetime.now().strftime('%Y-%m-%d'))
         self.screenshot_folder = os.path.join(self.today_folder, "screenshots")
         
-        self.activity_log_file = os.path.join(self.today_folder, "activity_log.json")
+        self.activity_log_file = os.path.join(self.today_folder, "activity_log.jsonl")
         self.keylog_file = os.path.join(self.today_folder, "keystrokes.txt")
         self.clipboard_file = os.path.join(self.today_folder, "clipboard.txt")
         self.window_log_file = os.path.join(self.today_folder, "windows.txt")
         self.events_file = os.path.join(self.today_folder, "events.txt")
         self.app_usage_file = os.path.join(self.today_folder, "app_usage_summary.json")
         self.session_summary_file = os.path.join(self.today_folder, "session_summary.json")
+        self.sessions_folder = os.path.join(self.today_folder, "sessions")
+        self.metrics_file = os.path.join(self.today_folder, "metrics.json")
         
-        os.makedirs(self.screenshot_folder, exist_ok=True)
+        os.makedirs(self.today_folder, exist_ok=True)
         
-        if not os.path.exists(self.activity_log_file):
-            with open(self.activity_log_file, 'w') as f:
-                json.dump([], f)
+        self.metrics = MetricsRegistry()
+        self.metrics_interval = self.config.get('metrics_interval_seconds', 30)
+        self.metrics_server = None
+        self.scheduler = Scheduler(workers=self.config.get('scheduler_workers', 2), metrics=self.metrics,
+                                   io_workers=self.config.get('scheduler_io_workers', 2))
+        self.screenshot_interval = self.config.get('screenshot_interval_seconds', 120)
+        self.stats_interval = self.config.get('status_interval_seconds', 300)
+        self.stop_requested = threading.Event()
+        if self.config.get('journal_format', 'jsonl') == 'segments':
+            self.activity_log_file = os.path.join(self.today_folder, SEGMENT_DIR)
+        # With process isolation, persistence and screenshot capture run in supervised worker processes
+        self.process_isolation = bool(self.config.get('process_isolation', False))
+        self.worker_restarts = {}
+        if self.process_isolation:
+            self.writer = ProcessRecordWriter(self.config, log_folder, self.activity_log_file)
+            self.metrics.gauge("writer", self.writer.stats)
+        else:
+            self.writer = create_record_writer(self.config, log_folder, self.activity_log_file, self.metrics)
         
-        self.log_lock = threading.Lock()
-        self.keystroke_buffer = []
+        self.keystroke_buffer = KeystrokeBuffer()
+        self.hook_latency = LatencySampler()
+        self.ctrl_keys = set()
+        self.special_keys = {}
+        self.backspace_key = None
+        if "keyboard" in self.components:
+            from pynput import keyboard
+
+            self.ctrl_keys = {keyboard.Key.ctrl_l, keyboard.Key.ctrl_r}
+            self.special_keys = {
+                keyboard.Key.enter: '\n',
+                keyboard.Key.tab: '\t',
+                keyboard.Key.space: ' ',
+                keyboard.Key.delete: '[delete]',
+                keyboard.Key.esc: '[esc]',
+            }
+            self.backspace_key = keyboard.Key.backspace
         self.keystroke_interval = keystroke_interval
-        self.last_clipboard = ""
+        self.last_clipboard_digest = None
+        self.clipboard_blobs = BlobStore(
+            os.path.join(self.today_folder, "clipboard_blobs"),
+            max_bytes=self.config.get('clipboard_max_bytes', 1_000_000),
+            preview_chars=self.config.get('clipboard_preview_chars', 200),
+            write=self.write_blob
+        )
         self.current_window = ""
         self.current_app = ""
+        self.current_title = ""
         self.app_usage_time = defaultdict(float)
         self.last_window_check = datetime.now()
         self.session_start = datetime.now()
         self.keystroke_count = 0
         self.screenshot_count = 0
-        self.last_activity = datetime.now()
+        self.rollups = RollupEngine(os.path.join(self.today_folder, ROLLUP_NAME), self.config.get('title_classes'))
+        self.rollup_interval = self.config.get('rollup_checkpoint_seconds', 60)
+        # Per-minute counters for the overlay sparkline; saved with the rollups
+        self.timeseries_file = os.path.join(self.today_folder, TIMESERIES_NAME)
+        self.timeseries = MinuteSeries(self.config.get('timeseries_minutes', 1440))
+        self.timeseries.load(self.timeseries_file, self.session_start.date())
+        idle_source = None
+        if self.config.get('idle_source', 'auto') != 'hooks':
+            idle_source = create_idle_source()
+        self.activity = ActivityMonitor(
+            idle_threshold=self.config.get('idle_threshold_seconds', 60),
+            idle_source=idle_source,
+            on_idle_start=self.on_idle_start,
+            on_idle_end=self.on_idle_end
+        )
         
-        self.goal_overlay = AppleOverlay(self.log_goal_change)
+        self.goal_overlay = None
+        self.goal_changes = 0
+        if "overlay" in self.components:
+            from overlay import AppleOverlay
+
+            self.goal_overlay = AppleOverlay(self.log_goal_change, self.timeseries,
+                                             self.config.get('overlay_sparkline_minutes', 30))
         self.ctrl_pressed = False
-        self.window_tracking_enabled = WINDOW_TRACKING_AVAILABLE
+        self.process_names = ProcessNameCache()
+        self.window_source = None
+        if "window" in self.components:
+            self.window_source = create_window_source(
+                self.config.get('window_source', 'auto'),
+                poll_info=self.get_active_window_info if WINDOW_TRACKING_AVAILABLE else None,
+                poll_interval=self.config.get('window_poll_seconds', 2),
+                process_names=self.process_names
+            )
+        self.window_tracking_enabled = self.window_source is not None
+        self.clipboard_source = None
+        if "clipboard" in self.components:
+            self.clipboard_source = create_clipboard_source(
+                self.config.get('clipboard_source', 'auto'),
+                interval=self.config.get('clipboard_poll_seconds', 1)
+            )
         self.multi_monitor_capture = True
+        self.change_detector = None
+        self.last_screenshot_file = None
+        self.encoder = None
+        self.frame_archive = None
+        self.capture_worker = None
+        self.capture_policy = None
+        if "screenshots" in self.components:
+            self.setup_screenshots()
+
+        self.metrics.gauge("keystrokes.hook_latency", self.hook_latency.percentiles)
+        self.metrics.gauge("keystrokes.buffered", lambda: len(self.keystroke_buffer))
+        self.metrics.gauge("activity.idle", lambda: self.activity.is_idle)
+        if self.change_detector:
+            self.metrics.gauge("screenshot.dedupe", self.change_detector.stats)
+        self.metrics.gauge("clipboard.blobs", self.clipboard_blobs.stats)
+        self.metrics.gauge("scheduler.jobs", self.scheduler.stats)
+        
+        self.retention = None
+        if self.config.get('retention_enabled', True):
+            budget_mb = self.config.get('retention_disk_budget_mb')
+            self.retention = RetentionManager(
+                log_folder,
+                today=os.path.basename(self.today_folder),
+                compress_after_days=self.config.get('retention_compress_after_days', 1),
+                thin_after_days=self.config.get('retention_thin_after_days'),
+                thin_keep_minutes=self.config.get('retention_thin_keep_minutes', 10),
+                disk_budget_bytes=budget_mb * 1024 * 1024 if budget_mb else None,
+                io_bytes_per_sec=self.config.get('retention_io_mb_per_sec', 8) * 1024 * 1024
+            )
+            self.retention_interval = self.config.get('retention_interval_seconds', 600)
+            self.metrics.gauge("retention", self.retention.stats)
 
         self.log_event("system", "session_started", {})
 
-        if not self.window_tracking_enabled:
-            print("Window tracking disabled: win32 APIs not available on this platform.")
+        if "window" in self.components and not self.window_tracking_enabled:
+            print("Window tracking disabled: no window source available on this platform.")
             self.log_event("system", "window_tracking_unavailable", {"platform": sys.platform})
 
-        with open(self.keylog_file, 'a', encoding='utf-8') as f:
-            f.write(f"\n=== Session started: {self.session_start.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
-        with open(self.events_file, 'a', encoding='utf-8') as f:
-            f.write(f"\n[{self.session_start.strftime('%Y-%m-%d %H:%M:%S')}] Session started\n")
+        self.write_text("input", self.keylog_file,
+                        f"\n=== Session started: {self.session_start.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+        self.write_text("system", self.events_file,
+                        f"\n[{self.session_start.strftime('%Y-%m-%d %H:%M:%S')}] Session started\n")
         
         self.running = True
     
+    def setup_screenshots(self):
+        from encoding import encoding_options
+
+        os.makedirs(self.screenshot_folder, exist_ok=True)
+        if self.process_isolation:
+            self.capture_worker = ProcessScreenshotCapture({
+                "encoding": encoding_options(self.config),
+                "screenshot_folder": self.screenshot_folder,
+                "change_detection": self.config.get('screenshot_change_detection', True),
+                "change_threshold": self.config.get('screenshot_change_threshold', 0.005)
+            }, self.on_capture_result)
+            self.metrics.gauge("screenshot.worker", self.capture_worker.stats)
+        else:
+            from PIL import ImageGrab
+            from change_detection import ChangeDetector
+            from encoding import ScreenshotEncoder
+
+            self.image_grab = ImageGrab
+            if self.config.get('screenshot_change_detection', True):
+                self.change_detector = ChangeDetector(
+                    threshold=self.config.get('screenshot_change_threshold', 0.005)
+                )
+            self.encoder = ScreenshotEncoder(
+                encoding_options(self.config),
+                workers=self.config.get('screenshot_encode_workers', 1)
+            )
+            if self.encoder.options["storage"] == "archive":
+                self.frame_archive = FrameArchive(self.screenshot_folder)
+        self.capture_policy = CapturePolicy(
+            region=self.config.get('screenshot_region', 'all'),
+            on_window_change=self.config.get('screenshot_on_window_change', False),
+            min_gap=self.config.get('screenshot_min_gap_seconds', 15),
+            idle_backoff=self.config.get('screenshot_idle_backoff', 2.0),
+            max_idle_interval=self.config.get('screenshot_idle_max_seconds', 1800)
+        )
+        self.current_screenshot_interval = self.screenshot_interval
+        self.metrics.gauge("screenshot.policy", self.capture_policy.stats)
+    
     def log_goal_change(self, goal, minutes):
-        self.log_event("goal", "goal_set", {
+        # Called on the Tk thread: a full writer queue blocks "goal" records, so submit from a scheduler worker
+        self.goal_changes += 1
+        self.scheduler.once(f"goal_set_{self.goal_changes}", 0, functools.partial(self.log_event, "goal", "goal_set", {
             "goal": goal,
             "timer_minutes": minutes,
             "timer_end": (datetime.now() + timedelta(minutes=minutes)).isoformat() if minutes > 0 else None
-        })
+        }), blocking=True)
         print(f"Goal set: {goal} ({minutes} minutes)")
     
     def log_event(self, event_type, event_name, data):
+        self.metrics.counter(f"events.{event_type}").inc()
         try:
-            with self.log_lock:
-                with open(self.activity_log_file, 'r') as f:
-                    log = json.load(f)
-                
-                event = {
-                    "timestamp": datetime.now().isoformat(),
-                    "event_type": event_type,
-                    "event_name": event_name,
-                    "data": data
-                }
-                log.append(event)
-                
-                with open(self.activity_log_file, 'w') as f:
-                    json.dump(log, f, indent=2)
+            self.writer.submit(Record(event_type, "event", event_name, {
+                "timestamp": datetime.now().isoformat(),
+                "event_type": event_type,
+                "event_name": event_name,
+                "data": data
+            }))
         except Exception as e:
             print(f"Log event error: {e}")
+            self.metrics.error("log_event", e)
     
-    def take_screenshot(self):
-        while self.running:
+    def write_text(self, source, path, text, index_text=None):
+        meta = None
+        if index_text is not None:
+            meta = {
+                "text": index_text,
+                "timestamp": datetime.now().isoformat(),
+                "app": self.current_app or None,
+                "window_title": self.current_title or None
+            }
+        try:
+            self.writer.submit(Record(source, "text", path, text, meta))
+        except Exception as e:
+            print(f"Write error: {e}")
+            self.metrics.error("write_text", e)
+    
+    def write_blob(self, path, data):
+        # Up to clipboard_max_bytes; written by the writer stage, not the clipboard thread
+        try:
+            self.writer.submit(Record("clipboard_blob", "blob", path, data))
+        except Exception as e:
+            print(f"Write error: {e}")
+            self.metrics.error("write_blob", e)
+    
+    def take_screenshot(self, trigger="timer"):
+        try:
+            self.capture_screenshot(trigger)
+        except Exception as e:
+            print(f"Screenshot error: {e}")
+            self.metrics.error("screenshot", e)
+        
+        if trigger == "timer" and self.activity.is_idle:
+            interval = self.capture_policy.idle_interval(self.screenshot_interval, self.current_screenshot_interval)
+            if interval != self.current_screenshot_interval:
+                self.current_screenshot_interval = interval
+                self.scheduler.set_interval("screenshot", interval)
+    
+    def capture_screenshot(self, trigger="timer"):
+        captured_at = datetime.now()
+        region = self.capture_policy.region_for_capture()
+        if self.capture_worker:
+            if self.capture_worker.request(trigger, region, captured_at):
+                self.capture_policy.record_capture(trigger)
+            return
+        bbox = tuple(region["bbox"]) if region["bbox"] else None
+
+        with self.metrics.histogram("screenshot.grab_ms").time():
             try:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-                try:
-                    if self.multi_monitor_capture:
-                        screenshot = ImageGrab.grab(all_screens=True)
-                    else:
-                        screenshot = ImageGrab.grab()
-                except TypeError:
-                    screenshot = ImageGrab.grab()
-                    self.multi_monitor_capture = False
-
-                filename = os.path.join(self.screenshot_folder, f"screenshot_{timestamp}.png")
-                screenshot.save(filename)
-                self.screenshot_count += 1
-                
-                self.log_event("screenshot", "captured", {
-                    "filename": f"screenshot_{timestamp}.png",
-                    "path": filename
+                if self.multi_monitor_capture:
+                    # Monitor and window bounds are virtual-desktop coordinates
+                    screenshot = self.image_grab.grab(bbox=bbox, all_screens=True)
+                else:
+                    screenshot = self.image_grab.grab(bbox=bbox)
+            except TypeError:
+                screenshot = self.image_grab.grab(bbox=bbox)
+                self.multi_monitor_capture = False
+        self.capture_policy.record_capture(trigger)
+
+        if self.change_detector:
+            changed, difference = self.change_detector.check(screenshot)
+            if not changed and self.last_screenshot_file:
+                self.metrics.counter("screenshot.duplicates").inc()
+                self.log_event("screenshot", "duplicate", {
+                    "duplicate_of": self.last_screenshot_file,
+                    "difference": difference,
+                    "trigger": trigger,
+                    "region": region
                 })
-                
-                print(f"Screenshot saved: {filename}")
-            except Exception as e:
-                print(f"Screenshot error: {e}")
-            
-            time.sleep(120)
+                return
+
+        name = screenshot_name(captured_at, self.encoder.extension)
+        self.last_screenshot_file = name
+        self.encoder.submit(screenshot, os.path.join(self.screenshot_folder, name),
+                            functools.partial(self.on_screenshot_encoded, captured_at=captured_at,
+                                              trigger=trigger, region=region))
     
-    def save_keystroke_buffer(self):
-        while self.running:
-            time.sleep(self.keystroke_interval)
+    def on_screenshot_encoded(self, filename, result, error, captured_at=None, trigger="timer", region=None):
+        if error is not None:
+            print(f"Screenshot encode error: {error}")
+            self.metrics.error("screenshot_encode", error)
+            return
+        self.metrics.histogram("screenshot.encode_ms").observe(result["encode_ms"])
+
+        if self.frame_archive:
+            data = result.pop("data")
+            result["archive_index"] = self.frame_archive.append(
+                captured_at.timestamp(), data, result["width"], result["height"], self.encoder.output_format)
+            result["archive"] = self.frame_archive.pack_path
+
+        self.screenshot_count += 1
+        data = {
+            "filename": os.path.basename(filename),
+            "path": filename,
+            "format": self.encoder.output_format,
+            "trigger": trigger,
+            "region": region
+        }
+        data.update(result)
+        self.log_event("screenshot", "captured", data)
+        
+        print(f"Screenshot saved: {filename} ({result['size_bytes'] // 1024} KB, {result['encode_ms']} ms)")
+    
+    def on_capture_result(self, kind, data, info):
+        # Runs on the capture worker's collector thread
+        if info.get("grab_ms") is not None:
+            self.metrics.histogram("screenshot.grab_ms").observe(info["grab_ms"])
+        if kind == "error":
+            print(f"Screenshot error: {data}")
+            self.metrics.error("screenshot", data)
+        elif kind == "duplicate":
+            self.metrics.counter("screenshot.duplicates").inc()
+            self.log_event("screenshot", "duplicate", data)
+        else:
+            self.metrics.histogram("screenshot.encode_ms").observe(data["encode_ms"])
+            self.screenshot_count += 1
+            self.log_event("screenshot", "captured", data)
+            print(f"Screenshot saved: {data['path']} ({data['size_bytes'] // 1024} KB, {data['encode_ms']} ms)")
+    
+    def supervise_workers(self):
+        for name, proxy in (("persistence", self.writer), ("capture", self.capture_worker)):
+            if proxy is None:
+                continue
+            proxy.check()
+            # The writer may also have restarted its worker itself from submit()
+            worker = proxy.worker
+            if worker.restarts == self.worker_restarts.get(name, 0):
+                continue
+            self.metrics.counter(f"workers.{name}.restarts").inc(worker.restarts - self.worker_restarts.get(name, 0))
+            self.worker_restarts[name] = worker.restarts
+            print(f"The {name} worker exited with code {worker.last_exitcode}; restarted ({worker.restarts} so far)")
+            self.log_event("system", "worker_restarted", {
+                "worker": name, "exitcode": worker.last_exitcode, "restarts": worker.restarts, "lost": worker.lost
+            })
+    
+    def flush_keystrokes(self):
+        keys = self.keystroke_buffer.swap()
+        if not keys:
+            return
+        try:
+            keystroke_text = ''.join(keys)
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            self.log_event("input", "keystrokes", {
+                "text": keystroke_text,
+                "length": len(keys)
+            })
             
-            if self.keystroke_buffer:
-                try:
-                    keystroke_text = ''.join(self.keystroke_buffer)
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    self.log_event("input", "keystrokes", {
-                        "text": keystroke_text,
-                        "length": len(self.keystroke_buffer)
-                    })
-                    
-                    with open(self.keylog_file, 'a', encoding='utf-8') as f:
-                        f.write(f"[{timestamp}] {keystroke_text}\n")
-                    
-                    print(f"Logged {len(self.keystroke_buffer)} keystrokes")
-                    self.keystroke_buffer.clear()
-                except Exception as e:
-                    print(f"Keylog error: {e}")
+            self.write_text("input", self.keylog_file, f"[{timestamp}] {keystroke_text}\n",
+                            index_text=keystroke_text)
+            
+            self.rollups.add_keystrokes(len(keys))
+            self.metrics.counter("keystrokes.flushed").inc(len(keys))
+            print(f"Logged {len(keys)} keystrokes")
+        except Exception as e:
+            print(f"Keylog error: {e}")
+            self.metrics.error("keystrokes", e)
     
     def on_press(self, key):
+        # Runs on the OS input hook thread: keep it to dict lookups and appends.
+        start = time.perf_counter()
         try:
             self.keystroke_count += 1
-            self.last_activity = datetime.now()
+            self.activity.mark_input()
+            self.timeseries.add("keystrokes")
+            char = getattr(key, 'char', None)
             
-            if key == keyboard.Key.ctrl_l or key == keyboard.Key.ctrl_r:
+            if key in self.ctrl_keys:
                 self.ctrl_pressed = True
-            elif self.ctrl_pressed:
-                if hasattr(key, 'char') and key.char and key.char.lower() == 'q':
+            else:
+                if self.ctrl_pressed and char and char.lower() == 'q':
                     print("Ctrl+Q detected!")
                     if self.goal_overlay and self.goal_overlay.window:
                         self.goal_overlay.window.after(0, self.goal_overlay.show_dialog)
                     self.ctrl_pressed = False
                     return
+                self.ctrl_pressed = False
             
-            if key != keyboard.Key.ctrl_l and key != keyboard.Key.ctrl_r:
-                if not (hasattr(key, 'char') and key.char and key.char.lower() == 'q'):
-                    self.ctrl_pressed = False
-            
-            try:
-                self.keystroke_buffer.append(key.char)
-            except AttributeError:
-                if key == keyboard.Key.backspace:
-                    if self.keystroke_buffer:
-                        self.keystroke_buffer.pop()
-                elif key == keyboard.Key.enter:
-                    self.keystroke_buffer.append('\n')
-                elif key == keyboard.Key.tab:
-                    self.keystroke_buffer.append('\t')
-                elif key == keyboard.Key.space:
-                    self.keystroke_buffer.append(' ')
-                elif key in [keyboard.Key.delete, keyboard.Key.esc]:
-                    self.keystroke_buffer.append(f"[{key.name}]")
+            if char is not None:
+                self.keystroke_buffer.append(char)
+            elif key == self.backspace_key:
+                self.keystroke_buffer.backspace()
+            else:
+                text = self.special_keys.get(key)
+                if text:
+                    self.keystroke_buffer.append(text)
         except Exception as e:
             print(f"Key capture error: {e}")
+            self.metrics.error("key_hook", e)
+        finally:
+            self.hook_latency.record((time.perf_counter() - start) * 1e6)
     
     def on_release(self, key):
-        if key == keyboard.Key.ctrl_l or key == keyboard.Key.ctrl_r:
+        if key in self.ctrl_keys:
             self.ctrl_pressed = False
     
     def get_active_window_info(self):
-        if not self.window_tracking_enabled or not WINDOW_TRACKING_AVAILABLE or win32gui is None:
+        if not WINDOW_TRACKING_AVAILABLE or win32gui is None:
             return "Unavailable", "Unavailable"
 
         try:
             hwnd = win32gui.GetForegroundWindow()
             window_title = win32gui.GetWindowText(hwnd)
             _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
-            app_name = process.name()
+            app_name = self.process_names.name(pid)
             return app_name, window_title
         except Exception:
             return "Unknown", "Unknown"
 
-    def track_window_activity(self):
-        if not self.window_tracking_enabled:
+    def on_window_change(self, app_name, window_title, current_time):
+        window_info = f"{app_name} - {window_title}"
+        if window_info == self.current_window:
             return
 
-        while self.running:
-            try:
-                app_name, window_title = self.get_active_window_info()
-                current_time = datetime.now()
-                
-                window_info = f"{app_name} - {window_title}"
-                if window_info != self.current_window and window_title not in {"Unknown", "Unavailable"}:
-                    time_spent = 0
-                    if self.current_window:
-                        time_spent = (current_time - self.last_window_check).total_seconds()
-                        self.app_usage_time[self.current_app] += time_spent
-                    
-                    timestamp = current_time.strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    self.log_event("window", "changed", {
-                        "app": app_name,
-                        "window_title": window_title,
-                        "previous_app": self.current_app if self.current_app else None,
-                        "time_on_previous": round(time_spent, 2)
-                    })
-                    
-                    with open(self.window_log_file, 'a', encoding='utf-8') as f:
-                        f.write(f"[{timestamp}] {app_name} → {window_title}\n")
-                    
-                    print(f"Window: {app_name} - {window_title[:50]}")
-                    
-                    self.current_window = window_info
-                    self.current_app = app_name
-                    self.last_window_check = current_time
-                
-            except Exception as e:
-                print(f"Window tracking error: {e}")
-            
-            time.sleep(2)
+        time_spent = 0
+        if self.current_window and not self.activity.is_idle:
+            time_spent = max(0.0, (current_time - self.last_window_check).total_seconds())
+            self.app_usage_time[self.current_app] += time_spent
+        
+        timestamp = current_time.strftime('%Y-%m-%d %H:%M:%S')
+        
+        self.log_event("window", "changed", {
+            "app": app_name,
+            "window_title": window_title,
+            "previous_app": self.current_app if self.current_app else None,
+            "time_on_previous": round(time_spent, 2),
+            "source": self.window_source.name
+        })
+        
+        self.write_text("window", self.window_log_file, f"[{timestamp}] {app_name} → {window_title}\n")
+        
+        print(f"Window: {app_name} - {window_title[:50]}")
+        
+        self.metrics.counter("window.changes").inc()
+        self.timeseries.add("window_switches", when=current_time)
+        self.current_window = window_info
+        self.current_app = app_name
+        self.current_title = window_title
+        self.rollups.set_foreground(app_name, window_title, current_time)
+        self.last_window_check = current_time
+        
+        if self.capture_policy and self.capture_policy.allow_window_change():
+            # Re-armed on every switch, so rapid switching yields one capture of where the user landed
+            self.scheduler.once("screenshot_window_change",
+                                self.config.get('screenshot_window_change_delay', 1.0),
+                                functools.partial(self.take_screenshot, "window_change"), blocking=True)
     
     def on_mouse_event(self, x, y):
-        self.last_activity = datetime.now()
+        self.activity.mark_input()
+        self.timeseries.add("mouse")
     
     def on_mouse_click(self, x, y, button, pressed):
         if pressed:
-            self.last_activity = datetime.now()
+            self.activity.mark_input()
+            self.timeseries.add("mouse")
+    
+    def on_idle_start(self, idle_since):
+        # Bill the foreground app only up to the last input.
+        billed = 0.0
+        if self.current_app and idle_since > self.last_window_check:
+            billed = (idle_since - self.last_window_check).total_seconds()
+            self.app_usage_time[self.current_app] += billed
+            self.last_window_check = idle_since
+        self.rollups.pause(idle_since)
+        
+        self.log_event("activity", "idle_started", {
+            "idle_since": idle_since.isoformat(),
+            "app": self.current_app or None,
+            "billed_seconds": round(billed, 2)
+        })
+        print(f"Idle since {idle_since.strftime('%H:%M:%S')}")
+    
+    def on_idle_end(self, idle_since, idle_ended):
+        self.last_window_check = idle_ended
+        if self.capture_policy and self.current_screenshot_interval != self.screenshot_interval:
+            self.current_screenshot_interval = self.screenshot_interval
+            self.scheduler.set_interval("screenshot", self.screenshot_interval)
+        self.rollups.resume(idle_ended)
+        self.timeseries.add_span("idle_seconds", idle_since, idle_ended)
+        
+        idle_seconds = round((idle_ended - idle_since).total_seconds(), 2)
+        self.log_event("activity", "idle_ended", {
+            "idle_since": idle_since.isoformat(),
+            "idle_ended": idle_ended.isoformat(),
+            "idle_seconds": idle_seconds,
+            "app": self.current_app or None
+        })
+        print(f"Active again after {round(idle_seconds / 60, 1)} min idle")
     
     def start_mouse_listener(self):
+        from pynput import mouse
+
         with mouse.Listener(on_move=self.on_mouse_event, on_click=self.on_mouse_click) as listener:
             listener.join()
     
-    def monitor_clipboard(self):
-        while self.running:
-            try:
-                current_clipboard = pyperclip.paste()
-                
-                if current_clipboard != self.last_clipboard and current_clipboard.strip():
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    self.log_event("clipboard", "changed", {
-                        "content": current_clipboard,
-                        "length": len(current_clipboard)
-                    })
-                    
-                    with open(self.clipboard_file, 'a', encoding='utf-8') as f:
-                        f.write(f"\n[{timestamp}] CLIPBOARD:\n{current_clipboard}\n")
-                        f.write("-" * 50 + "\n")
-                    
-                    print(f"Clipboard logged ({len(current_clipboard)} chars)")
-                    self.last_clipboard = current_clipboard
-                    
-            except Exception as e:
-                print(f"Clipboard error: {e}")
-            
-            time.sleep(1)
+    def on_clipboard_change(self, current_clipboard, changed_at):
+        if not current_clipboard.strip():
+            return
+        digest = content_digest(current_clipboard)
+        if digest == self.last_clipboard_digest:
+            return
+
+        timestamp = changed_at.strftime('%Y-%m-%d %H:%M:%S')
+        blob = self.clipboard_blobs.put(current_clipboard, digest)
+        blob["source"] = self.clipboard_source.name
+        
+        self.log_event("clipboard", "changed", blob)
+        
+        flags = "".join([", repeat" if blob["duplicate"] else "", ", truncated" if blob["truncated"] else ""])
+        self.write_text("clipboard", self.clipboard_file,
+                        f"\n[{timestamp}] CLIPBOARD sha256:{digest} ({blob['length']} chars{flags}):\n"
+                        f"{blob['preview']}\n" + "-" * 50 + "\n",
+                        index_text=text_prefix(current_clipboard, self.clipboard_blobs.max_bytes))
+        
+        self.metrics.counter("clipboard.changes").inc()
+        print(f"Clipboard logged ({len(current_clipboard)} chars{flags})")
+        self.last_clipboard_digest = digest
     
     def start_keylogger(self):
+        from pynput import keyboard
+
         with keyboard.Listener(on_press=self.on_press, on_release=self.on_release) as listener:
             listener.join()
     
     def save_session_stats(self):
-        while self.running:
-            time.sleep(300)
+        try:
+            session_duration = (datetime.now() - self.session_start).total_seconds()
+            idle_time = self.activity.idle_seconds()
+            is_idle = self.activity.is_idle
             
-            try:
-                session_duration = (datetime.now() - self.session_start).total_seconds()
-                idle_time = (datetime.now() - self.last_activity).total_seconds()
-                is_idle = idle_time > 60
-                
-                self.log_event("status", "activity_check", {
-                    "session_duration_minutes": round(session_duration / 60, 2),
-                    "idle_seconds": round(idle_time, 2),
-                    "is_idle": is_idle,
-                    "keystrokes_total": self.keystroke_count,
-                    "screenshots_total": self.screenshot_count,
-                    "current_app": self.current_app,
-                    "current_window": self.current_window[:100] if self.current_window else ""
-                })
-                
-                idle_status = "IDLE" if is_idle else "ACTIVE"
-                print(f"Status: {round(session_duration / 60, 2)}min, {idle_status}, App: {self.current_app}")
-            except Exception as e:
-                print(f"Stats error: {e}")
+            self.log_event("status", "activity_check", {
+                "session_duration_minutes": round(session_duration / 60, 2),
+                "idle_seconds": round(idle_time, 2),
+                "is_idle": is_idle,
+                "keystrokes_total": self.keystroke_count,
+                "keystrokes_per_minute": round(self.timeseries.per_minute("keystrokes"), 1),
+                "screenshots_total": self.screenshot_count,
+                "current_app": self.current_app,
+                "current_window": self.current_window[:100] if self.current_window else "",
+                "writer": self.writer.stats(),
+                "keystroke_hook_latency": self.hook_latency.percentiles()
+            })
+            
+            idle_status = "IDLE" if is_idle else "ACTIVE"
+            print(f"Status: {round(session_duration / 60, 2)}min, {idle_status}, App: {self.current_app}")
+        except Exception as e:
+            print(f"Stats error: {e}")
+            self.metrics.error("stats", e)
+    
+    def checkpoint_rollups(self):
+        try:
+            self.rollups.checkpoint()
+            self.timeseries.save(self.timeseries_file, self.session_start.date())
+        except Exception as e:
+            print(f"Rollup checkpoint error: {e}")
+            self.metrics.error("rollups", e)
+    
+    def save_metrics(self):
+        try:
+            self.metrics.write(self.metrics_file)
+        except Exception as e:
+            print(f"Metrics write error: {e}")
+    
+    def run_retention(self):
+        if not self.running:
+            # A pending continuation is run when the scheduler stops; don't hold up shutdown
+            return
+        try:
+            with self.metrics.histogram("retention.run_ms").time():
+                pending = self.retention.run_once()
+            # Keep going in short slices until caught up, then fall back to the normal interval
+            if pending and self.running:
+                self.scheduler.once("retention_continue", 5, self.run_retention, blocking=True)
+        except Exception as e:
+            self.metrics.error("retention", e)
+            print(f"Retention error: {e}")
     
     def save_session_summary(self):
         try:
-            if self.current_app:
+            if self.current_app and not self.activity.is_idle:
                 time_spent = (datetime.now() - self.last_window_check).total_seconds()
                 self.app_usage_time[self.current_app] += time_spent
             
@@ -631,11 +669,36 @@ class ActivityTracker:
                 "total_keystrokes": self.keystroke_count,
                 "total_screenshots": self.screenshot_count,
                 "app_usage_minutes": app_usage_minutes,
-                "top_apps": sorted(app_usage_minutes.items(), key=lambda x: x[1], reverse=True)[:5]
+                "top_apps": sorted(app_usage_minutes.items(), key=lambda x: x[1], reverse=True)[:5],
+                "writer": self.writer.stats(),
+                "keystroke_hook_latency": self.hook_latency.percentiles()
             }
+            if self.change_detector:
+                summary["screenshot_dedupe"] = self.change_detector.stats()
+            elif self.capture_worker and self.capture_worker.dedupe_stats():
+                summary["screenshot_dedupe"] = self.capture_worker.dedupe_stats()
+            if self.capture_worker:
+                summary["capture_worker"] = self.capture_worker.stats()
+            summary["clipboard_blobs"] = self.clipboard_blobs.stats()
+            summary["activity"] = self.activity.stats()
+            summary["scheduler"] = self.scheduler.stats()
+            if self.capture_policy:
+                summary["capture_policy"] = self.capture_policy.stats()
+            if self.retention:
+                summary["retention"] = self.retention.stats()
+            
+            self.rollups.checkpoint()
+            self.timeseries.save(self.timeseries_file, self.session_start.date())
+            
+            # One file per session; the day-level files are rebuilt from all of them
+            os.makedirs(self.sessions_folder, exist_ok=True)
+            session_file = os.path.join(self.sessions_folder,
+                                        f"session_{self.session_start.strftime('%H%M%S')}.json")
+            with open(session_file, 'w') as f:
+                json.dump(summary, f, indent=2)
             
             with open(self.app_usage_file, 'w') as f:
-                json.dump(app_usage_minutes, f, indent=2)
+                json.dump(day_app_usage(self.sessions_folder), f, indent=2)
             
             with open(self.session_summary_file, 'w') as f:
                 json.dump(summary, f, indent=2)
@@ -645,85 +708,442 @@ class ActivityTracker:
             print(f"  Keystrokes: {summary['total_keystrokes']}")
             print(f"  Screenshots: {summary['total_screenshots']}")
             print(f"  Top Apps: {summary['top_apps']}")
+            if summary.get('screenshot_dedupe'):
+                dedupe = summary['screenshot_dedupe']
+                print(f"  Duplicate screenshots skipped: {dedupe['skipped']}/{dedupe['frames']} "
+                      f"(avg compare {dedupe['avg_compare_ms']} ms)")
+            latency = summary['keystroke_hook_latency']
+            if latency['samples']:
+                print(f"  Key hook latency: p50 {latency['p50_us']} us, p99 {latency['p99_us']} us")
+            if summary['writer']['dropped']:
+                print(f"  Dropped records: {summary['writer']['dropped']}")
             
         except Exception as e:
             print(f"Summary save error: {e}")
     
+    def schedule_jobs(self):
+        jitter = self.config.get('schedule_jitter_seconds', 0.0)
+        scheduler = self.scheduler
+        scheduler.every("session_stats", self.stats_interval, self.save_session_stats,
+                        jitter=jitter, first_delay=self.stats_interval)
+        # blocking: jobs that write files or wait on the writer or encoder run on the I/O pool
+        scheduler.every("rollup_checkpoint", self.rollup_interval, self.checkpoint_rollups,
+                        jitter=jitter, first_delay=self.rollup_interval, blocking=True)
+        scheduler.every("metrics", self.metrics_interval, self.save_metrics,
+                        jitter=jitter, first_delay=self.metrics_interval, blocking=True)
+        if "screenshots" in self.components:
+            scheduler.every("screenshot", self.screenshot_interval, self.take_screenshot, jitter=jitter,
+                            blocking=True)
+        if "keyboard" in self.components:
+            scheduler.every("keystroke_flush", self.keystroke_interval, self.flush_keystrokes,
+                            first_delay=self.keystroke_interval, blocking=True)
+        if self.process_isolation:
+            interval = self.config.get('worker_check_seconds', 1)
+            scheduler.every("supervise_workers", interval, self.supervise_workers, first_delay=interval,
+                            blocking=True)
+        if self.retention:
+            # Start after capture has settled rather than competing with startup I/O
+            scheduler.every("retention", self.retention_interval, self.run_retention,
+                            jitter=jitter, first_delay=min(60, self.retention_interval), blocking=True)
+    
     def run(self):
-        # Start all tracking threads in background
-        threads = [
-            threading.Thread(target=self.take_screenshot, daemon=True),
-            threading.Thread(target=self.start_keylogger, daemon=True),
-            threading.Thread(target=self.save_keystroke_buffer, daemon=True),
-            threading.Thread(target=self.save_session_stats, daemon=True),
-            threading.Thread(target=self.monitor_clipboard, daemon=True),
-            threading.Thread(target=self.start_mouse_listener, daemon=True)
-        ]
+        # Periodic work runs on the scheduler; only the blocking input hooks get threads
+        self.schedule_jobs()
+        self.scheduler.start()
+        if "keyboard" in self.components:
+            threading.Thread(target=self.start_keylogger, daemon=True).start()
+        if "mouse" in self.components:
+            threading.Thread(target=self.start_mouse_listener, daemon=True).start()
 
         if self.window_tracking_enabled:
-            threads.append(threading.Thread(target=self.track_window_activity, daemon=True))
-        else:
+            self.window_source.start(self.on_window_change, self.scheduler)
+        elif "window" in self.components:
             print("Active window tracking is disabled for this platform.")
-
-        for thread in threads:
-            thread.start()
+        if self.clipboard_source:
+            self.clipboard_source.start(self.on_clipboard_change, self.scheduler)
+        self.activity.start(self.scheduler)
+        if self.config.get('metrics_port'):
+            try:
+                self.metrics_server = MetricsServer(self.metrics, self.config['metrics_port'])
+                self.metrics_server.start()
+                print(f"Metrics at http://127.0.0.1:{self.metrics_server.port}/metrics")
+            except OSError as e:
+                print(f"Metrics endpoint unavailable: {e}")
         
         print(f"Activity tracker started. Logging to: {self.today_folder}")
-        print(f"Keystrokes saved every {self.keystroke_interval} seconds")
+        if "keyboard" in self.components:
+            print(f"Keystrokes saved every {self.keystroke_interval} seconds")
+        active = sorted(self.components - {"overlay"})
         if self.window_tracking_enabled:
-            print("All tracking active (clipboard, window, mouse)")
-        else:
-            print("Tracking active (clipboard, mouse) – window tracking disabled on this platform")
-        print("Unified activity log: activity_log.json")
-        print("")
-        print("APPLE-STYLE OVERLAY")
-        print("  • Light bar at top-center")
-        print("  • Click gear or press Ctrl+Q to set goal")
+            active[active.index("window")] = f"window via {self.window_source.name}"
+        elif "window" in active:
+            active.remove("window")
+            print("Window tracking disabled on this platform")
+        print(f"Tracking active ({', '.join(active) or 'nothing'})")
+        print(f"Unified activity log: {os.path.basename(self.activity_log_file)}")
         print("")
-        print("Starting overlay (Ctrl+C to stop)...")
+        if self.goal_overlay:
+            print("APPLE-STYLE OVERLAY")
+            print("  • Light bar at top-center")
+            print("  • Click gear or press Ctrl+Q to set goal")
+            print("")
+            print("Starting overlay (Ctrl+C to stop)...")
+        else:
+            print("Running headless (Ctrl+C to stop)...")
         print("=" * 60)
         
         # Run overlay in MAIN thread (stable)
         try:
-            self.goal_overlay.run()
+            if self.goal_overlay:
+                self.goal_overlay.run()
+            else:
+                while not self.stop_requested.wait(0.5):
+                    pass
         except KeyboardInterrupt:
             pass
         finally:
-            print("\nStopping activity tracker...")
-            
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            duration = round((datetime.now() - self.session_start).total_seconds() / 60, 2)
-            
-            self.log_event("system", "session_ended", {"duration_minutes": duration})
-            
-            with open(self.events_file, 'a', encoding='utf-8') as f:
-                f.write(f"[{timestamp}] Session ended (Duration: {duration} min)\n")
-            
-            self.running = False
-            time.sleep(1)
-            self.save_session_summary()
-
-if __name__ == "__main__":
-    CONFIG_FILE = "tracker_config.json"
+            self.shutdown()
     
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-            log_folder = config.get('log_folder')
-            keystroke_interval = config.get('keystroke_interval', 15)
-    else:
-        print("First time setup - Please specify the log folder:")
-        log_folder = input("Enter full path for logs (e.g., C:\\ActivityLogs): ").strip()
-        log_folder = log_folder.strip('"').strip("'")
+    def stop(self):
+        """Ask a running tracker to shut down from another thread."""
+        self.stop_requested.set()
+        if self.goal_overlay and self.goal_overlay.window:
+            self.goal_overlay.window.after(0, self.goal_overlay.window.quit)
+    
+    def shutdown(self):
+        print("\nStopping activity tracker...")
+        
+        # Stop capture first, then let in-flight jobs finish and flush what they left behind
+        self.running = False
+        if self.window_source:
+            self.window_source.stop()
+        if self.clipboard_source:
+            self.clipboard_source.stop()
+        self.activity.stop()
+        self.scheduler.stop()
+        self.flush_keystrokes()
         
-        interval_choice = input("Save keystrokes every: (1) 15 seconds [default], (2) 30 seconds, (3) 60 seconds: ").strip()
-        keystroke_interval = {'1': 15, '2': 30, '3': 60}.get(interval_choice, 15)
+        now = datetime.now()
+        timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+        duration = round((now - self.session_start).total_seconds() / 60, 2)
         
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump({'log_folder': log_folder, 'keystroke_interval': keystroke_interval}, f)
+        # Bill the last foreground interval here so reports see it in the event log
+        time_on_current = 0.0
+        if self.current_app and not self.activity.is_idle:
+            time_on_current = max(0.0, (now - self.last_window_check).total_seconds())
+            self.app_usage_time[self.current_app] += time_on_current
+            self.last_window_check = now
+        
+        self.log_event("system", "session_ended", {
+            "duration_minutes": duration,
+            "app": self.current_app or None,
+            "time_on_current": round(time_on_current, 2)
+        })
         
-        print(f"Configuration saved. Keystrokes will be saved every {keystroke_interval} seconds")
+        self.write_text("system", self.events_file, f"[{timestamp}] Session ended (Duration: {duration} min)\n")
+        
+        if self.encoder:
+            self.encoder.close()
+        if self.capture_worker:
+            self.capture_worker.close()
+        if self.frame_archive:
+            self.frame_archive.close()
+        # The summary reads writer stats, so everything logged so far must be written first
+        if not self.writer.sync():
+            print("Writer did not catch up before the session summary")
+        self.save_session_summary()
+        self.writer.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        try:
+            self.metrics.write(self.metrics_file)
+        except Exception as e:
+            print(f"Metrics write error: {e}")
+
+CONFIG_FILE = "tracker_config.json"
+
+
+def load_config():
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f)
+
+    print("First time setup - Please specify the log folder:")
+    log_folder = input("Enter full path for logs (e.g., C:\\ActivityLogs): ").strip()
+    log_folder = log_folder.strip('"').strip("'")
+    
+    interval_choice = input("Save keystrokes every: (1) 15 seconds [default], (2) 30 seconds, (3) 60 seconds: ").strip()
+    keystroke_interval = {'1': 15, '2': 30, '3': 60}.get(interval_choice, 15)
+    
+    config = {'log_folder': log_folder, 'keystroke_interval': keystroke_interval}
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(config, f)
     
-    tracker = ActivityTracker(log_folder, keystroke_interval)
+    print(f"Configuration saved. Keystrokes will be saved every {keystroke_interval} seconds")
+    return config
+
+
+def cmd_reconstruct(args):
+    from tile_store import reconstruct_frame
+
+    output = args.output or args.manifest.replace(".tiles.json", ".png")
+    reconstruct_frame(args.manifest).save(output)
+    print(f"Reconstructed {args.manifest} -> {output}")
+
+
+def _screenshot_folder(day_folder):
+    nested = os.path.join(day_folder, "screenshots")
+    return nested if os.path.isdir(nested) else day_folder
+
+
+def cmd_archive(args):
+    from frame_archive import export_archive, pack_folder
+
+    folder = _screenshot_folder(args.day_folder)
+    if args.action == "pack":
+        count = pack_folder(folder, remove=args.remove)
+        print(f"Packed {count} screenshots into {os.path.join(folder, 'frames.pack')}")
+    else:
+        count = export_archive(folder, args.output)
+        print(f"Exported {count} screenshots to {args.output}")
+
+
+def _parse_when(value):
+    """Accept 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM[:SS]' or 'HH:MM' (today) as an ISO timestamp."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            moment = datetime.strptime(value, fmt).time()
+            return datetime.combine(datetime.now().date(), moment).isoformat()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Unrecognized time: {value}")
+
+
+def cmd_query(args):
+    config = load_config()
+    log_folder = config.get('log_folder')
+    index = EventIndex(os.path.join(log_folder, INDEX_NAME))
+    try:
+        if args.rebuild:
+            count = index.rebuild(log_folder)
+            print(f"Indexed {count} events from {log_folder}")
+            return
+
+        for event in index.query(since=args.since, until=args.until, event_type=args.type,
+                                 event_name=args.name, app=args.app, limit=args.limit):
+            if args.json:
+                print(json.dumps(event, ensure_ascii=False))
+            else:
+                data = event["data"] or {}
+                detail = data.get("window_title") or data.get("filename") or data.get("text") or data.get("preview") or ""
+                print(f"{event['timestamp'][:19]}  {event['event_type']:<10} {event['event_name']:<15} "
+                      f"{data.get('app') or ''}  {str(detail)[:80]}")
+    finally:
+        index.close()
+
+
+def cmd_search(args):
+    config = load_config()
+    log_folder = config.get('log_folder')
+    index = TextIndex(os.path.join(log_folder, INDEX_NAME), log_folder)
+    try:
+        hits = index.search(' '.join(args.terms), source=args.source, limit=args.limit)
+        if args.json:
+            for hit in hits:
+                print(json.dumps(hit, ensure_ascii=False))
+            return
+        if not hits:
+            print("No matches")
+        for hit in hits:
+            context = " - ".join(part for part in (hit["app"], hit["window_title"]) if part)
+            print(f"{hit['timestamp'][:19]}  [{hit['source']}]  {context[:80]}")
+            print(f"    {' '.join(hit['text'].split())[:200]}")
+    finally:
+        index.close()
+
+
+def cmd_usage(args):
+    config = load_config()
+    start = datetime.fromisoformat(args.since) if args.since else None
+    end = datetime.fromisoformat(args.until) if args.until else None
+    report = usage_report(config.get('log_folder'), start, end, granularity=args.by)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for period, bucket in report.items():
+        top = sorted(bucket["apps"].items(), key=lambda x: x[1], reverse=True)[:5]
+        apps = ", ".join(f"{app} {round(seconds / 60, 1)}m" for app, seconds in top)
+        print(f"{period:<14} keys {bucket['keystrokes']:>7}  idle {round(bucket['idle_seconds'] / 60, 1):>6}m  {apps}")
 
+
+def cmd_report(args):
+    config = load_config()
+    start = datetime.fromisoformat(args.since) if args.since else None
+    end = datetime.fromisoformat(args.until) if args.until else None
+    report, recomputed = build_report(config.get('log_folder'), start, end,
+                                      granularity=args.by, jobs=args.jobs)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'period':<12} {'days':>4} {'active':>8} {'idle':>7} {'keys':>8} {'goals':>5}  top apps")
+    for period, bucket in report.items():
+        top = list(bucket["app_minutes"].items())[:3]
+        apps = ", ".join(f"{app} {round(minutes / 60, 1)}h" for app, minutes in top)
+        print(f"{period:<12} {bucket['days']:>4} {round(bucket['active_minutes'] / 60, 1):>7}h "
+              f"{round(bucket['idle_minutes'] / 60, 1):>6}h {bucket['keystrokes']:>8} "
+              f"{bucket['goal_sessions']:>5}  {apps}")
+    print(f"({len(recomputed)} day(s) recomputed, the rest from cache)")
+
+
+def cmd_migrate(args):
+    if args.day_folders:
+        folders = args.day_folders
+    else:
+        config = load_config()
+        today = datetime.now().strftime('%Y-%m-%d')
+        folders = [folder for folder in day_folders(config.get('log_folder'))
+                   if os.path.basename(folder) != today]
+
+    for folder in folders:
+        if not log_exists(os.path.join(folder, "activity_log.json")) and \
+                not log_exists(os.path.join(folder, "activity_log.jsonl")):
+            continue
+        try:
+            count = migrate_day(folder, remove=args.remove,
+                                max_segment_bytes=args.segment_mb * 1024 * 1024)
+            print(f"{folder}: {count} events -> {os.path.join(folder, SEGMENT_DIR)}")
+        except Exception as e:
+            print(f"{folder}: migration failed: {e}")
+
+
+def cmd_merge(args):
+    start = datetime.fromisoformat(args.since) if args.since else None
+    end = datetime.fromisoformat(args.until) if args.until else None
+    try:
+        for summary in merge_sources(args.sources, args.output, start, end):
+            events = ", ".join(f"{host} {count}" for host, count in summary["events"].items())
+            print(f"{summary['day']}: {sum(summary['events'].values())} events ({events}), "
+                  f"{summary['overlap_minutes']} overlapping minutes reconciled")
+    except ValueError as e:
+        print(f"Merge failed: {e}")
+
+
+def cmd_compact(args):
+    config = load_config()
+    budget_mb = args.budget_mb if args.budget_mb is not None else config.get('retention_disk_budget_mb')
+    thin_days = args.thin_after_days if args.thin_after_days is not None else config.get('retention_thin_after_days')
+    retention = RetentionManager(
+        config.get('log_folder'),
+        compress_after_days=config.get('retention_compress_after_days', 1),
+        thin_after_days=thin_days,
+        thin_keep_minutes=config.get('retention_thin_keep_minutes', 10),
+        disk_budget_bytes=budget_mb * 1024 * 1024 if budget_mb else None,
+        io_bytes_per_sec=0,
+        max_seconds_per_run=3600
+    )
+    while retention.run_once():
+        pass
+    stats = retention.stats()
+    print(f"Compressed {stats['bytes_compressed'] // 1024} KB (saved {stats['bytes_saved'] // 1024} KB), "
+          f"thinned {stats['screenshots_thinned']} screenshots, evicted {stats['days_evicted']} day(s) "
+          f"and {stats['bytes_evicted'] // (1024 * 1024)} MB")
+    if stats['days_evicted'] or stats['bytes_evicted']:
+        print("Run 'query --rebuild' to drop evicted days from the event index")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Context accountability activity tracker")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run without the overlay window (no Tk needed)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    reconstruct = subparsers.add_parser("reconstruct", help="Rebuild a tile-stored screenshot as an image")
+    reconstruct.add_argument("manifest", help="Path to a screenshot_*.tiles.json manifest")
+    reconstruct.add_argument("-o", "--output", help="Output image path (default: next to the manifest)")
+    reconstruct.set_defaults(func=cmd_reconstruct)
+
+    archive = subparsers.add_parser("archive", help="Pack or export a day's screenshot archive")
+    archive_actions = archive.add_subparsers(dest="action", required=True)
+    pack = archive_actions.add_parser("pack", help="Move loose screenshots of a day into frames.pack")
+    pack.add_argument("day_folder")
+    pack.add_argument("--remove", action="store_true", help="Delete loose files after packing")
+    export = archive_actions.add_parser("export", help="Write archived frames back out as loose files")
+    export.add_argument("day_folder")
+    export.add_argument("output")
+    archive.set_defaults(func=cmd_archive)
+
+    query = subparsers.add_parser("query", help="Look up indexed events by time, type or app")
+    query.add_argument("--since", type=_parse_when, help="Start time, e.g. 2024-05-01 or 14:00")
+    query.add_argument("--until", type=_parse_when, help="End time (exclusive)")
+    query.add_argument("--type", help="Event type, e.g. window, clipboard, input")
+    query.add_argument("--name", help="Event name, e.g. changed, captured")
+    query.add_argument("--app", help="Application name, e.g. chrome.exe")
+    query.add_argument("--limit", type=int, default=1000)
+    query.add_argument("--json", action="store_true", help="Print one JSON event per line")
+    query.add_argument("--rebuild", action="store_true", help="Rebuild the index from all day folders")
+    query.set_defaults(func=cmd_query)
+
+    search = subparsers.add_parser("search", help="Full-text search over keystrokes and clipboard history")
+    search.add_argument("terms", nargs="+")
+    search.add_argument("--source", choices=["input", "clipboard"], help="Only search one source")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--json", action="store_true", help="Print one JSON hit per line")
+    search.set_defaults(func=cmd_search)
+
+    usage = subparsers.add_parser("usage", help="App usage, keystrokes and idle time from the rollups")
+    usage.add_argument("--since", type=_parse_when, help="Start time, e.g. 2024-05-01")
+    usage.add_argument("--until", type=_parse_when, help="End time (exclusive)")
+    usage.add_argument("--by", choices=["hour", "day"], default="day")
+    usage.add_argument("--json", action="store_true")
+    usage.set_defaults(func=cmd_usage)
+
+    report = subparsers.add_parser("report", help="Weekly or monthly trends across day folders")
+    report.add_argument("--since", type=_parse_when, help="First day, e.g. 2024-05-01")
+    report.add_argument("--until", type=_parse_when, help="Last day (inclusive)")
+    report.add_argument("--by", choices=["day", "week", "month"], default="week")
+    report.add_argument("--jobs", type=int, help="Worker processes (default: one per CPU)")
+    report.add_argument("--json", action="store_true")
+    report.set_defaults(func=cmd_report)
+
+    migrate = subparsers.add_parser("migrate", help="Convert JSON/JSONL event logs into binary segments")
+    migrate.add_argument("day_folders", nargs="*", help="Day folders (default: every day except today)")
+    migrate.add_argument("--remove", action="store_true", help="Delete the originals instead of renaming them")
+    migrate.add_argument("--segment-mb", type=int, default=16, help="Maximum segment size in MB")
+    migrate.set_defaults(func=cmd_migrate)
+
+    merge = subparsers.add_parser("merge", help="Merge log folders from several machines into one timeline")
+    merge.add_argument("output", help="Log folder to write the merged day folders to")
+    merge.add_argument("sources", nargs="+", help="Log or day folders, optionally labelled as host=path")
+    merge.add_argument("--since", type=_parse_when, help="First day, e.g. 2024-05-01")
+    merge.add_argument("--until", type=_parse_when, help="Last day (inclusive)")
+    merge.set_defaults(func=cmd_merge)
+
+    compact = subparsers.add_parser("compact", help="Apply the retention policy to past days now, unthrottled")
+    compact.add_argument("--thin-after-days", type=int, help="Override retention_thin_after_days")
+    compact.add_argument("--budget-mb", type=int, help="Override retention_disk_budget_mb")
+    compact.set_defaults(func=cmd_compact)
+
+    args = parser.parse_args(argv)
+    if args.command:
+        args.func(args)
+        return
+
+    config = load_config()
+    if args.headless:
+        config['headless'] = True
+    tracker = ActivityTracker(config.get('log_folder'), config.get('keystroke_interval', 15), config)
     tracker.run()
+
+
+if __name__ == "__main__":
+    main()
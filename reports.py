@@ -0,0 +1,233 @@
+"""Multi-day reports built from cached per-day partial aggregates."""
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from event_index import day_folders
+from journal import day_journal_files, iter_day_events
+
+PARTIAL_NAME = "day_report.json"
+PARTIAL_VERSION = 3
+
+
+def _source_signature(day_folder):
+    signature = {}
+    for path in day_journal_files(day_folder):
+        stat = os.stat(path)
+        signature[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def _new_partial():
+    return {
+        "sessions": 0,
+        "session_minutes": 0.0,
+        "idle_minutes": 0.0,
+        "active_minutes": 0.0,
+        "keystrokes": 0,
+        "window_switches": 0,
+        "clipboard_captures": 0,
+        "screenshots": 0,
+        "app_minutes": defaultdict(float),
+        "goals": [],
+    }
+
+
+def compute_day_partial(day_folder):
+    """Stream one day's events into a partial aggregate."""
+    partial = _new_partial()
+    open_session = None
+    open_idle = None
+    last_timestamp = None
+
+    def close_idle(until):
+        # Idle that no idle_ended closed: the session ended (or crashed) while idle
+        try:
+            idle = datetime.fromisoformat(until) - datetime.fromisoformat(open_idle)
+            partial["idle_minutes"] += max(0.0, idle.total_seconds() / 60)
+        except (TypeError, ValueError):
+            pass
+
+    for event in iter_day_events(day_folder):
+        event_type = event.get("event_type")
+        name = event.get("event_name")
+        data = event.get("data") or {}
+        timestamp = event.get("timestamp")
+        previous_timestamp = last_timestamp
+        if timestamp:
+            last_timestamp = timestamp
+
+        if event_type == "system" and name == "session_started":
+            if open_idle and previous_timestamp:
+                close_idle(previous_timestamp)
+            open_idle = None
+            partial["sessions"] += 1
+            open_session = timestamp
+        elif event_type == "system" and name == "session_ended":
+            if open_idle:
+                close_idle(timestamp)
+                open_idle = None
+            partial["session_minutes"] += data.get("duration_minutes", 0.0)
+            if data.get("app"):
+                partial["app_minutes"][data["app"]] += data.get("time_on_current", 0) / 60
+            open_session = None
+        elif event_type == "input" and name == "keystrokes":
+            partial["keystrokes"] += data.get("length", 0)
+        elif event_type == "window" and name == "changed":
+            partial["window_switches"] += 1
+            if data.get("previous_app"):
+                partial["app_minutes"][data["previous_app"]] += data.get("time_on_previous", 0) / 60
+        elif event_type == "clipboard" and name == "changed":
+            partial["clipboard_captures"] += 1
+        elif event_type == "screenshot" and name == "captured":
+            partial["screenshots"] += 1
+        elif event_type == "activity" and name == "idle_started":
+            # Foreground time up to the last input, billed when idle was detected
+            if data.get("app"):
+                partial["app_minutes"][data["app"]] += data.get("billed_seconds", 0) / 60
+            open_idle = data.get("idle_since") or timestamp
+        elif event_type == "activity" and name == "idle_ended":
+            open_idle = None
+            partial["idle_minutes"] += data.get("idle_seconds", 0) / 60
+        elif event_type == "goal" and name == "goal_set":
+            partial["goals"].append({
+                "timestamp": timestamp,
+                "goal": data.get("goal"),
+                "timer_minutes": data.get("timer_minutes"),
+            })
+
+    if open_idle and last_timestamp:
+        close_idle(last_timestamp)
+    # A session that crashed before session_ended still counts up to its last event.
+    if open_session and last_timestamp:
+        try:
+            elapsed = datetime.fromisoformat(last_timestamp) - datetime.fromisoformat(open_session)
+            partial["session_minutes"] += max(0.0, elapsed.total_seconds() / 60)
+        except ValueError:
+            pass
+
+    partial["active_minutes"] = max(0.0, partial["session_minutes"] - partial["idle_minutes"])
+    return _rounded(partial)
+
+
+def _rounded(partial):
+    result = dict(partial)
+    for key in ("session_minutes", "idle_minutes", "active_minutes"):
+        result[key] = round(partial[key], 2)
+    result["app_minutes"] = {app: round(minutes, 2) for app, minutes in
+                             sorted(partial["app_minutes"].items(), key=lambda x: x[1], reverse=True)}
+    return result
+
+
+def day_app_usage(sessions_folder):
+    """Minutes per app summed over every per-session summary of a day."""
+    totals = defaultdict(float)
+    if os.path.isdir(sessions_folder):
+        for name in sorted(os.listdir(sessions_folder)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(sessions_folder, name), 'r') as f:
+                    usage = json.load(f).get("app_usage_minutes", {})
+            except (OSError, ValueError):
+                continue
+            for app, minutes in usage.items():
+                totals[app] += minutes
+    return {app: round(minutes, 2) for app, minutes in sorted(totals.items(), key=lambda x: x[1], reverse=True)}
+
+
+def _refresh_partial(day_folder):
+    """Worker: recompute and cache one day's partial.  Returns (day, partial)."""
+    signature = _source_signature(day_folder)
+    partial = compute_day_partial(day_folder)
+    cache_path = os.path.join(day_folder, PARTIAL_NAME)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": PARTIAL_VERSION, "signature": signature, "partial": partial}, f)
+    os.replace(tmp_path, cache_path)
+    return os.path.basename(day_folder), partial
+
+
+def _cached_partial(day_folder):
+    cache_path = os.path.join(day_folder, PARTIAL_NAME)
+    try:
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("version") != PARTIAL_VERSION or cached.get("signature") != _source_signature(day_folder):
+        return None
+    return cached["partial"]
+
+
+def day_partials(log_folder, start=None, end=None, jobs=None):
+    """``{day: partial}`` for day folders in [start, end], recomputing stale days in parallel.
+
+    Returns the partials and the list of days that had to be recomputed.
+    """
+    partials = {}
+    stale = []
+    for folder in day_folders(log_folder):
+        day = os.path.basename(folder)
+        if start and day < start.strftime('%Y-%m-%d'):
+            continue
+        if end and day > end.strftime('%Y-%m-%d'):
+            continue
+        partial = _cached_partial(folder)
+        if partial is None:
+            stale.append(folder)
+        else:
+            partials[day] = partial
+
+    if len(stale) > 1 and jobs != 1:
+        try:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                partials.update(pool.map(_refresh_partial, stale))
+            stale_days = [os.path.basename(folder) for folder in stale]
+            return dict(sorted(partials.items())), stale_days
+        except (OSError, RuntimeError) as e:
+            print(f"Process pool unavailable, computing days serially: {e}")
+    for folder in stale:
+        day, partial = _refresh_partial(folder)
+        partials[day] = partial
+    return dict(sorted(partials.items())), [os.path.basename(folder) for folder in stale]
+
+
+def period_key(day, granularity):
+    date = datetime.strptime(day, '%Y-%m-%d')
+    if granularity == "week":
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "month":
+        return date.strftime('%Y-%m')
+    return day
+
+
+def merge_partials(partials):
+    merged = _new_partial()
+    merged["days"] = 0
+    for partial in partials:
+        merged["days"] += 1
+        for key in ("sessions", "session_minutes", "idle_minutes", "active_minutes", "keystrokes",
+                    "window_switches", "clipboard_captures", "screenshots"):
+            merged[key] += partial.get(key, 0)
+        for app, minutes in partial.get("app_minutes", {}).items():
+            merged["app_minutes"][app] += minutes
+        merged["goals"].extend(partial.get("goals", []))
+    result = _rounded(merged)
+    result["goal_sessions"] = len(result["goals"])
+    return result
+
+
+def build_report(log_folder, start=None, end=None, granularity="week", jobs=None):
+    """Merge per-day partials into ``{period: aggregate}`` plus a ``total``."""
+    partials, recomputed = day_partials(log_folder, start, end, jobs)
+    grouped = defaultdict(list)
+    for day, partial in partials.items():
+        grouped[period_key(day, granularity)].append(partial)
+
+    report = {period: merge_partials(items) for period, items in sorted(grouped.items())}
+    report["total"] = merge_partials(partials.values())
+    return report, recomputed
@@ -0,0 +1,193 @@
+"""Background compaction and retention of old day folders.
+
+Work is done in small increments from the scheduler, with file I/O
+throttled to ``io_bytes_per_sec`` so it never competes with live capture.
+Today's folder is never touched.
+"""
+import gzip
+import os
+import shutil
+import time
+from datetime import datetime
+
+from event_index import day_folders
+from frame_archive import LOOSE_FILE, loose_time
+
+# Plain-text logs of a closed day that are gzip-compressed in place; every
+# reader of these files goes through journal.open_log, which falls back to
+# the ``.gz`` name.  Binary segments stay uncompressed so they can be mmapped.
+COMPRESSIBLE = ("activity_log.json", "activity_log.jsonl", "keystrokes.txt", "clipboard.txt",
+                "windows.txt", "events.txt")
+THINNED_MARKER = ".thinned"
+
+
+def folder_size(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class RetentionManager:
+    """Compresses, thins and evicts old data according to a policy.
+
+    * ``compress_after_days`` - gzip the text and event logs of days at least
+      this old (``1`` means every day before today; ``None`` disables).
+    * ``thin_after_days`` - for days at least this old, keep one loose
+      screenshot per ``thin_keep_minutes`` and delete the rest.
+    * ``disk_budget_bytes`` - while the log folder is larger, delete the
+      oldest day's screenshots, then the oldest whole day.
+    """
+
+    def __init__(self, log_folder, today=None, compress_after_days=1, thin_after_days=None,
+                 thin_keep_minutes=10, disk_budget_bytes=None, io_bytes_per_sec=8 * 1024 * 1024,
+                 max_seconds_per_run=2.0):
+        self.log_folder = log_folder
+        self.today = today
+        self.compress_after_days = compress_after_days
+        self.thin_after_days = thin_after_days
+        self.thin_keep_minutes = thin_keep_minutes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.io_bytes_per_sec = io_bytes_per_sec
+        self.max_seconds_per_run = max_seconds_per_run
+
+        # path -> source bytes already in its .gz.tmp, for compressions cut off by a deadline
+        self._partial = {}
+
+        self.bytes_compressed = 0
+        self.bytes_saved = 0
+        self.screenshots_thinned = 0
+        self.days_evicted = 0
+        self.bytes_evicted = 0
+
+    def _days(self):
+        today = self.today or datetime.now().strftime('%Y-%m-%d')
+        return [folder for folder in day_folders(self.log_folder) if os.path.basename(folder) < today]
+
+    def _age_days(self, folder):
+        today = datetime.strptime(self.today or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        return (today - datetime.strptime(os.path.basename(folder), '%Y-%m-%d')).days
+
+    def _throttle(self, nbytes, started):
+        if not self.io_bytes_per_sec:
+            return
+        wanted = nbytes / self.io_bytes_per_sec
+        elapsed = time.monotonic() - started
+        if wanted > elapsed:
+            time.sleep(wanted - elapsed)
+
+    def run_once(self):
+        """Do one bounded slice of work; returns True if anything is left to do."""
+        deadline = time.monotonic() + self.max_seconds_per_run
+        pending = False
+        for folder in self._days():
+            age = self._age_days(folder)
+            if self.compress_after_days is not None and age >= self.compress_after_days:
+                pending |= self._compress_day(folder, deadline)
+            if self.thin_after_days is not None and age >= self.thin_after_days:
+                pending |= self._thin_day(folder, deadline)
+            if time.monotonic() >= deadline:
+                return True
+        if self.disk_budget_bytes:
+            pending |= self._enforce_budget(deadline)
+        return pending
+
+    def _compress_day(self, folder, deadline):
+        for name in COMPRESSIBLE:
+            path = os.path.join(folder, name)
+            if not os.path.exists(path):
+                continue
+            if time.monotonic() >= deadline or not self.compress_file(path, deadline):
+                return True
+        return False
+
+    def compress_file(self, path, deadline=None, chunk_size=256 * 1024):
+        """gzip ``path`` to ``path.gz`` with throttled I/O, then remove the original.
+
+        Returns False if ``deadline`` passed first; the next call for ``path``
+        resumes where this one stopped by appending another gzip member to
+        ``path.gz.tmp`` (concatenated members decompress as one stream).
+        """
+        tmp_path = path + ".gz.tmp"
+        size = os.path.getsize(path)
+        offset = self._partial.pop(path, 0)
+        finished = False
+        with open(path, 'rb') as source, open(tmp_path, 'ab' if offset else 'wb') as raw:
+            source.seek(offset)
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as target:
+                while True:
+                    started = time.monotonic()
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        finished = True
+                        break
+                    target.write(chunk)
+                    offset += len(chunk)
+                    self._throttle(len(chunk), started)
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+        if not finished:
+            self._partial[path] = offset
+            return False
+        # Readers prefer the plain file while it exists, so no event is read twice.
+        os.replace(tmp_path, path + ".gz")
+        os.remove(path)
+        self.bytes_compressed += size
+        self.bytes_saved += size - os.path.getsize(path + ".gz")
+        return True
+
+    def _thin_day(self, folder, deadline):
+        screenshots = os.path.join(folder, "screenshots")
+        marker = os.path.join(screenshots, THINNED_MARKER)
+        if not os.path.isdir(screenshots) or os.path.exists(marker):
+            return False
+
+        kept_buckets = set()
+        for name in sorted(os.listdir(screenshots)):
+            match = LOOSE_FILE.match(name)
+            if not match:
+                continue
+            if time.monotonic() >= deadline:
+                return True
+            taken = loose_time(match)
+            bucket = (taken.hour * 60 + taken.minute) // max(1, self.thin_keep_minutes)
+            if bucket not in kept_buckets:
+                kept_buckets.add(bucket)
+                continue
+            os.remove(os.path.join(screenshots, name))
+            self.screenshots_thinned += 1
+        with open(marker, 'w') as f:
+            f.write(f"{self.thin_keep_minutes}\n")
+        return False
+
+    def _enforce_budget(self, deadline):
+        total = folder_size(self.log_folder)
+        days = self._days()
+        while days and total > self.disk_budget_bytes and time.monotonic() < deadline:
+            # Screenshots are the bulk of a day, so they go before the day's logs
+            screenshots = os.path.join(days[0], "screenshots")
+            if os.path.isdir(screenshots):
+                victim = screenshots
+            else:
+                victim = days.pop(0)
+                self.days_evicted += 1
+            freed = folder_size(victim)
+            shutil.rmtree(victim, ignore_errors=True)
+            self.bytes_evicted += freed
+            total -= freed
+            print(f"Retention: evicted {victim} ({freed // 1024} KB) to stay within the disk budget")
+        # Today alone over budget is not something another pass can fix
+        return bool(days) and total > self.disk_budget_bytes
+
+    def stats(self):
+        return {
+            "bytes_compressed": self.bytes_compressed,
+            "bytes_saved": self.bytes_saved,
+            "screenshots_thinned": self.screenshots_thinned,
+            "days_evicted": self.days_evicted,
+            "bytes_evicted": self.bytes_evicted,
+        }
@@ -0,0 +1,201 @@
+"""Per-minute and per-hour activity rollups, kept up to date as events arrive."""
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from event_index import day_folders
+
+ROLLUP_NAME = "rollups.json"
+
+DEFAULT_TITLE_CLASSES = {
+    "email": ["inbox", "outlook", "gmail", "mail"],
+    "meeting": ["zoom", "meeting", "teams", "google meet", "webex"],
+    "chat": ["slack", "discord", "whatsapp", "chat"],
+    "code": [".py", ".js", ".ts", "visual studio", "pycharm", "github"],
+    "documents": [".docx", ".xlsx", ".pptx", ".pdf", "google docs", "sheets"],
+    "browsing": ["chrome", "firefox", "edge", "safari"],
+}
+
+
+def classify_title(title, classes):
+    lowered = (title or "").lower()
+    for name, needles in classes.items():
+        if any(needle in lowered for needle in needles):
+            return name
+    return "other"
+
+
+def _new_bucket():
+    return {"apps": defaultdict(float), "classes": defaultdict(float), "keystrokes": 0, "idle_seconds": 0.0}
+
+
+def _merge_bucket(target, bucket):
+    for app, seconds in bucket.get("apps", {}).items():
+        target["apps"][app] += seconds
+    for name, seconds in bucket.get("classes", {}).items():
+        target["classes"][name] += seconds
+    target["keystrokes"] += bucket.get("keystrokes", 0)
+    target["idle_seconds"] += bucket.get("idle_seconds", 0.0)
+
+
+class RollupEngine:
+    """Accumulates foreground time, keystrokes and idle seconds into time buckets.
+
+    Minute buckets are keyed ``YYYY-MM-DDTHH:MM`` and hour buckets
+    ``YYYY-MM-DDTHH``.  Buckets already on disk for the day are loaded first so
+    several sessions in one day accumulate into the same file.
+    """
+
+    def __init__(self, path, title_classes=None):
+        self.path = path
+        self.title_classes = title_classes if title_classes is not None else DEFAULT_TITLE_CLASSES
+        self.minutes = defaultdict(_new_bucket)
+        self.hours = defaultdict(_new_bucket)
+        self._lock = threading.Lock()
+
+        self.foreground = None
+        # foreground_since is how far the foreground app has been credited;
+        # foreground_started is when its interval began.
+        self.foreground_since = None
+        self.foreground_started = None
+        self.idle_since = None
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    saved = json.load(f)
+                for key, bucket in saved.get("minutes", {}).items():
+                    _merge_bucket(self.minutes[key], bucket)
+                for key, bucket in saved.get("hours", {}).items():
+                    _merge_bucket(self.hours[key], bucket)
+            except (OSError, ValueError) as e:
+                print(f"Rollup load error: {e}")
+
+    def _buckets(self, when):
+        return self.minutes[when.strftime('%Y-%m-%dT%H:%M')], self.hours[when.strftime('%Y-%m-%dT%H')]
+
+    def _split(self, start, end):
+        """Yield (minute buckets, seconds) for [start, end) split at minute boundaries."""
+        while start < end:
+            minute_end = start.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            chunk_end = min(minute_end, end)
+            yield self._buckets(start), (chunk_end - start).total_seconds()
+            start = chunk_end
+
+    def _accrue(self, app, title_class, start, end, sign=1):
+        for buckets, seconds in self._split(start, end):
+            for bucket in buckets:
+                bucket["apps"][app] += sign * seconds
+                bucket["classes"][title_class] += sign * seconds
+
+    def _accrue_idle(self, start, end):
+        for buckets, seconds in self._split(start, end):
+            for bucket in buckets:
+                bucket["idle_seconds"] += seconds
+
+    def set_foreground(self, app, title, when=None):
+        when = when or datetime.now()
+        with self._lock:
+            self._close_interval(when)
+            self.foreground = (app, classify_title(title, self.title_classes)) if app else None
+            self.foreground_since = when
+            self.foreground_started = when
+
+    def _close_interval(self, when):
+        if self.idle_since is not None:
+            if when > self.idle_since:
+                self._accrue_idle(self.idle_since, when)
+                self.idle_since = when
+        elif self.foreground and self.foreground_since and when > self.foreground_since:
+            self._accrue(self.foreground[0], self.foreground[1], self.foreground_since, when)
+        self.foreground_since = when
+
+    def pause(self, when):
+        """Stop crediting the foreground app; time from ``when`` counts as idle."""
+        with self._lock:
+            if self.idle_since is None and self.foreground_since and when < self.foreground_since:
+                # A checkpoint between the last input and idle detection already credited
+                # the app past ``when``; take that back so no second counts twice.
+                start = max(when, self.foreground_started or when)
+                if self.foreground and start < self.foreground_since:
+                    self._accrue(self.foreground[0], self.foreground[1], start, self.foreground_since, sign=-1)
+                self.foreground_since = when = start
+            self._close_interval(when)
+            self.idle_since = when
+
+    def resume(self, when):
+        with self._lock:
+            self._close_interval(when)
+            self.idle_since = None
+            self.foreground_since = when
+            self.foreground_started = when
+
+    def add_keystrokes(self, count, when=None):
+        with self._lock:
+            for bucket in self._buckets(when or datetime.now()):
+                bucket["keystrokes"] += count
+
+    def checkpoint(self, when=None):
+        """Credit the open foreground interval and atomically rewrite the rollup file."""
+        with self._lock:
+            self._close_interval(when or datetime.now())
+            snapshot = {
+                "minutes": {k: _rounded(v) for k, v in sorted(self.minutes.items())},
+                "hours": {k: _rounded(v) for k, v in sorted(self.hours.items())},
+            }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+
+def _rounded(bucket):
+    return {
+        "apps": {k: round(v, 2) for k, v in bucket["apps"].items()},
+        "classes": {k: round(v, 2) for k, v in bucket["classes"].items()},
+        "keystrokes": bucket["keystrokes"],
+        "idle_seconds": round(bucket["idle_seconds"], 2),
+    }
+
+
+def usage_report(log_folder, start=None, end=None, granularity="day"):
+    """Aggregate rollups between ``start`` and ``end`` (datetimes, end exclusive).
+
+    Hour buckets are used unless the range boundaries fall inside an hour, in
+    which case minute buckets of the affected days are read.  Returns
+    ``{period: bucket}`` with periods by ``hour`` or ``day`` plus a ``total``.
+    """
+    exact = any(t is not None and (t.minute or t.second) for t in (start, end))
+    start_key = start.strftime('%Y-%m-%dT%H:%M') if start else None
+    end_key = end.strftime('%Y-%m-%dT%H:%M') if end else None
+
+    periods = defaultdict(_new_bucket)
+    total = _new_bucket()
+    for folder in day_folders(log_folder):
+        day = os.path.basename(folder)
+        if start and day < start.strftime('%Y-%m-%d'):
+            continue
+        if end and day > end.strftime('%Y-%m-%d'):
+            continue
+        path = os.path.join(folder, ROLLUP_NAME)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            saved = json.load(f)
+
+        buckets = saved.get("minutes" if exact else "hours", {})
+        for key, bucket in buckets.items():
+            minute_key = key if exact else key + ":00"
+            if start_key and minute_key < start_key:
+                continue
+            if end_key and minute_key >= end_key:
+                continue
+            period = key[:13] if granularity == "hour" else key[:10]
+            _merge_bucket(periods[period], bucket)
+            _merge_bucket(total, bucket)
+
+    report = {period: _rounded(bucket) for period, bucket in sorted(periods.items())}
+    report["total"] = _rounded(total)
+    return report
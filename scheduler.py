@@ -0,0 +1,205 @@
+"""One heap-based timer thread for every periodic and one-shot job of a session."""
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class Job:
+    def __init__(self, name, fn, interval, jitter, blocking=False):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.blocking = blocking
+        self.due = 0.0
+        self.cancelled = False
+        self.running = False
+
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.max_lateness_ms = 0.0
+        self.last_run_ms = None
+
+    def stats(self):
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "errors": self.errors,
+            "missed": self.missed,
+            "max_lateness_ms": round(self.max_lateness_ms, 2),
+            "last_run_ms": self.last_run_ms,
+        }
+
+
+class Scheduler:
+    """Runs jobs from a deadline heap on small worker pools.
+
+    Periodic jobs are fixed-rate: the next deadline is the previous one plus
+    ``interval`` (plus up to ``jitter`` seconds of random delay).  A deadline
+    that passes while the previous run is still busy, or that is already in
+    the past when rescheduled, is counted as missed rather than run late in a
+    burst.  Jobs registered with ``blocking=True`` (disk writes, waits on the
+    encoder or writer) run on their own ``io_workers`` pool, so they cannot
+    starve quick polling jobs.  :meth:`stop` wakes the timer thread
+    immediately, drops periodic deadlines, runs pending one-shots right away
+    and waits, up to its timeout, for everything in progress.
+    """
+
+    def __init__(self, workers=2, metrics=None, io_workers=2):
+        self.metrics = metrics
+        self._heap = []
+        self._jobs = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._running = set()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="scheduler")
+        self._io_pool = ThreadPoolExecutor(max_workers=max(1, int(io_workers)), thread_name_prefix="scheduler-io")
+
+    def every(self, name, interval, fn, jitter=0.0, first_delay=None, blocking=False):
+        """Run ``fn()`` every ``interval`` seconds, first after ``first_delay`` (default: now)."""
+        return self._add(Job(name, fn, interval, jitter, blocking), first_delay or 0.0)
+
+    def once(self, name, delay, fn, blocking=False):
+        """Run ``fn()`` once after ``delay`` seconds, or as soon as the scheduler stops."""
+        return self._add(Job(name, fn, None, 0.0, blocking), delay)
+
+    def _add(self, job, delay):
+        with self._cond:
+            previous = self._jobs.get(job.name)
+            if previous:
+                previous.cancelled = True
+            self._jobs[job.name] = job
+            job.due = time.monotonic() + delay
+            heapq.heappush(self._heap, (job.due, next(self._seq), job))
+            self._cond.notify()
+        return job
+
+    def set_interval(self, name, interval):
+        """Change a periodic job's interval; a shorter interval takes effect right away."""
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None or job.cancelled or job.interval == interval:
+                return
+            job.interval = interval
+            due = time.monotonic() + interval
+            if due < job.due:
+                # Superseded heap entries are skipped because their due time no longer matches.
+                job.due = due
+                heapq.heappush(self._heap, (job.due, next(self._seq), job))
+                self._cond.notify()
+
+    def cancel(self, name):
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job:
+                job.cancelled = True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="scheduler-timer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if self._heap:
+                        due, _, job = self._heap[0]
+                        if job.cancelled or due != job.due:
+                            heapq.heappop(self._heap)
+                            continue
+                        wait = due - time.monotonic()
+                        if wait <= 0:
+                            heapq.heappop(self._heap)
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._stopping:
+                    return
+                now = time.monotonic()
+                self._dispatch(job, now)
+
+    def _dispatch(self, job, now):
+        """Called with the lock held for a job whose deadline has passed."""
+        lateness_ms = (now - job.due) * 1000
+        if job.running:
+            job.missed += 1
+        else:
+            job.running = True
+            job.max_lateness_ms = max(job.max_lateness_ms, lateness_ms)
+            if self.metrics is not None:
+                self.metrics.histogram("scheduler.lateness_ms").observe(lateness_ms)
+            self._submit(job)
+
+        if job.interval is None:
+            self._jobs.pop(job.name, None)
+            return
+        due = job.due + job.interval
+        if due <= now:
+            skipped = int((now - due) // job.interval) + 1
+            job.missed += skipped
+            due += skipped * job.interval
+        if job.jitter:
+            due += random.uniform(0, job.jitter)
+        job.due = due
+        heapq.heappush(self._heap, (job.due, next(self._seq), job))
+
+    def _submit(self, job):
+        pool = self._io_pool if job.blocking else self._pool
+        future = pool.submit(self._execute, job)
+        self._running.add(future)
+        future.add_done_callback(self._running.discard)
+
+    def _execute(self, job):
+        start = time.perf_counter()
+        try:
+            job.fn()
+        except Exception as e:
+            job.errors += 1
+            print(f"Scheduled job '{job.name}' error: {e}")
+            if self.metrics is not None:
+                self.metrics.error(f"scheduler.{job.name}", e)
+        finally:
+            job.last_run_ms = round((time.perf_counter() - start) * 1000, 2)
+            job.runs += 1
+            job.running = False
+
+    def stats(self):
+        with self._cond:
+            jobs = list(self._jobs.values())
+        return {job.name: job.stats() for job in jobs}
+
+    def stop(self, timeout=10):
+        """Stop dispatching and wait up to ``timeout`` seconds in total for running jobs.
+
+        Periodic jobs are cancelled; one-shots not yet due are run now, since
+        they are work already asked for (a queued event, a pending capture).
+        Jobs still running after ``timeout`` are abandoned to the pools'
+        threads, which are not waited for; jobs not yet started are cancelled.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._stopping = True
+            pending = [job for job in self._jobs.values() if job.interval is None and not job.cancelled]
+            for job in self._jobs.values():
+                job.cancelled = True
+            for job in pending:
+                self._jobs.pop(job.name, None)
+            self._heap.clear()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            for job in sorted(pending, key=lambda job: job.due):
+                job.running = True
+                self._submit(job)
+            running = list(self._running)
+        wait(running, timeout=max(0.0, deadline - time.monotonic()))
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
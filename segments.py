@@ -0,0 +1,384 @@
+"""Size-bounded binary event segments with CRC framing and a sparse timestamp index.
+
+Layout of ``<day>/events/``::
+
+    segment_000001.evt   MAGIC, then frames: <length u32><crc32 u32><timestamp_us i64><payload>
+    segment_000001.idx   IDX_MAGIC, then every ``index_every``-th frame: <timestamp_us i64><offset u64>
+
+The payload is the compact UTF-8 JSON of one event and the CRC covers the
+timestamp and payload.  A crash can only tear the tail of the newest
+segment; opening a writer truncates it back to the last intact frame.
+"""
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from datetime import datetime
+
+SEGMENT_DIR = "events"
+MAGIC = b"EVS1"
+IDX_MAGIC = b"EVI1"
+FRAME = struct.Struct("<IIq")
+INDEX_ENTRY = struct.Struct("<qQ")
+SEGMENT_NAME = re.compile(r"^segment_(\d{6})\.evt$")
+
+
+def event_timestamp_us(event):
+    try:
+        return int(datetime.fromisoformat(event["timestamp"]).timestamp() * 1_000_000)
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
+def encode_frame(event):
+    payload = json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    timestamp = event_timestamp_us(event)
+    crc = zlib.crc32(payload, zlib.crc32(struct.pack("<q", timestamp)))
+    return FRAME.pack(len(payload), crc, timestamp) + payload, timestamp
+
+
+def segment_paths(folder):
+    """Segment files of an events folder in write order."""
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder)) if SEGMENT_NAME.match(name)]
+
+
+def _index_path(segment_path):
+    return segment_path[:-4] + ".idx"
+
+
+def scan_frames(buffer, start=len(MAGIC)):
+    """Yield (offset, timestamp_us, payload bytes) of intact frames; stop at the first torn one."""
+    offset = start
+    end = len(buffer)
+    while offset + FRAME.size <= end:
+        length, crc, timestamp = FRAME.unpack_from(buffer, offset)
+        payload_start = offset + FRAME.size
+        if payload_start + length > end:
+            return
+        payload = buffer[payload_start:payload_start + length]
+        if zlib.crc32(payload, zlib.crc32(struct.pack("<q", timestamp))) != crc:
+            return
+        yield offset, timestamp, payload
+        offset = payload_start + length
+
+
+def _valid_end(path):
+    """(end offset of the last intact frame, number of intact frames); (0, 0) without a header."""
+    size = os.path.getsize(path)
+    if size < len(MAGIC):
+        return 0, 0
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return 0, 0
+        if size == len(MAGIC):
+            return size, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            end, frames = len(MAGIC), 0
+            for offset, _, payload in scan_frames(buffer):
+                end = offset + FRAME.size + len(payload)
+                frames += 1
+            return end, frames
+
+
+def _read_index(path):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return []
+    if not data.startswith(IDX_MAGIC):
+        return []
+    body = data[len(IDX_MAGIC):]
+    usable = len(body) - len(body) % INDEX_ENTRY.size
+    return [INDEX_ENTRY.unpack_from(body, i) for i in range(0, usable, INDEX_ENTRY.size)]
+
+
+class SegmentJournal:
+    """Drop-in replacement for EventJournal that writes binary segments.
+
+    Frames are encoded by the calling thread and committed in batches of
+    ``flush_every`` or every ``flush_interval_ms``, like the JSONL journal.
+    A new segment is started once the current one exceeds ``max_segment_bytes``.
+    """
+
+    def __init__(self, folder, flush_every=20, flush_interval_ms=1000, fsync=False,
+                 max_segment_bytes=16 * 1024 * 1024, index_every=64):
+        self.folder = folder
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = max(0.01, flush_interval_ms / 1000.0)
+        self.fsync = fsync
+        self.max_segment_bytes = max_segment_bytes
+        self.index_every = max(1, int(index_every))
+        os.makedirs(folder, exist_ok=True)
+
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        self.events_written = 0
+        self.commits = 0
+        self.recovered_bytes = 0
+
+        self._file = None
+        self._index = None
+        self._open_last_segment()
+
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _open_last_segment(self):
+        paths = segment_paths(self.folder)
+        if not paths:
+            self._open_segment(1)
+            return
+
+        path = paths[-1]
+        end, frames = _valid_end(path)
+        size = os.path.getsize(path)
+        if end == 0:
+            # Not even a header survived; start the segment over.
+            self.recovered_bytes += size
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+            end = len(MAGIC)
+        elif end < size:
+            self.recovered_bytes += size - end
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+            print(f"Recovered event segment {os.path.basename(path)}: dropped {size - end} torn bytes")
+
+        entries = [entry for entry in _read_index(_index_path(path)) if entry[1] < end]
+        with open(_index_path(path), 'wb') as f:
+            f.write(IDX_MAGIC + b"".join(INDEX_ENTRY.pack(*entry) for entry in entries))
+
+        number = int(SEGMENT_NAME.match(os.path.basename(path)).group(1))
+        self._open_segment(number, fresh=False)
+        self._frames_in_segment = frames
+
+    def _open_segment(self, number, fresh=True):
+        self.segment_number = number
+        self.segment_path = os.path.join(self.folder, f"segment_{number:06d}.evt")
+        self._file = open(self.segment_path, 'ab')
+        self._index = open(_index_path(self.segment_path), 'ab')
+        if fresh or self._file.tell() == 0:
+            self._file.write(MAGIC)
+            if self._index.tell() == 0:
+                self._index.write(IDX_MAGIC)
+        self._frames_in_segment = 0
+
+    def append(self, event):
+        frame = encode_frame(event)
+        with self._pending_lock:
+            self._pending.append(frame)
+            should_commit = len(self._pending) >= self.flush_every
+        if should_commit:
+            self.flush()
+
+    def flush(self):
+        with self._commit_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch or self._file.closed:
+                return
+            chunks = []
+            index_entries = []
+            offset = self._file.tell()
+            for frame, timestamp in batch:
+                if offset >= self.max_segment_bytes and self._frames_in_segment:
+                    self._write(chunks, index_entries)
+                    chunks, index_entries = [], []
+                    self._rotate()
+                    offset = self._file.tell()
+                if self._frames_in_segment % self.index_every == 0:
+                    index_entries.append(INDEX_ENTRY.pack(timestamp, offset))
+                chunks.append(frame)
+                offset += len(frame)
+                self._frames_in_segment += 1
+            self._write(chunks, index_entries)
+            self.events_written += len(batch)
+            self.commits += 1
+
+    def _write(self, chunks, index_entries):
+        if chunks:
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+        if index_entries:
+            self._index.write(b"".join(index_entries))
+            self._index.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _rotate(self):
+        self._file.close()
+        self._index.close()
+        self._open_segment(self.segment_number + 1)
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Journal flush error: {e}")
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+        with self._commit_lock:
+            self._file.close()
+            self._index.close()
+
+
+class SegmentReader:
+    """Memory-maps the segments of an events folder for sequential or time-seeked reads."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.segments = segment_paths(folder)
+        self.indexes = [_read_index(_index_path(path)) for path in self.segments]
+
+    def _start(self, segment, since_us):
+        """Byte offset in ``segment`` to start scanning at for events at or after ``since_us``."""
+        entries = self.indexes[segment]
+        if since_us is None or not entries:
+            return len(MAGIC)
+        # Step back one entry: timestamps from different threads are only roughly ordered.
+        i = bisect_right([ts for ts, _ in entries], since_us) - 2
+        return entries[i][1] if i >= 0 else len(MAGIC)
+
+    def _first_segment(self, since_us):
+        if since_us is None:
+            return 0
+        first = 0
+        for i, entries in enumerate(self.indexes):
+            if entries and entries[0][0] <= since_us:
+                first = i
+        return max(0, first - 1)
+
+    def iter_events(self, since=None, until=None):
+        """Yield events in write order, optionally limited to [since, until) datetimes."""
+        since_us = int(since.timestamp() * 1_000_000) if since else None
+        until_us = int(until.timestamp() * 1_000_000) if until else None
+        for segment in range(self._first_segment(since_us), len(self.segments)):
+            path = self.segments[segment]
+            if os.path.getsize(path) <= len(MAGIC):
+                continue
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if buffer[:len(MAGIC)] != MAGIC:
+                    continue
+                for _, timestamp, payload in scan_frames(buffer, self._start(segment, since_us)):
+                    if since_us is not None and timestamp < since_us:
+                        continue
+                    if until_us is not None and timestamp >= until_us:
+                        continue
+                    yield json.loads(payload)
+
+
+def iter_json_array(source, chunk_size=1 << 16):
+    """Stream the objects of a (possibly huge, possibly torn) top-level JSON array.
+
+    ``source`` is a path or an open text file.  Memory is bounded by
+    ``chunk_size`` plus the largest single element.
+    """
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f, chunk_size)
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != "[":
+                raise ValueError(f"{getattr(source, 'name', source)} is not a JSON array")
+            started = True
+            position += 1
+            continue
+        if started and position < len(buffer) and buffer[position] == "]":
+            return
+        if position < len(buffer):
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    return
+            else:
+                # A value that ends exactly at the buffer edge may be a truncated number.
+                if end < len(buffer) or eof:
+                    yield value
+                    position = end
+                    continue
+        if eof:
+            return
+        chunk = source.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def migrate_day(day_folder, remove=False, max_segment_bytes=16 * 1024 * 1024):
+    """Convert a day's activity_log.json array and activity_log.jsonl into segments.
+
+    Returns the number of events converted.  Segments are built in a
+    ``.migrating`` sibling folder that is renamed into place once complete,
+    and the originals are renamed to ``*.migrated`` (or deleted with
+    ``remove``) only after that, so a migration interrupted at any point,
+    even by a crash, can simply be run again.
+    """
+    from journal import log_exists, open_log, read_events
+
+    folder = os.path.join(day_folder, SEGMENT_DIR)
+    if segment_paths(folder):
+        raise ValueError(f"{folder} already has segments; remove them to migrate again")
+    sources = [os.path.join(day_folder, name) for name in ("activity_log.json", "activity_log.jsonl")]
+    sources = [path for path in sources if log_exists(path)]
+    if not sources:
+        return 0
+
+    # Left behind by a migration that was killed part way
+    building = folder + ".migrating"
+    shutil.rmtree(building, ignore_errors=True)
+    journal = SegmentJournal(building, flush_every=500, flush_interval_ms=60_000,
+                             max_segment_bytes=max_segment_bytes)
+    count = 0
+    try:
+        for path in sources:
+            if path.endswith(".json"):
+                with open_log(path) as f:
+                    for event in iter_json_array(f):
+                        journal.append(event)
+                        count += 1
+            else:
+                for event in read_events(path):
+                    journal.append(event)
+                    count += 1
+    except BaseException:
+        journal.close()
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+    journal.close()
+    if os.path.isdir(folder):
+        # Holds no segments (checked above); rmdir refuses anything else in it
+        os.rmdir(folder)
+    os.replace(building, folder)
+
+    for path in sources:
+        if not os.path.exists(path):
+            path += ".gz"
+        if remove:
+            os.remove(path)
+        else:
+            os.replace(path, path + ".migrated")
+    return count
@@ -0,0 +1,26 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def write_day():
+    """Write ``events`` as a day folder's JSONL journal and return the folder."""
+
+    def write(log_folder, day, events):
+        folder = os.path.join(str(log_folder), day)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "activity_log.jsonl"), 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        return folder
+
+    return write
+
+
+def event(timestamp, event_type, event_name, **data):
+    return {"timestamp": timestamp, "event_type": event_type, "event_name": event_name, "data": data}
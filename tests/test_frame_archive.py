@@ -0,0 +1,53 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from frame_archive import LOOSE_FILE, ArchiveReader, export_archive, loose_time, pack_folder, screenshot_name
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _loose(folder, when):
+    name = screenshot_name(when, "png")
+    Image.new("RGB", (8, 8)).save(os.path.join(folder, name))
+    return name
+
+
+def test_names_keep_captures_in_one_second_apart():
+    first = screenshot_name(datetime(2024, 5, 1, 9, 0, 0, 120_000), "png")
+    second = screenshot_name(datetime(2024, 5, 1, 9, 0, 0, 870_000), "png")
+    assert first != second
+    assert loose_time(LOOSE_FILE.match(second)) == datetime(2024, 5, 1, 9, 0, 0, 870_000)
+    assert loose_time(LOOSE_FILE.match("screenshot_20240501_090000.png")) == datetime(2024, 5, 1, 9)
+
+
+def test_pack_twice_does_not_duplicate_frames(tmp_path):
+    for ms in (100, 600):
+        _loose(str(tmp_path), datetime(2024, 5, 1, 9, 0, 0, ms * 1000))
+    assert pack_folder(str(tmp_path)) == 2
+    assert pack_folder(str(tmp_path)) == 0
+
+    reader = ArchiveReader(str(tmp_path))
+    assert len(reader) == 2
+    assert reader.find(datetime(2024, 5, 1, 9, 0, 0, 300_000).timestamp()) == 0
+    reader.close()
+
+
+def test_pack_leaves_frames_older_than_the_archive(tmp_path):
+    _loose(str(tmp_path), datetime(2024, 5, 1, 9, 0, 5))
+    pack_folder(str(tmp_path), remove=True)
+    older = _loose(str(tmp_path), datetime(2024, 5, 1, 9, 0, 1))
+
+    assert pack_folder(str(tmp_path), remove=True) == 0
+    assert os.path.exists(os.path.join(str(tmp_path), older))
+
+
+def test_export_then_pack_round_trips(tmp_path):
+    source, exported = tmp_path / "source", tmp_path / "exported"
+    source.mkdir()
+    names = sorted(_loose(str(source), datetime(2024, 5, 1, 9, 0, s, 250_000)) for s in range(3))
+    pack_folder(str(source), remove=True)
+
+    assert export_archive(str(source), str(exported)) == 3
+    assert sorted(os.listdir(exported)) == names
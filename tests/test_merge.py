@@ -0,0 +1,54 @@
+import json
+import os
+
+import recorder
+from conftest import event
+from merge import merge_sources, reconcile_usage
+
+S = 1_000_000
+
+
+def test_reconcile_usage_credits_overlap_to_latest_switch():
+    app_seconds, host_seconds = reconcile_usage([
+        (0, 100 * S, "laptop", "code"),
+        (60 * S, 120 * S, "desktop", "chrome"),
+    ])
+    assert app_seconds == {"code": 60.0, "chrome": 60.0}
+    assert host_seconds == {"laptop": 60.0, "desktop": 60.0}
+
+
+def test_reconcile_usage_leaves_gaps_unbilled():
+    app_seconds, _ = reconcile_usage([(0, 10 * S, "a", "code"), (20 * S, 30 * S, "a", "code")])
+    assert app_seconds == {"code": 20.0}
+
+
+def test_merge_interleaves_hosts_in_time_order(tmp_path, write_day):
+    write_day(tmp_path / "laptop", "2024-05-01", [
+        event("2024-05-01T09:00:00", "system", "session_started"),
+        event("2024-05-01T09:00:20", "window", "changed", app="b", previous_app="a", time_on_previous=20),
+    ])
+    write_day(tmp_path / "desktop", "2024-05-01", [
+        event("2024-05-01T09:00:10", "system", "session_started"),
+    ])
+    out = tmp_path / "merged"
+    [summary] = merge_sources([str(tmp_path / "laptop"), str(tmp_path / "desktop")], str(out))
+
+    with open(out / "2024-05-01" / "activity_log.jsonl") as f:
+        merged = [json.loads(line) for line in f]
+    assert [(e["timestamp"][-8:], e["host"]) for e in merged] == [
+        ("09:00:00", "laptop"), ("09:00:10", "desktop"), ("09:00:20", "laptop")]
+    assert summary["events"] == {"laptop": 2, "desktop": 1}
+    assert summary["app_usage_minutes"] == {"a": round(20 / 60, 2)}
+
+
+def test_merge_command_honours_time_window(tmp_path, write_day, capsys):
+    for day in ("2024-05-01", "2024-05-02", "2024-05-03"):
+        write_day(tmp_path / "a", day, [event(f"{day}T09:00:00", "system", "session_started")])
+        write_day(tmp_path / "b", day, [event(f"{day}T10:00:00", "system", "session_started")])
+    out = tmp_path / "out"
+
+    recorder.main(["merge", str(out), str(tmp_path / "a"), str(tmp_path / "b"),
+                   "--since", "2024-05-02", "--until", "2024-05-02"])
+
+    assert sorted(os.listdir(out)) == ["2024-05-02"]
+    assert "2024-05-02: 2 events" in capsys.readouterr().out
@@ -0,0 +1,50 @@
+from conftest import event
+from reports import compute_day_partial
+
+DAY = "2024-05-01"
+
+
+def _at(clock):
+    return f"{DAY}T{clock}"
+
+
+def test_app_minutes_include_idle_start_and_session_end_billing(tmp_path, write_day):
+    folder = write_day(tmp_path, DAY, [
+        event(_at("09:00:00"), "system", "session_started"),
+        event(_at("09:00:00"), "window", "changed", app="code", previous_app=None, time_on_previous=0),
+        event(_at("09:10:00"), "activity", "idle_started", idle_since=_at("09:05:00"), app="code",
+              billed_seconds=300),
+        event(_at("09:20:00"), "activity", "idle_ended", idle_since=_at("09:05:00"),
+              idle_ended=_at("09:20:00"), idle_seconds=900, app="code"),
+        event(_at("09:30:00"), "system", "session_ended", duration_minutes=30, app="code",
+              time_on_current=600),
+    ])
+    partial = compute_day_partial(folder)
+    assert partial["app_minutes"] == {"code": 15.0}
+    assert partial["idle_minutes"] == 15.0
+    assert partial["active_minutes"] == 15.0
+
+
+def test_session_ending_while_idle_counts_the_idle_stretch(tmp_path, write_day):
+    folder = write_day(tmp_path, DAY, [
+        event(_at("09:00:00"), "system", "session_started"),
+        event(_at("09:20:00"), "activity", "idle_started", idle_since=_at("09:10:00"), app="code",
+              billed_seconds=600),
+        event(_at("09:40:00"), "system", "session_ended", duration_minutes=40, app="code", time_on_current=0),
+    ])
+    partial = compute_day_partial(folder)
+    assert partial["idle_minutes"] == 30.0
+    assert partial["active_minutes"] == 10.0
+
+
+def test_crashed_session_idle_is_closed_at_its_last_event(tmp_path, write_day):
+    folder = write_day(tmp_path, DAY, [
+        event(_at("09:00:00"), "system", "session_started"),
+        event(_at("09:20:00"), "activity", "idle_started", idle_since=_at("09:10:00"), app=None),
+        event(_at("09:25:00"), "status", "activity_check", is_idle=True),
+        event(_at("10:00:00"), "system", "session_started"),
+        event(_at("10:30:00"), "system", "session_ended", duration_minutes=30, app=None, time_on_current=0),
+    ])
+    partial = compute_day_partial(folder)
+    assert partial["sessions"] == 2
+    assert partial["idle_minutes"] == 15.0
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from rollups import RollupEngine
+
+T0 = datetime(2024, 5, 1, 9, 0, 30)
+
+
+def _totals(engine):
+    apps, idle = {}, 0.0
+    for bucket in engine.hours.values():
+        for app, seconds in bucket["apps"].items():
+            apps[app] = apps.get(app, 0.0) + seconds
+        idle += bucket["idle_seconds"]
+    return apps, idle
+
+
+def test_foreground_time_is_split_at_minute_boundaries(tmp_path):
+    engine = RollupEngine(str(tmp_path / "rollups.json"))
+    engine.set_foreground("code", "main.py", T0)
+    engine.set_foreground("chrome", "Docs", T0 + timedelta(seconds=90))
+
+    assert engine.minutes["2024-05-01T09:00"]["apps"] == {"code": 30.0}
+    assert engine.minutes["2024-05-01T09:01"]["apps"] == {"code": 60.0}
+    assert _totals(engine) == ({"code": 90.0}, 0.0)
+
+
+def test_idle_time_is_not_credited_to_the_app(tmp_path):
+    engine = RollupEngine(str(tmp_path / "rollups.json"))
+    engine.set_foreground("code", "main.py", T0)
+    engine.pause(T0 + timedelta(seconds=40))
+    engine.resume(T0 + timedelta(seconds=100))
+    engine.checkpoint(T0 + timedelta(seconds=120))
+
+    assert _totals(engine) == ({"code": 60.0}, 60.0)
+
+
+def test_checkpoint_before_idle_detection_is_not_counted_twice(tmp_path):
+    engine = RollupEngine(str(tmp_path / "rollups.json"))
+    engine.set_foreground("code", "main.py", T0)
+    # Last input at +30s, checkpoint at +50s, idle detected (backdated to +30s) at +60s
+    engine.checkpoint(T0 + timedelta(seconds=50))
+    engine.pause(T0 + timedelta(seconds=30))
+    engine.resume(T0 + timedelta(seconds=90))
+
+    apps, idle = _totals(engine)
+    assert apps == {"code": 30.0}
+    assert idle == 60.0
+
+
+def test_idle_start_before_the_current_window_keeps_earlier_apps(tmp_path):
+    engine = RollupEngine(str(tmp_path / "rollups.json"))
+    engine.set_foreground("code", "main.py", T0)
+    engine.set_foreground("chrome", "Docs", T0 + timedelta(seconds=20))
+    engine.checkpoint(T0 + timedelta(seconds=50))
+    engine.pause(T0 + timedelta(seconds=10))
+    engine.resume(T0 + timedelta(seconds=60))
+
+    apps, idle = _totals(engine)
+    assert apps == {"code": 20.0, "chrome": 0.0}
+    assert idle == 40.0
+
+
+def test_checkpoint_round_trips_through_the_file(tmp_path):
+    path = str(tmp_path / "rollups.json")
+    engine = RollupEngine(path)
+    engine.set_foreground("code", "main.py", T0)
+    engine.add_keystrokes(12, T0)
+    engine.checkpoint(T0 + timedelta(seconds=10))
+
+    reloaded = RollupEngine(path)
+    assert reloaded.minutes["2024-05-01T09:00"]["apps"] == {"code": 10.0}
+    assert reloaded.hours["2024-05-01T09"]["keystrokes"] == 12
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from scheduler import Scheduler
+
+
+def _started(scheduler):
+    scheduler.start()
+    return scheduler
+
+
+def test_one_shots_run_in_deadline_order():
+    scheduler = _started(Scheduler(workers=1))
+    order = []
+    done = threading.Event()
+    scheduler.once("late", 0.10, lambda: (order.append("late"), done.set()))
+    scheduler.once("early", 0.02, lambda: order.append("early"))
+    scheduler.once("middle", 0.05, lambda: order.append("middle"))
+    assert done.wait(2)
+    scheduler.stop()
+    assert order == ["early", "middle", "late"]
+
+
+def test_once_with_same_name_replaces_pending_job():
+    scheduler = _started(Scheduler())
+    calls = []
+    scheduler.once("capture", 0.05, lambda: calls.append(1))
+    scheduler.once("capture", 0.05, lambda: calls.append(2))
+    time.sleep(0.2)
+    scheduler.stop()
+    assert calls == [2]
+
+
+def test_busy_periodic_job_counts_missed_deadlines():
+    scheduler = _started(Scheduler())
+    scheduler.every("slow", 0.02, lambda: time.sleep(0.15))
+    time.sleep(0.3)
+    stats = scheduler.stats()["slow"]
+    scheduler.stop()
+    assert stats["missed"] > 0
+    assert stats["runs"] <= 2
+
+
+def test_stop_runs_pending_one_shots():
+    scheduler = _started(Scheduler())
+    ran = []
+    scheduler.once("goal_set", 30, lambda: ran.append("goal"))
+    scheduler.every("poll", 30, lambda: ran.append("poll"), first_delay=30)
+    scheduler.stop()
+    assert ran == ["goal"]
+
+
+def test_stop_honours_timeout():
+    scheduler = _started(Scheduler())
+    scheduler.once("stuck", 0, lambda: time.sleep(2))
+    time.sleep(0.05)
+    start = time.monotonic()
+    scheduler.stop(timeout=0.2)
+    assert time.monotonic() - start < 1
+
+
+def test_blocking_jobs_do_not_starve_polling():
+    scheduler = _started(Scheduler(workers=1, io_workers=1))
+    release = threading.Event()
+    polls = []
+    scheduler.every("capture", 0.01, release.wait, blocking=True)
+    scheduler.every("poll", 0.02, lambda: polls.append(1))
+    time.sleep(0.2)
+    release.set()
+    scheduler.stop()
+    assert len(polls) >= 3
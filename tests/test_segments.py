@@ -0,0 +1,67 @@
+import json
+import os
+
+from conftest import event
+from journal import iter_day_events
+from segments import SEGMENT_DIR, SegmentJournal, SegmentReader, migrate_day, segment_paths
+
+
+def _events(n, day="2024-05-01"):
+    return [event(f"{day}T09:00:{i:02d}", "test", "tick", i=i) for i in range(n)]
+
+
+def _write_segments(folder, events):
+    journal = SegmentJournal(str(folder), flush_every=1)
+    for e in events:
+        journal.append(e)
+    journal.close()
+    return segment_paths(str(folder))[-1]
+
+
+def test_reader_returns_events_in_order(tmp_path):
+    _write_segments(tmp_path, _events(5))
+    assert [e["data"]["i"] for e in SegmentReader(str(tmp_path)).iter_events()] == [0, 1, 2, 3, 4]
+
+
+def test_torn_tail_is_dropped_on_reopen(tmp_path):
+    path = _write_segments(tmp_path, _events(3))
+    intact = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b"\x40\x00\x00\x00half a frame")
+
+    journal = SegmentJournal(str(tmp_path))
+    journal.append(_events(4)[3])
+    journal.close()
+
+    assert journal.recovered_bytes == 16
+    assert os.path.getsize(path) > intact
+    assert [e["data"]["i"] for e in SegmentReader(str(tmp_path)).iter_events()] == [0, 1, 2, 3]
+
+
+def test_crc_mismatch_ends_the_segment(tmp_path):
+    path = _write_segments(tmp_path, _events(3))
+    with open(path, 'r+b') as f:
+        f.seek(-3, os.SEEK_END)
+        f.write(b"XYZ")
+    assert [e["data"]["i"] for e in SegmentReader(str(tmp_path)).iter_events()] == [0, 1]
+
+
+def test_migrate_day_after_killed_migration(tmp_path, write_day):
+    day = write_day(tmp_path, "2024-05-01", _events(10))
+    # What a migration killed part way leaves behind
+    _write_segments(os.path.join(day, SEGMENT_DIR + ".migrating"), _events(4))
+
+    assert migrate_day(day) == 10
+    assert not os.path.exists(os.path.join(day, SEGMENT_DIR + ".migrating"))
+    assert os.path.exists(os.path.join(day, "activity_log.jsonl.migrated"))
+    assert [e["data"]["i"] for e in iter_day_events(day)] == list(range(10))
+
+
+def test_migrate_day_reads_legacy_array_then_journal(tmp_path, write_day):
+    day = write_day(tmp_path, "2024-05-01", _events(2))
+    with open(os.path.join(day, "activity_log.json"), 'w') as f:
+        json.dump(_events(3, "2024-04-30"), f, indent=2)
+
+    assert migrate_day(day, remove=True) == 5
+    assert sorted(os.listdir(day)) == [SEGMENT_DIR]
+    assert [e["timestamp"][:10] for e in iter_day_events(day)] == ["2024-04-30"] * 3 + ["2024-05-01"] * 2
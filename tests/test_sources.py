@@ -0,0 +1,74 @@
+from clipboard_sources import PollingClipboardSource
+from window_sources import PollingWindowSource
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.jobs = {}
+
+    def every(self, name, interval, fn, **kwargs):
+        self.jobs[name] = fn
+
+
+def test_window_poll_reports_only_changes():
+    windows = iter([("code.exe", "a.py"), ("code.exe", "a.py"), ("code.exe", "Unknown"),
+                    ("chrome.exe", "Docs"), ("code.exe", "a.py")])
+    changes = []
+    source = PollingWindowSource(lambda: next(windows), process_names=object())
+    scheduler = FakeScheduler()
+    source.start(lambda app, title, when: changes.append((app, title)), scheduler)
+    for _ in range(5):
+        scheduler.jobs["window_poll"]()
+
+    assert changes == [("code.exe", "a.py"), ("chrome.exe", "Docs"), ("code.exe", "a.py")]
+
+
+def test_window_poll_survives_errors_and_stops():
+    def broken():
+        raise RuntimeError("no display")
+
+    changes = []
+    source = PollingWindowSource(broken, process_names=object())
+    scheduler = FakeScheduler()
+    source.start(lambda *args: changes.append(args), scheduler)
+    scheduler.jobs["window_poll"]()
+    source.get_info = lambda: ("code.exe", "a.py")
+    source.stop()
+    scheduler.jobs["window_poll"]()
+    assert changes == []
+
+
+def test_clipboard_fetches_only_when_sequence_moves():
+    clipboard = {"text": "one", "sequence": 1, "pastes": 0}
+
+    def paste():
+        clipboard["pastes"] += 1
+        return clipboard["text"]
+
+    changes = []
+    source = PollingClipboardSource(paste=paste, sequence_number=lambda: clipboard["sequence"])
+    scheduler = FakeScheduler()
+    source.start(lambda text, when: changes.append(text), scheduler)
+    poll = scheduler.jobs["clipboard_poll"]
+    poll()
+    poll()
+    clipboard["sequence"] = 2
+    poll()
+    clipboard.update(text="two", sequence=3)
+    poll()
+
+    assert changes == ["one", "two"]
+    assert clipboard["pastes"] == 3
+    assert source.changes == 2
+
+
+def test_clipboard_without_sequence_compares_content():
+    texts = iter(["one", "one", "two"])
+    changes = []
+    source = PollingClipboardSource(paste=lambda: next(texts))
+    source.sequence_number = None
+    scheduler = FakeScheduler()
+    source.start(lambda text, when: changes.append(text), scheduler)
+    for _ in range(3):
+        scheduler.jobs["clipboard_poll"]()
+    assert changes == ["one", "two"]
@@ -0,0 +1,117 @@
+import os
+import threading
+
+from writer import BLOCK, COALESCE, DEFAULT_POLICIES, DROP_OLDEST, Record, RecordWriter
+
+
+class GatedJournal:
+    """Journal whose first append waits for ``gate``, so records pile up in the queue."""
+
+    def __init__(self):
+        self.events = []
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+
+    def append(self, event):
+        self.entered.set()
+        self.gate.wait(5)
+        self.events.append(event)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordingIndex:
+    def __init__(self):
+        self.docs = []
+
+    def add(self, source, path, offset, length, text, timestamp, app=None, window_title=None):
+        self.docs.append((path, offset, length, text))
+
+    def close(self):
+        pass
+
+
+def _event(source, n):
+    return Record(source, "event", "test", {"event_type": source, "n": n})
+
+
+def _stalled_writer(max_queue, policies=None):
+    journal = GatedJournal()
+    writer = RecordWriter(journal, max_queue=max_queue, batch_size=1, policies=policies)
+    writer.submit(_event("system", -1))
+    assert journal.entered.wait(5)
+    return writer, journal
+
+
+def test_window_records_block_instead_of_dropping():
+    assert DEFAULT_POLICIES["window"] == BLOCK
+
+
+def test_drop_oldest_discards_queued_droppable_records():
+    writer, journal = _stalled_writer(2, {"clipboard": DROP_OLDEST})
+    for n in range(4):
+        assert writer.submit(_event("clipboard", n))
+    journal.gate.set()
+    assert writer.sync()
+    writer.close()
+
+    assert [e["n"] for e in journal.events] == [-1, 2, 3]
+    assert writer.stats()["dropped"] == {"clipboard": 2}
+
+
+def test_coalesce_keeps_only_the_latest_queued_snapshot():
+    writer, journal = _stalled_writer(10, {"status": COALESCE})
+    for n in range(3):
+        writer.submit(_event("status", n))
+    journal.gate.set()
+    assert writer.sync()
+    writer.close()
+
+    assert [e["n"] for e in journal.events] == [-1, 2]
+    assert writer.stats()["coalesced"] == {"status": 2}
+
+
+def test_block_waits_for_room():
+    writer, journal = _stalled_writer(1, {"input": BLOCK})
+    writer.submit(_event("input", 0))
+    submitted = threading.Event()
+    thread = threading.Thread(target=lambda: (writer.submit(_event("input", 1)), submitted.set()))
+    thread.start()
+    assert not submitted.wait(0.2)
+    journal.gate.set()
+    assert submitted.wait(5)
+    assert writer.sync()
+    writer.close()
+    assert [e["n"] for e in journal.events] == [-1, 0, 1]
+
+
+def test_submit_after_close_is_counted_as_dropped():
+    journal = GatedJournal()
+    journal.gate.set()
+    writer = RecordWriter(journal)
+    writer.close()
+    assert writer.submit(_event("window", 0)) is False
+    assert writer.stats()["dropped"] == {"window": 1}
+
+
+def test_text_offsets_point_at_each_record(tmp_path):
+    path = str(tmp_path / "clipboard.txt")
+    with open(path, 'wb') as f:
+        f.write(b"existing\n")
+    journal = GatedJournal()
+    journal.gate.set()
+    index = RecordingIndex()
+    writer = RecordWriter(journal, text_index=index)
+    for text in ("first\n", "zwei ü\n", "third"):
+        writer.submit(Record("clipboard", "text", path, text, {"text": text, "timestamp": "t"}))
+    assert writer.sync()
+    writer.close()
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    for _, offset, length, text in index.docs:
+        assert data[offset:offset + length].decode('utf-8').replace(os.linesep, "\n") == text
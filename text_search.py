@@ -0,0 +1,119 @@
+"""Incremental inverted index over keystroke and clipboard text.
+
+Each flushed keystroke chunk or clipboard capture is one document.  The index
+stores where the document lives (file, byte offset, length) plus its
+timestamp and window context, and token -> document postings with term
+frequencies.  Only new documents are tokenized, so indexing cost is
+proportional to new data.
+"""
+import math
+import os
+import re
+import sqlite3
+from collections import Counter, defaultdict
+
+from journal import open_log
+
+TOKEN = re.compile(r"\w{2,}", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS text_docs (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    app TEXT,
+    window_title TEXT
+);
+CREATE TABLE IF NOT EXISTS text_postings (
+    token TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (token, doc_id)
+) WITHOUT ROWID;
+"""
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN.findall(text)]
+
+
+class TextIndex:
+    def __init__(self, db_path, root):
+        self.root = root
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, source, path, offset, length, text, timestamp, app=None, window_title=None):
+        counts = Counter(tokenize(text))
+        if not counts:
+            return
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO text_docs (timestamp, source, path, offset, length, app, window_title) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (timestamp, source, os.path.relpath(path, self.root), offset, length, app, window_title))
+            doc_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO text_postings (token, doc_id, tf) VALUES (?, ?, ?)",
+                [(token, doc_id, tf) for token, tf in counts.items()])
+
+    def search(self, query, source=None, limit=20):
+        """Return documents ranked by tf-idf over the query tokens, best first."""
+        tokens = sorted(set(tokenize(query)))
+        if not tokens:
+            return []
+
+        total_docs = self.conn.execute("SELECT COUNT(*) FROM text_docs").fetchone()[0] or 1
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        for token in tokens:
+            postings = self.conn.execute(
+                "SELECT doc_id, tf FROM text_postings WHERE token = ?", (token,)).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + total_docs / len(postings))
+            for doc_id, tf in postings:
+                scores[doc_id] += (1 + math.log(tf)) * idf
+                matched[doc_id] += 1
+
+        # Documents containing every query token rank above partial matches.
+        ranked = sorted(scores, key=lambda d: (matched[d], scores[d]), reverse=True)
+
+        hits = []
+        for doc_id in ranked:
+            row = self.conn.execute(
+                "SELECT timestamp, source, path, offset, length, app, window_title "
+                "FROM text_docs WHERE id = ?", (doc_id,)).fetchone()
+            if source and row[1] != source:
+                continue
+            timestamp, doc_source, path, offset, length, app, window_title = row
+            hits.append({
+                "score": round(scores[doc_id], 3),
+                "timestamp": timestamp,
+                "source": doc_source,
+                "path": path,
+                "offset": offset,
+                "app": app,
+                "window_title": window_title,
+                "text": self.read_text(path, offset, length),
+            })
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def read_text(self, path, offset, length):
+        try:
+            # Offsets stay valid after retention gzips the file; seeking just decompresses up to them.
+            with open_log(os.path.join(self.root, path), 'rb') as f:
+                f.seek(offset)
+                return f.read(length).decode('utf-8', errors='replace').replace('\r\n', '\n')
+        except OSError:
+            return ""
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,70 @@
+"""Content-addressed tile storage for screenshots.
+
+A frame is cut into fixed-size tiles, each tile is hashed, and only tiles
+whose hash is not yet in the day's store are written.  A small JSON manifest
+per frame lists the tile hashes so the frame can be rebuilt on demand.
+"""
+import hashlib
+import json
+import os
+
+from PIL import Image
+
+MANIFEST_SUFFIX = ".tiles.json"
+
+
+def tile_path(tile_dir, digest):
+    return os.path.join(tile_dir, digest[:2], digest + ".png")
+
+
+def store_frame(image, manifest_path, tile_dir, tile_size=128, compress_level=6):
+    """Write the missing tiles of ``image`` and its manifest; return storage stats."""
+    width, height = image.size
+    tiles = []
+    new_tiles = 0
+    bytes_written = 0
+
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            tile = image.crop((left, top, min(left + tile_size, width), min(top + tile_size, height)))
+            digest = hashlib.sha1(
+                f"{tile.mode}:{tile.width}x{tile.height}:".encode() + tile.tobytes()
+            ).hexdigest()
+            tiles.append([left, top, digest])
+
+            path = tile_path(tile_dir, digest)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            tile.save(tmp_path, "PNG", compress_level=compress_level)
+            bytes_written += os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            new_tiles += 1
+
+    manifest = {
+        "width": width,
+        "height": height,
+        "mode": image.mode,
+        "tile_size": tile_size,
+        "tile_dir": os.path.relpath(tile_dir, os.path.dirname(manifest_path)),
+        "tiles": tiles,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    bytes_written += os.path.getsize(manifest_path)
+
+    return {"tiles": len(tiles), "new_tiles": new_tiles, "size_bytes": bytes_written}
+
+
+def reconstruct_frame(manifest_path):
+    """Rebuild the frame described by a manifest as a normal PIL image."""
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+
+    tile_dir = os.path.join(os.path.dirname(manifest_path), manifest["tile_dir"])
+    frame = Image.new(manifest["mode"], (manifest["width"], manifest["height"]))
+    for left, top, digest in manifest["tiles"]:
+        with Image.open(tile_path(tile_dir, digest)) as tile:
+            frame.paste(tile, (left, top))
+    return frame
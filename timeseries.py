@@ -0,0 +1,142 @@
+"""Fixed-memory per-minute activity counters, persisted as binary arrays per day.
+
+``<day>/timeseries.bin`` is MAGIC followed by one array of 1440 values
+(minute of the day, local time) per series in ``SERIES`` order, little-endian,
+with the typecode from ``TYPECODES``.
+"""
+import os
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+
+TIMESERIES_NAME = "timeseries.bin"
+MAGIC = b"TSM1"
+MINUTES_PER_DAY = 1440
+SERIES = ("keystrokes", "mouse", "window_switches", "idle_seconds")
+TYPECODES = {"keystrokes": "I", "mouse": "I", "window_switches": "I", "idle_seconds": "f"}
+
+
+def _epoch_minute(when):
+    return int(when.timestamp() // 60)
+
+
+def load_day(path):
+    """``{series: array}`` of a day's saved minutes, or None if the file is missing or unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if not data.startswith(MAGIC):
+        return None
+    arrays = {}
+    offset = len(MAGIC)
+    for name in SERIES:
+        values = array(TYPECODES[name])
+        size = values.itemsize * MINUTES_PER_DAY
+        if offset + size > len(data):
+            return None
+        values.frombytes(data[offset:offset + size])
+        if sys.byteorder == "big":
+            values.byteswap()
+        arrays[name] = values
+        offset += size
+    return arrays
+
+
+class MinuteSeries:
+    """Ring buffers holding the last ``capacity`` minutes of each series.
+
+    Every slot carries the epoch minute it belongs to, so a slot left over
+    from a previous lap of the ring reads as zero and is cleared on the next
+    write.  Input hooks only pay for a clock read and an in-place add.
+    """
+
+    def __init__(self, capacity=MINUTES_PER_DAY):
+        self.capacity = max(2, int(capacity))
+        self.values = {name: array(TYPECODES[name], [0]) * self.capacity for name in SERIES}
+        self.stamps = array('q', [-1]) * self.capacity
+        self._lock = threading.Lock()
+
+    def _slot(self, minute):
+        slot = minute % self.capacity
+        if self.stamps[slot] != minute:
+            for values in self.values.values():
+                values[slot] = 0
+            self.stamps[slot] = minute
+        return slot
+
+    def add(self, name, amount=1, when=None):
+        minute = int(time.time() // 60) if when is None else _epoch_minute(when)
+        with self._lock:
+            if self.stamps[minute % self.capacity] > minute:
+                # Older than anything the ring still covers
+                return
+            slot = self._slot(minute)
+            self.values[name][slot] += amount
+
+    def add_span(self, name, start, end):
+        """Add the seconds of [start, end) to ``name``, split at minute boundaries."""
+        start = max(start, end - timedelta(minutes=self.capacity))
+        while start < end:
+            minute_end = start.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            chunk_end = min(minute_end, end)
+            self.add(name, (chunk_end - start).total_seconds(), start)
+            start = chunk_end
+
+    def recent(self, name, minutes, now=None):
+        """The last ``minutes`` values of ``name``, oldest first, ending with the current minute."""
+        current = int(time.time() // 60) if now is None else _epoch_minute(now)
+        minutes = min(minutes, self.capacity)
+        values = self.values[name]
+        with self._lock:
+            return [values[m % self.capacity] if self.stamps[m % self.capacity] == m else 0
+                    for m in range(current - minutes + 1, current + 1)]
+
+    def per_minute(self, name, minutes=5, now=None):
+        """Average of ``name`` over the last ``minutes`` complete minutes."""
+        history = self.recent(name, minutes + 1, now)[:-1]
+        return sum(history) / max(1, len(history))
+
+    def load(self, path, day):
+        """Seed the ring with the minutes of ``day`` (a date) saved by earlier sessions."""
+        saved = load_day(path)
+        if saved is None:
+            return
+        first = _epoch_minute(datetime.combine(day, datetime.min.time()))
+        newest = int(time.time() // 60)
+        with self._lock:
+            for offset in range(MINUTES_PER_DAY):
+                minute = first + offset
+                if minute > newest or minute <= newest - self.capacity:
+                    continue
+                if not any(saved[name][offset] for name in SERIES):
+                    continue
+                slot = self._slot(minute)
+                for name in SERIES:
+                    self.values[name][slot] += saved[name][offset]
+
+    def save(self, path, day):
+        """Write ``day``'s minutes to ``path``; minutes no longer in the ring keep their saved values."""
+        saved = load_day(path) or {name: array(TYPECODES[name], [0]) * MINUTES_PER_DAY for name in SERIES}
+        first = _epoch_minute(datetime.combine(day, datetime.min.time()))
+        with self._lock:
+            for offset in range(MINUTES_PER_DAY):
+                minute = first + offset
+                slot = minute % self.capacity
+                if self.stamps[slot] != minute:
+                    continue
+                for name in SERIES:
+                    saved[name][offset] = self.values[name][slot]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            for name in SERIES:
+                values = saved[name]
+                if sys.byteorder == "big":
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                f.write(values.tobytes())
+        os.replace(tmp_path, path)
@@ -0,0 +1,284 @@
+"""Active-window sources: event-driven backends with a polling fallback.
+
+Every source calls ``on_change(app, title, when)`` once per foreground
+switch or title change of the foreground window.
+"""
+import abc
+import select
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+class ProcessNameCache:
+    """pid -> process name, keyed by (pid, create_time) so reused pids are not confused."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._names = {}
+        self.hits = 0
+        self.misses = 0
+
+    def name(self, pid):
+        import psutil
+
+        try:
+            process = psutil.Process(pid)
+            key = (pid, process.create_time())
+            name = self._names.get(key)
+            if name is not None:
+                self.hits += 1
+                return name
+            name = process.name()
+        except (psutil.Error, ValueError):
+            return "Unknown"
+
+        self.misses += 1
+        if len(self._names) >= self.max_entries:
+            self._names.pop(next(iter(self._names)))
+        self._names[key] = name
+        return name
+
+
+class WindowSource(abc.ABC):
+    name = "base"
+
+    def __init__(self, process_names=None):
+        self.process_names = process_names or ProcessNameCache()
+        self.on_change = None
+        self.last = None
+        self.running = False
+        self._thread = None
+
+    def start(self, on_change, scheduler=None):
+        self.on_change = on_change
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _emit(self, app, title):
+        if not title or (app, title) == self.last:
+            return
+        self.last = (app, title)
+        try:
+            self.on_change(app, title, datetime.now())
+        except Exception as e:
+            print(f"Window tracking error: {e}")
+
+    @abc.abstractmethod
+    def _run(self):
+        """Report foreground changes through ``_emit`` until ``running`` is cleared."""
+
+
+class PollingWindowSource(WindowSource):
+    """Fallback that asks ``get_info()`` for (app, title) every ``interval`` seconds."""
+
+    name = "poll"
+
+    def __init__(self, get_info, interval=2, process_names=None):
+        super().__init__(process_names)
+        self.get_info = get_info
+        self.interval = interval
+
+    def start(self, on_change, scheduler=None):
+        """Poll from ``scheduler`` when one is given instead of a dedicated thread."""
+        if scheduler is None:
+            return super().start(on_change)
+        self.on_change = on_change
+        self.running = True
+        scheduler.every("window_poll", self.interval, self.poll)
+
+    def poll(self):
+        if not self.running:
+            return
+        try:
+            app, title = self.get_info()
+            if title not in {"Unknown", "Unavailable"}:
+                self._emit(app, title)
+        except Exception as e:
+            print(f"Window tracking error: {e}")
+
+    def _run(self):
+        while self.running:
+            self.poll()
+            time.sleep(self.interval)
+
+
+class WinEventWindowSource(WindowSource):
+    """Windows foreground and title-change notifications via SetWinEventHook."""
+
+    name = "winevent"
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    WM_QUIT = 0x0012
+
+    def __init__(self, process_names=None):
+        super().__init__(process_names)
+        import ctypes
+        from ctypes import wintypes
+
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self._thread_id = None
+
+    def _window_info(self, hwnd):
+        ctypes, wintypes = self.ctypes, self.wintypes
+        length = self.user32.GetWindowTextLengthW(hwnd)
+        buffer = ctypes.create_unicode_buffer(length + 1)
+        self.user32.GetWindowTextW(hwnd, buffer, length + 1)
+        pid = wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return self.process_names.name(pid.value), buffer.value
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, thread, event_time):
+        if not hwnd:
+            return
+        if event == self.EVENT_OBJECT_NAMECHANGE:
+            if id_object != self.OBJID_WINDOW or hwnd != self.user32.GetForegroundWindow():
+                return
+        self._emit(*self._window_info(hwnd))
+
+    def _run(self):
+        ctypes, wintypes = self.ctypes, self.wintypes
+        self._thread_id = self.kernel32.GetCurrentThreadId()
+
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        callback = proc_type(self._on_event)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        hooks = [
+            self.user32.SetWinEventHook(event, event, 0, callback, 0, 0, flags)
+            for event in (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_OBJECT_NAMECHANGE)
+        ]
+
+        foreground = self.user32.GetForegroundWindow()
+        if foreground:
+            self._emit(*self._window_info(foreground))
+
+        msg = wintypes.MSG()
+        while self.running and self.user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            self.user32.TranslateMessage(ctypes.byref(msg))
+            self.user32.DispatchMessageW(ctypes.byref(msg))
+
+        for hook in hooks:
+            if hook:
+                self.user32.UnhookWinEvent(hook)
+
+    def stop(self):
+        super().stop()
+        if self._thread_id:
+            self.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+
+class X11WindowSource(WindowSource):
+    """X11 foreground tracking from _NET_ACTIVE_WINDOW property-change notifications."""
+
+    name = "x11"
+
+    def __init__(self, process_names=None, display_name=None):
+        super().__init__(process_names)
+        from Xlib import X, Xatom, display
+
+        self.X = X
+        self.display = display.Display(display_name)
+        self.root = self.display.screen().root
+        self.NET_ACTIVE_WINDOW = self.display.intern_atom('_NET_ACTIVE_WINDOW')
+        self.NET_WM_NAME = self.display.intern_atom('_NET_WM_NAME')
+        self.NET_WM_PID = self.display.intern_atom('_NET_WM_PID')
+        self.UTF8_STRING = self.display.intern_atom('UTF8_STRING')
+        self.WM_NAME = Xatom.WM_NAME
+        self.active = None
+
+    def _property(self, window, atom, type_=None):
+        prop = window.get_full_property(atom, type_ if type_ is not None else self.X.AnyPropertyType)
+        return prop.value if prop else None
+
+    def _window_info(self, window):
+        title = self._property(window, self.NET_WM_NAME, self.UTF8_STRING)
+        if title is None:
+            title = self._property(window, self.WM_NAME)
+        if isinstance(title, bytes):
+            title = title.decode('utf-8', errors='replace')
+
+        pid = self._property(window, self.NET_WM_PID)
+        if pid:
+            app = self.process_names.name(int(pid[0]))
+        else:
+            wm_class = window.get_wm_class()
+            app = wm_class[1] if wm_class else "Unknown"
+        return app, title or ""
+
+    def _refresh_active(self):
+        from Xlib.error import XError
+
+        try:
+            value = self._property(self.root, self.NET_ACTIVE_WINDOW)
+            if not value or not value[0]:
+                return
+            window = self.display.create_resource_object('window', value[0])
+            if self.active is None or self.active.id != window.id:
+                # Title changes arrive as property notifications on the window itself.
+                window.change_attributes(event_mask=self.X.PropertyChangeMask)
+                self.active = window
+            self._emit(*self._window_info(window))
+        except XError:
+            self.active = None
+
+    def _run(self):
+        X = self.X
+        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._refresh_active()
+        self.display.flush()
+
+        while self.running:
+            try:
+                readable, _, _ = select.select([self.display.fileno()], [], [], 0.5)
+                if not readable and not self.display.pending_events():
+                    continue
+                while self.display.pending_events():
+                    event = self.display.next_event()
+                    if event.type != X.PropertyNotify:
+                        continue
+                    if event.window == self.root and event.atom == self.NET_ACTIVE_WINDOW:
+                        self._refresh_active()
+                    elif (self.active is not None and event.window == self.active
+                          and event.atom in (self.NET_WM_NAME, self.WM_NAME)):
+                        self._refresh_active()
+            except Exception as e:
+                print(f"Window tracking error: {e}")
+                time.sleep(1)
+        self.display.close()
+
+
+def create_window_source(kind="auto", poll_info=None, poll_interval=2, process_names=None):
+    """Pick a window source for this platform, or None if none is available.
+
+    ``kind`` is ``auto``, ``winevent``, ``x11`` or ``poll``; ``poll`` needs a
+    ``poll_info()`` callable returning (app, title).
+    """
+    process_names = process_names or ProcessNameCache()
+    candidates = [kind] if kind != "auto" else (
+        ["winevent", "poll"] if sys.platform.startswith("win") else ["x11"]
+    )
+
+    for candidate in candidates:
+        try:
+            if candidate == "winevent" and sys.platform.startswith("win"):
+                return WinEventWindowSource(process_names)
+            if candidate == "x11":
+                return X11WindowSource(process_names)
+            if candidate == "poll" and poll_info is not None:
+                return PollingWindowSource(poll_info, poll_interval, process_names)
+        except Exception as e:
+            print(f"Window source '{candidate}' unavailable: {e}")
+    return None
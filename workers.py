@@ -0,0 +1,450 @@
+"""Capture and persistence in supervised worker processes.
+
+With ``process_isolation`` the tracker process keeps only the overlay, the
+input hooks and the capture sources.  Screenshot grabbing, change detection
+and encoding run in a capture worker; the record writer with its journal
+and indexes runs in a persistence worker.  Both exchange messages with the
+tracker over multiprocessing queues.
+
+A worker killed mid-``get`` can leave its queue's lock held forever, so a
+restarted worker gets fresh queues; whatever was still queued for the dead
+one is counted as lost.  The journals already recover a torn final record.
+"""
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from event_index import INDEX_NAME, EventIndex
+from journal import EventJournal
+from segments import SegmentJournal
+from text_search import TextIndex
+from writer import BLOCK, DEFAULT_POLICIES, Record, RecordWriter
+
+STOP = None
+
+# Workers are spawned, not forked: the tracker runs hook and Tk threads that
+# must not be duplicated into a child.
+_context = multiprocessing.get_context("spawn")
+
+
+def create_record_writer(config, log_folder, activity_log_file, metrics=None):
+    """The journal, indexes and RecordWriter described by ``config``."""
+    if config.get('journal_format', 'jsonl') == 'segments':
+        journal = SegmentJournal(
+            activity_log_file,
+            flush_every=config.get('journal_flush_events', 20),
+            flush_interval_ms=config.get('journal_flush_ms', 1000),
+            fsync=config.get('journal_fsync', False),
+            max_segment_bytes=config.get('journal_segment_bytes', 16 * 1024 * 1024)
+        )
+    else:
+        journal = EventJournal(
+            activity_log_file,
+            flush_every=config.get('journal_flush_events', 20),
+            flush_interval_ms=config.get('journal_flush_ms', 1000),
+            fsync=config.get('journal_fsync', False)
+        )
+    event_index = None
+    if config.get('event_index', True):
+        try:
+            event_index = EventIndex(os.path.join(log_folder, INDEX_NAME))
+        except Exception as e:
+            print(f"Event index unavailable: {e}")
+    text_index = None
+    if config.get('text_search', True):
+        try:
+            text_index = TextIndex(os.path.join(log_folder, INDEX_NAME), log_folder)
+        except Exception as e:
+            print(f"Text search index unavailable: {e}")
+    return RecordWriter(
+        journal,
+        max_queue=config.get('writer_queue_size', 1000),
+        policies=config.get('writer_policies'),
+        event_index=event_index,
+        text_index=text_index,
+        metrics=metrics
+    )
+
+
+def _child_main(target, inbox, outbox, settings):
+    # Ctrl+C reaches the whole process group; the tracker decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(inbox, outbox, settings)
+
+
+class WorkerProcess:
+    """Runs ``target(inbox, outbox, settings)`` in a child process and restarts it if it dies.
+
+    Restarts back off from 1 s up to ``max_backoff`` while a worker keeps
+    crashing, and reset once it has stayed up for a minute.
+    """
+
+    def __init__(self, name, target, settings, max_queue=1000, max_backoff=30.0):
+        self.name = name
+        self.target = target
+        self.settings = settings
+        self.max_queue = max(1, max_queue)
+        self.inbox = None
+        self.outbox = None
+        self.max_backoff = max_backoff
+        self.process = None
+        self.restarts = 0
+        self.lost = 0
+        self.last_exitcode = None
+        self._started_at = 0.0
+        self._next_start = 0.0
+        self._backoff = 1.0
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.inbox = _context.Queue(self.max_queue)
+        self.outbox = _context.Queue()
+        self.process = _context.Process(target=_child_main,
+                                        args=(self.target, self.inbox, self.outbox, self.settings),
+                                        name=f"tracker-{self.name}", daemon=True)
+        self.process.start()
+        self._started_at = time.monotonic()
+
+    def put(self, item, timeout=0):
+        """Queue ``item`` for the worker, waiting up to ``timeout`` seconds for room; False if it stays full.
+
+        Each attempt holds the restart lock and restarts a dead worker first, so
+        an item never lands in the inbox of a worker that is being replaced,
+        where it would be lost without being counted.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._check()
+                try:
+                    self.inbox.put_nowait(item)
+                    return True
+                except queue.Full:
+                    pass
+            if self._stopping or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def check(self):
+        """Restart the worker if it died; returns its exit code when it was restarted."""
+        with self._lock:
+            return self._check()
+
+    def _check(self):
+        if self._stopping or self.process is None or self.process.is_alive():
+            return None
+        now = time.monotonic()
+        if now < self._next_start:
+            return None
+        if now - self._started_at > 60:
+            self._backoff = 1.0
+        self.last_exitcode = self.process.exitcode
+        self.restarts += 1
+        try:
+            self.lost += self.inbox.qsize()
+        except NotImplementedError:
+            pass
+        self.inbox.cancel_join_thread()
+        self._next_start = now + self._backoff
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+        self.start()
+        return self.last_exitcode
+
+    def stop(self, timeout=10):
+        """Ask the worker to finish what is queued and exit; terminate it after ``timeout``."""
+        self._stopping = True
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.inbox.put(STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self.process.join(timeout)
+        if self.process.is_alive():
+            print(f"{self.name} worker did not stop within {timeout}s, terminating it")
+            self.process.terminate()
+            self.process.join(1)
+            # Whatever is still queued can never be delivered; don't block interpreter exit on it.
+            self.inbox.cancel_join_thread()
+
+    def stats(self):
+        return {
+            "alive": self.process is not None and self.process.is_alive(),
+            "pid": self.process.pid if self.process else None,
+            "restarts": self.restarts,
+            "lost": self.lost,
+            "last_exitcode": self.last_exitcode,
+        }
+
+
+class _Collector:
+    """Drains a worker's outbox on a thread until the worker has been stopped."""
+
+    def __init__(self, worker, handle):
+        self.worker = worker
+        self.handle = handle
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                # Re-read every time: a restarted worker comes with a new outbox
+                message = self.worker.outbox.get(timeout=0.5)
+            except queue.Empty:
+                if self._done.is_set():
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            try:
+                self.handle(message)
+            except Exception as e:
+                print(f"{self.worker.name} worker result error: {e}")
+
+    def stop(self, timeout=5):
+        self._done.set()
+        self._thread.join(timeout)
+
+
+def persistence_main(inbox, outbox, settings):
+    writer = create_record_writer(settings["config"], settings["log_folder"], settings["activity_log_file"])
+    last_report = time.monotonic()
+    while True:
+        try:
+            message = inbox.get(timeout=1.0)
+        except queue.Empty:
+            message = ()
+        if message is STOP:
+            break
+        if isinstance(message, Record):
+            writer.submit(message)
+        elif message and message[0] == "sync":
+            writer.sync()
+            outbox.put(("synced", message[1], os.getpid(), writer.stats()))
+        if time.monotonic() - last_report >= 1.0:
+            outbox.put(("stats", None, os.getpid(), writer.stats()))
+            last_report = time.monotonic()
+    writer.close()
+    outbox.put(("stats", None, os.getpid(), writer.stats()))
+
+
+class ProcessRecordWriter:
+    """RecordWriter stand-in that hands records to a persistence worker.
+
+    ``block`` sources wait up to ``block_timeout`` seconds while the worker's
+    inbox is full (e.g. while a crashed worker is restarting) and are then
+    counted as dropped; every other source is dropped right away.  Coalescing
+    and the rest of the policies are applied by the real writer in the worker.
+    """
+
+    def __init__(self, config, log_folder, activity_log_file, block_timeout=10.0):
+        self.block_timeout = block_timeout
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(config.get('writer_policies') or {})
+        self.worker = WorkerProcess("persistence", persistence_main, {
+            "config": config,
+            "log_folder": log_folder,
+            "activity_log_file": activity_log_file,
+        }, max_queue=config.get('writer_queue_size', 1000))
+        self.dropped = defaultdict(int)
+        self._stats = {"queue_depth": 0, "max_queue_depth": 0, "written": {}, "dropped": {}, "coalesced": {}}
+        self._stats_pid = None
+        # Counts reported by workers that have since been restarted
+        self._previous = {"written": defaultdict(int), "dropped": defaultdict(int), "coalesced": defaultdict(int)}
+        self._sync_lock = threading.Lock()
+        self._synced = threading.Condition(self._sync_lock)
+        self._sync_token = 0
+        self._synced_token = 0
+        self._closing = False
+
+        self.worker.start()
+        self._collector = _Collector(self.worker, self._on_message)
+
+    def _on_message(self, message):
+        kind, token, pid, stats = message
+        with self._synced:
+            if self._stats_pid is not None and pid != self._stats_pid:
+                for key, totals in self._previous.items():
+                    for source, count in self._stats.get(key, {}).items():
+                        totals[source] += count
+            self._stats_pid = pid
+            self._stats = stats
+            if kind == "synced":
+                self._synced_token = max(self._synced_token, token)
+                self._synced.notify_all()
+
+    def submit(self, record):
+        if not self._closing:
+            timeout = self.block_timeout if self.policies.get(record.source, BLOCK) == BLOCK else 0
+            if self.worker.put(record, timeout):
+                return True
+        self.dropped[record.source] += 1
+        return False
+
+    def check(self):
+        return self.worker.check()
+
+    def sync(self, timeout=10):
+        """Wait until the worker has written everything submitted so far; False on timeout."""
+        with self._synced:
+            self._sync_token += 1
+            token = self._sync_token
+        deadline = time.monotonic() + timeout
+        if not self.worker.put(("sync", token), timeout):
+            return False
+        with self._synced:
+            while self._synced_token < token:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._synced.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._synced:
+            stats = dict(self._stats)
+            for key, totals in self._previous.items():
+                merged = defaultdict(int, totals)
+                for source, count in stats.get(key, {}).items():
+                    merged[source] += count
+                stats[key] = merged
+        for source, count in self.dropped.items():
+            stats["dropped"][source] += count
+        for key in self._previous:
+            stats[key] = dict(stats[key])
+        try:
+            stats["queue_depth"] = stats.get("queue_depth", 0) + self.worker.inbox.qsize()
+        except NotImplementedError:
+            pass
+        stats["worker"] = self.worker.stats()
+        return stats
+
+    def close(self, timeout=10):
+        self._closing = True
+        self.worker.stop(timeout)
+        self._collector.stop()
+
+
+def capture_main(inbox, outbox, settings):
+    from PIL import ImageGrab
+    from change_detection import ChangeDetector
+    from encoding import encode_image, output_format
+    from frame_archive import FrameArchive, screenshot_name
+
+    options = settings["encoding"]
+    folder = settings["screenshot_folder"]
+    fmt, extension = output_format(options)
+    detector = None
+    if settings.get("change_detection", True):
+        detector = ChangeDetector(threshold=settings.get("change_threshold", 0.005))
+    archive = FrameArchive(folder) if options["storage"] == "archive" else None
+    multi_monitor = True
+    last_file = None
+
+    def info(grab_ms=None):
+        return {"grab_ms": grab_ms, "dedupe": detector.stats() if detector else None}
+
+    try:
+        while True:
+            message = inbox.get()
+            if message is STOP:
+                break
+            _, trigger, region, captured_at = message
+            captured_at = datetime.fromisoformat(captured_at)
+            try:
+                bbox = tuple(region["bbox"]) if region["bbox"] else None
+                start = time.perf_counter()
+                try:
+                    if multi_monitor:
+                        screenshot = ImageGrab.grab(bbox=bbox, all_screens=True)
+                    else:
+                        screenshot = ImageGrab.grab(bbox=bbox)
+                except TypeError:
+                    screenshot = ImageGrab.grab(bbox=bbox)
+                    multi_monitor = False
+                grab_ms = (time.perf_counter() - start) * 1000
+
+                if detector:
+                    changed, difference = detector.check(screenshot)
+                    if not changed and last_file:
+                        outbox.put(("duplicate", {
+                            "duplicate_of": last_file,
+                            "difference": difference,
+                            "trigger": trigger,
+                            "region": region
+                        }, info(grab_ms)))
+                        continue
+
+                name = screenshot_name(captured_at, extension)
+                path = os.path.join(folder, name)
+                last_file = name
+                result = encode_image(screenshot, path, options)
+                if archive:
+                    data = result.pop("data")
+                    result["archive_index"] = archive.append(captured_at.timestamp(), data,
+                                                             result["width"], result["height"], fmt)
+                    result["archive"] = archive.pack_path
+                event = {"filename": name, "path": path, "format": fmt, "trigger": trigger, "region": region}
+                event.update(result)
+                outbox.put(("captured", event, info(grab_ms)))
+            except Exception as e:
+                outbox.put(("error", RuntimeError(f"{type(e).__name__}: {e}"), info()))
+    finally:
+        if archive:
+            archive.close()
+        outbox.put(("stopped", None, info()))
+
+
+class ProcessScreenshotCapture:
+    """Screenshot grab, change detection and encoding in a capture worker.
+
+    ``on_result(kind, data, info)`` runs on a collector thread for every
+    ``captured``, ``duplicate`` or ``error`` result.  Requests made while
+    ``max_pending`` captures are still queued are skipped rather than queued
+    up, since the next timer tick will take a fresh one anyway.
+    """
+
+    def __init__(self, settings, on_result, max_pending=2):
+        self.on_result = on_result
+        self.worker = WorkerProcess("capture", capture_main, settings, max_queue=max_pending)
+        self.skipped_busy = 0
+        self._dedupe = None
+        self.worker.start()
+        self._collector = _Collector(self.worker, self._on_message)
+
+    def _on_message(self, message):
+        kind, data, info = message
+        if info.get("dedupe") is not None:
+            self._dedupe = info["dedupe"]
+        if kind in ("captured", "duplicate", "error"):
+            self.on_result(kind, data, info)
+
+    def request(self, trigger, region, captured_at):
+        if self.worker.put(("capture", trigger, region, captured_at.isoformat())):
+            return True
+        self.skipped_busy += 1
+        return False
+
+    def check(self):
+        return self.worker.check()
+
+    def dedupe_stats(self):
+        return self._dedupe
+
+    def stats(self):
+        stats = self.worker.stats()
+        stats["skipped_busy"] = self.skipped_busy
+        return stats
+
+    def close(self, timeout=10):
+        self.worker.stop(timeout)
+        self._collector.stop()
@@ -0,0 +1,224 @@
+"""Single writer stage that owns every file handle of a tracking session."""
+import os
+import threading
+import time
+from collections import deque, namedtuple, defaultdict
+
+from blob_store import write_blob
+
+# source is the event_type for events and the capturing source for text.
+# kind is "event" (payload is an event dict for the journal), "text"
+# (payload is a string appended to the file at target) or "blob" (payload is
+# bytes written once, atomically, to the file at target).  Text records whose
+# meta carries "text" and "timestamp" are added to the full-text index.
+Record = namedtuple("Record", "source kind target payload meta", defaults=(None,))
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+DEFAULT_POLICIES = {
+    "system": BLOCK,
+    "goal": BLOCK,
+    "input": BLOCK,
+    "screenshot": BLOCK,
+    "clipboard": DROP_OLDEST,
+    "clipboard_blob": BLOCK,
+    # window/changed carries the time billed to the previous app, so it is never dropped
+    "window": BLOCK,
+    "status": COALESCE,
+}
+
+
+class RecordWriter:
+    """Receives typed records from all capture threads through one bounded queue.
+
+    Backpressure is chosen per source when the queue is full:
+
+    * ``block`` - the submitting thread waits for space.
+    * ``drop_oldest`` - the oldest queued record of any droppable source is
+      discarded to make room (falls back to blocking if none is queued).
+    * ``coalesce`` - a still-queued record from the same source and target is
+      replaced in place, so only the latest snapshot is written.
+
+    Records submitted after :meth:`close` are not written and are counted as
+    dropped.
+    """
+
+    def __init__(self, journal, max_queue=1000, batch_size=200, policies=None, event_index=None,
+                 text_index=None, metrics=None):
+        self.journal = journal
+        self.event_index = event_index
+        self.text_index = text_index
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._handles = {}
+        # Byte size of each text file, so index offsets need no tell() per record
+        self._offsets = {}
+        self._stopping = False
+        self._in_flight = 0
+
+        self.dropped = defaultdict(int)
+        self.coalesced = defaultdict(int)
+        self.written = defaultdict(int)
+        self.max_depth = 0
+
+        self.metrics = metrics
+        self._batch_ms = None
+        if metrics is not None:
+            self._batch_ms = metrics.histogram("writer.batch_ms")
+            metrics.gauge("writer.queue_depth", lambda: len(self._queue))
+            metrics.gauge("writer.max_queue_depth", lambda: self.max_depth)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def policy_for(self, source):
+        return self.policies.get(source, BLOCK)
+
+    def submit(self, record):
+        policy = self.policy_for(record.source)
+        with self._cond:
+            if self._stopping:
+                self.dropped[record.source] += 1
+                return False
+
+            if policy == COALESCE:
+                for i, queued in enumerate(self._queue):
+                    if queued.source == record.source and queued.target == record.target:
+                        self._queue[i] = record
+                        self.coalesced[record.source] += 1
+                        return True
+
+            while len(self._queue) >= self.max_queue and not self._stopping:
+                if policy == DROP_OLDEST and self._drop_oldest():
+                    break
+                self._cond.wait(0.5)
+
+            self._queue.append(record)
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify_all()
+            return True
+
+    def _drop_oldest(self):
+        for i, queued in enumerate(self._queue):
+            if self.policy_for(queued.source) == DROP_OLDEST:
+                del self._queue[i]
+                self.dropped[queued.source] += 1
+                return True
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue and self._stopping:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                self._cond.notify_all()
+
+            start = time.perf_counter()
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Writer error: {e}")
+                if self.metrics is not None:
+                    self.metrics.error("writer", e)
+            if self._batch_ms is not None:
+                self._batch_ms.observe((time.perf_counter() - start) * 1000)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _write_batch(self, batch):
+        touched = {}
+        events = []
+        for record in batch:
+            if record.kind == "event":
+                self.journal.append(record.payload)
+                events.append(record.payload)
+            elif record.kind == "blob":
+                write_blob(record.target, record.payload)
+            else:
+                handle = touched.get(record.target) or self._handle(record.target)
+                touched[record.target] = handle
+                # Binary with the platform's line endings: what text mode would write, at a known size
+                data = record.payload.replace('\n', os.linesep).encode('utf-8')
+                offset = self._offsets[record.target]
+                handle.write(data)
+                self._offsets[record.target] = offset + len(data)
+                if record.meta and self.text_index:
+                    self._index_text(record, offset, len(data))
+            self.written[record.source] += 1
+
+        for handle in touched.values():
+            handle.flush()
+
+        if self.event_index and events:
+            try:
+                self.event_index.add_events(events)
+            except Exception as e:
+                print(f"Event index error: {e}")
+
+    def _handle(self, path):
+        handle = self._handles.get(path)
+        if handle is None:
+            handle = open(path, 'ab')
+            self._handles[path] = handle
+            self._offsets[path] = handle.tell()
+        return handle
+
+    def _index_text(self, record, offset, length):
+        meta = record.meta
+        try:
+            self.text_index.add(record.source, record.target, offset, length, meta["text"],
+                                meta["timestamp"], meta.get("app"), meta.get("window_title"))
+        except Exception as e:
+            print(f"Text index error: {e}")
+
+    def sync(self, timeout=10):
+        """Wait until every record submitted so far has been written; False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._thread.is_alive():
+                    return False
+                self._cond.wait(remaining)
+        self.journal.flush()
+        return True
+
+    def stats(self):
+        with self._cond:
+            depth = len(self._queue)
+        return {
+            "queue_depth": depth,
+            "max_queue_depth": self.max_depth,
+            "written": dict(self.written),
+            "dropped": dict(self.dropped),
+            "coalesced": dict(self.coalesced),
+        }
+
+    def close(self, timeout=10):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        for handle in self._handles.values():
+            try:
+                handle.close()
+            except Exception:
+                pass
+        self._handles.clear()
+        self.journal.close()
+        if self.event_index:
+            self.event_index.close()
+        if self.text_index:
+            self.text_index.close()